@@ -0,0 +1,77 @@
+from core.batch import completed_skus, run_batch
+from core.risk import STOCKOUT_RISK, classify_row
+import json
+import os
+import tempfile
+import pandas as pd
+
+class StubOrchestrator:
+    """Stands in for the pipeline; fails the SKUs in `fail` and records what each run was given."""
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = {}
+
+    def run(self, sku_data, full_inventory=None):
+        sku = str(sku_data["SKU_ID"])
+        self.calls[sku] = full_inventory
+        if sku in self.fail:
+            raise RuntimeError("LLM unavailable")
+        return {"SKU_ID": sku, "status": "Risk"}
+
+def read_output(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_batch_runner():
+    print("\n=== TEST: Filtered batch run ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    output = os.path.join(tempfile.mkdtemp(), "results.jsonl")
+    stub = StubOrchestrator()
+    counts = run_batch("data/inventory_data_real.csv", output, locations=["NJ"], categories=["Electronics"],
+                       concurrency=2, orchestrator=stub)
+    expected = df[(df["Location"] == "NJ") & (df["Category"] == "Electronics")]
+    assert sorted(r["SKU_ID"] for r in read_output(output)) == sorted(expected["SKU_ID"])
+    assert counts["processed"] == len(expected) and counts["failed"] == 0
+    # Each run gets only its product's locations, from the index built once for the sweep
+    sku = expected.iloc[0]
+    siblings = df[df["Product_Name"] == sku["Product_Name"]]
+    assert [r["SKU_ID"] for r in stub.calls[sku["SKU_ID"]]] == list(siblings["SKU_ID"])
+    assert [r["Current_Stock"] for r in stub.calls[sku["SKU_ID"]]] == list(siblings["Current_Stock"])
+
+    risky = StubOrchestrator()
+    run_batch("data/inventory_data_real.csv", output, risk_classes=[STOCKOUT_RISK], orchestrator=risky)
+    assert set(risky.calls) == {r["SKU_ID"] for r in df.to_dict(orient="records") if classify_row(r) == STOCKOUT_RISK}
+    print(f"✅ {counts['processed']} NJ Electronics SKUs; {len(risky.calls)} stock-out SKUs by the risk filter.")
+
+    print("\n=== TEST: Resume retries failures and drops a torn line ===")
+    failing = expected.iloc[1]["SKU_ID"]
+    counts = run_batch("data/inventory_data_real.csv", output, locations=["NJ"], categories=["Electronics"],
+                       orchestrator=StubOrchestrator(fail=[failing]))
+    assert counts["failed"] == 1
+    with open(output, "a") as f:
+        f.write('{"SKU_ID": "P-999", "sta')  # interrupted mid-write
+    assert failing not in completed_skus(output)
+    assert all(line.endswith("\n") for line in open(output)), "Torn line truncated"
+
+    retry = StubOrchestrator()
+    counts = run_batch("data/inventory_data_real.csv", output, locations=["NJ"], categories=["Electronics"],
+                       resume=True, orchestrator=retry)
+    assert list(retry.calls) == [failing] and counts["skipped"] == len(expected) - 1
+    assert read_output(output)[-1] == {"SKU_ID": failing, "status": "Risk"}
+    assert [r["SKU_ID"] for r in read_output(output)].count(failing) == 1, "Error line replaced by the retry"
+    assert len(read_output(output)) == len(expected) and not any("error" in r for r in read_output(output))
+    print(f"✅ Resume re-ran only {failing}.")
+
+    print("\n=== TEST: File order by default, urgency on request ===")
+    from core.scheduler import urgency
+    in_order, by_urgency = StubOrchestrator(), StubOrchestrator()
+    run_batch("data/inventory_data_real.csv", output, locations=["NJ"], concurrency=1, orchestrator=in_order)
+    run_batch("data/inventory_data_real.csv", output, locations=["NJ"], concurrency=1, orchestrator=by_urgency, prioritize=True)
+    nj = df[df["Location"] == "NJ"]
+    assert list(in_order.calls) == list(nj["SKU_ID"])
+    scores = [urgency(r) for r in nj.set_index("SKU_ID", drop=False).loc[list(by_urgency.calls)].to_dict(orient="records")]
+    assert scores == sorted(scores, reverse=True)
+    print("✅ Streamed in file order; prioritized run is most urgent first.")
+
+if __name__ == "__main__":
+    test_batch_runner()
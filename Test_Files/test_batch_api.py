@@ -0,0 +1,83 @@
+from core.orchestrator import Orchestrator
+from core.llm_service import SimulatedBackend
+from core.batch_api import COMPLETED, FAILED, BatchClient, BatchSweep, LocalBatchClient, read_outputs, run_sweep, write_requests
+import pandas as pd
+import tempfile
+import time
+import os
+
+class FlakyBackend(SimulatedBackend):
+    """Simulated backend that fails every request for one model."""
+    def chat(self, model, messages, tools=None, **kwargs):
+        if model == "broken":
+            raise RuntimeError("rate limited")
+        return super().chat(model, messages, tools=tools, **kwargs)
+
+def wait_done(client, batch_id):
+    for _ in range(200):
+        if client.status(batch_id) in (COMPLETED, FAILED):
+            return client.status(batch_id)
+        time.sleep(0.05)
+    raise AssertionError("batch never finished")
+
+def test_batch_sweep_matches_sequential():
+    df = pd.read_csv("data/inventory_data_real.csv")
+    rows = df.head(20).to_dict(orient="records")
+    orchestrator = Orchestrator(llm=SimulatedBackend())
+
+    print("\n=== TEST: Batch sweep, one job per stage turn ===")
+    workdir = tempfile.mkdtemp()
+    sweep = BatchSweep(orchestrator, LocalBatchClient(SimulatedBackend()), workdir=workdir)
+    results = sweep.run(rows)
+
+    assert len(results) == len(rows)
+    # At most two turns (reply + follow-up) per agent, regardless of SKU count
+    assert len(sweep.batch_ids) <= 2 * len(orchestrator.agents)
+    assert any(f.endswith(".output.jsonl") for f in os.listdir(workdir))
+
+    for row, batched in zip(rows, results):
+        sequential = orchestrator.run(row)
+        for key in ("po_qty", "transfer_qty", "new_forecast"):
+            assert batched.get(key) == sequential.get(key), f"{row['SKU_ID']} {key}"
+    print(f"✅ {len(rows)} SKUs in {len(sweep.batch_ids)} batch jobs, same decisions as sequential runs.")
+
+    print("\n=== TEST: Chunked sweep counts decisions per status ===")
+    data_file = os.path.join(workdir, "inventory.csv")
+    df.head(12).to_csv(data_file, index=False)
+    output = os.path.join(workdir, "results.jsonl")
+    loads = []
+    orchestrator.load_inventory = lambda: loads.append(1) or []
+    counts = run_sweep(data_file, output, LocalBatchClient(SimulatedBackend()), chunk_size=5,
+                       workdir=workdir, orchestrator=orchestrator)
+    written = pd.read_json(output, lines=True)
+    assert counts["processed"] == len(written) == 12
+    assert not loads, "Chunks look up their products' locations in the sweep's index"
+    assert counts["Risk"] == (written["status"] == "Risk").sum()
+    assert counts["Healthy"] == (written["status"] == "Healthy").sum()
+    assert counts["Stock-out Risk"] == (written["risk_type"] == "Stock-out Risk").sum()
+    print(f"✅ {counts}")
+
+    print("\n=== TEST: Local batches always finish ===")
+    client = LocalBatchClient(FlakyBackend())
+    requests_file = os.path.join(workdir, "flaky.jsonl")
+    messages = [{"role": "user", "content": "Check SKU P-1"}]
+    write_requests(requests_file, {"ok": {"model": "gpt-4o", "messages": messages},
+                                   "bad": {"model": "broken", "messages": messages},
+                                   "malformed": {"messages": messages}})
+    batch_id = client.submit(requests_file)
+    assert wait_done(client, batch_id) == COMPLETED
+    client.download(batch_id, os.path.join(workdir, "flaky.output.jsonl"))
+    outputs = read_outputs(os.path.join(workdir, "flaky.output.jsonl"))
+    assert outputs["ok"][1] is None and "rate limited" in outputs["bad"][1] and outputs["malformed"][1]
+    missing = client.submit(os.path.join(workdir, "does-not-exist.jsonl"))
+    assert wait_done(client, missing) == FAILED
+    print("✅ Per-request errors become error results; an unreadable file fails the batch.")
+
+    try:
+        BatchClient()
+        raise AssertionError("BatchClient is abstract")
+    except TypeError:
+        pass
+
+if __name__ == "__main__":
+    test_batch_sweep_matches_sequential()
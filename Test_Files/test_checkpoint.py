@@ -0,0 +1,64 @@
+from core.checkpoint import CheckpointStore
+from core.orchestrator import Orchestrator
+from core.llm_service import SimulatedBackend
+import os
+import tempfile
+import time
+import pandas as pd
+
+class Crash(BaseException):
+    """Stands in for the process dying; not caught by the per-agent error handling."""
+
+class CrashingBackend(SimulatedBackend):
+    def __init__(self, crash_at=None):
+        super().__init__()
+        self.crash_at = crash_at
+        self.agents_called = []
+
+    def chat(self, model, messages, tools=None, **kwargs):
+        agent = self._agent(messages)
+        if agent == self.crash_at:
+            raise Crash(agent)
+        self.agents_called.append(agent)
+        return super().chat(model, messages, tools=tools, **kwargs)
+
+def test_checkpoint_resume():
+    print("\n=== TEST: Resume a run from its last finished agent ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    sku_data = df[df["SKU_ID"] == "P-142"].iloc[0].to_dict()  # transfer + PO
+    store = CheckpointStore(tempfile.mkdtemp())
+
+    try:
+        Orchestrator(llm=CrashingBackend("Inventory Agent"), checkpoints=store).run(sku_data)
+        assert False, "Run should have crashed"
+    except Crash:
+        pass
+    assert len(os.listdir(store.root)) == 1
+
+    resumed_backend = CrashingBackend()
+    resumed = Orchestrator(llm=resumed_backend, checkpoints=store).run(sku_data)
+    assert resumed["resumed_after"] == "Root Cause Agent"
+    assert "Monitoring Agent" not in resumed_backend.agents_called, "Finished agents must not be re-run"
+    assert resumed_backend.agents_called[0] == "Inventory Agent"
+    assert os.listdir(store.root) == [], "Completed runs drop their checkpoint"
+
+    fresh = Orchestrator(llm=SimulatedBackend()).run(sku_data)
+    for key in ("status", "new_forecast", "transfer_qty", "po_qty"):
+        assert resumed.get(key) == fresh.get(key), key
+    assert resumed["usage"]["llm_calls"] == fresh["usage"]["llm_calls"]
+    print(f"✅ Resumed after {resumed['resumed_after']} with {len(resumed_backend.agents_called)} new calls; same result as a fresh run.")
+
+    print("\n=== TEST: Checkpoint GC ===")
+    store.max_age = 60
+    for name in ("old", "new"):
+        with open(os.path.join(store.root, f"{name}.json"), "w") as f:
+            f.write("{}")
+    os.utime(os.path.join(store.root, "old.json"), (time.time() - 3600,) * 2)
+    assert store.gc() == 1 and os.listdir(store.root) == ["new.json"]
+    store.max_bytes = 0
+    assert store.gc() == 1
+    assert store.load("new") is None
+    print("✅ Old and excess checkpoints are removed.")
+
+if __name__ == "__main__":
+    test_checkpoint_resume()
@@ -0,0 +1,91 @@
+from core.deadlines import DeadlinePolicy, LatencyTracker, Deadline, RunDeadlines, hedged_call
+from core.events import EventLog
+from core.checkpoint import CheckpointStore
+from core.orchestrator import Orchestrator
+from core.llm_service import SimulatedBackend
+from agents.base_agent import Agent
+import tempfile
+import threading
+import time
+import pandas as pd
+
+class SlowBackend(SimulatedBackend):
+    """Simulated replies, with one agent's first request hanging."""
+    def __init__(self, slow_agent, hang=5.0):
+        super().__init__()
+        self.slow_agent = slow_agent
+        self.hang = hang
+        self.calls = 0
+
+    def chat(self, model, messages, tools=None, **kwargs):
+        if self._agent(messages) == self.slow_agent:
+            self.calls += 1
+            if self.calls == 1:
+                time.sleep(self.hang)
+        return super().chat(model, messages, tools=tools, **kwargs)
+
+def test_deadlines():
+    df = pd.read_csv("data/inventory_data_real.csv")
+    sku_data = df[df["SKU_ID"] == "P-142"].iloc[0].to_dict()
+
+    print("\n=== TEST: Agent deadline ===")
+    policy = DeadlinePolicy(agent_seconds={"Forecast Agent": 0.3})
+    started = time.monotonic()
+    result = Orchestrator(llm=SlowBackend("Forecast Agent"), deadlines=policy).run(sku_data)
+    assert time.monotonic() - started < 3, "A hung request must not hold up the run"
+    assert result["deadlines"] == [{"agent": "Forecast Agent", "scope": "agent", "name": "Forecast Agent", "seconds": 0.3}]
+    assert result.get("po_qty"), "Later agents still run after one agent times out"
+    print(f"✅ Forecast Agent timed out; run finished with {result['deadlines']}")
+
+    print("\n=== TEST: Hedged request ===")
+    latencies = LatencyTracker()
+    for _ in range(20):
+        latencies.add("x", 0.05)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        time.sleep(2.0 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+    value, hedge = hedged_call(call, Deadline(3, "agent", "x"), latencies.percentile("x", 0.95, 20))
+    assert value == 2 and hedge["winner"] == "hedge"
+    print(f"✅ Hedge won after {hedge['after_ms']}ms")
+
+    print("\n=== TEST: Tool deadline and cancellation ===")
+    def slow_lookup(query: str, **kwargs) -> str:
+        """Stand-in for a search that hangs."""
+        time.sleep(5)
+        return "late"
+    tool_agent = Agent(name="Root Cause Agent", instructions="Find the root cause.", tools=[slow_lookup])
+    orchestrator = Orchestrator(llm=SimulatedBackend(), deadlines=DeadlinePolicy(tool_seconds={"slow_lookup": 0.2}))
+    messages = []
+    msg = {"tool_calls": [{"id": "1", "function": {"name": "slow_lookup", "arguments": '{"query": "x"}'}}]}
+    deadlines = RunDeadlines(orchestrator.deadlines)
+    deadlines.start_agent(tool_agent.name)
+    orchestrator.execute_tool_calls(tool_agent, msg, messages, EventLog(), deadlines)
+    assert messages[0]["content"].startswith("Timed out") and deadlines.fired[0]["scope"] == "tool"
+
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    started = time.monotonic()
+    result = Orchestrator(llm=SlowBackend("Monitoring Agent"), deadlines=DeadlinePolicy()).run(sku_data, cancel_event=cancel)
+    assert result.get("cancelled") and time.monotonic() - started < 3
+    print("✅ Slow tool timed out and a cancel interrupts an in-flight request.")
+
+    print("\n=== TEST: Run deadline mid-agent resumes at that agent ===")
+    store = CheckpointStore(tempfile.mkdtemp())
+    slow = Orchestrator(llm=SlowBackend("Forecast Agent", hang=2.0), checkpoints=store,
+                        deadlines=DeadlinePolicy(run_seconds=0.5))
+    result = slow.run(sku_data)
+    assert [d["scope"] for d in result["deadlines"]] == ["run"] and result["deadlines"][0]["agent"] == "Forecast Agent"
+    checkpoint = store.load(result["run_id"])
+    assert checkpoint is not None and checkpoint.last_agent == "Monitoring Agent" and checkpoint.next_stage == 1
+
+    backend = SlowBackend("Forecast Agent", hang=0)
+    resumed = Orchestrator(llm=backend, checkpoints=store).run(sku_data)
+    assert backend.calls >= 1 and resumed.get("po_qty"), "The timed-out agent runs again on resume"
+    assert store.load(result["run_id"]) is None
+    print("✅ Checkpoint points at the interrupted agent; resume re-runs it.")
+
+if __name__ == "__main__":
+    test_deadlines()
@@ -0,0 +1,72 @@
+from core.digest import build_digests, send_digests
+from core.mailer import Mailer, SMTPConfig
+import asyncio
+import socket
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_digest_delivery_status():
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+    except ImportError:
+        print("aiosmtpd not installed; skipping (pip install aiosmtpd).")
+        return
+
+    class Planners(Sink):
+        """Accepts known planners, refuses unknown mailboxes, stalls on the slow one."""
+        def __init__(self):
+            self.received = []
+
+        async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+            if address.startswith("nobody"):
+                return "550 No such user"
+            envelope.rcpt_tos.append(address)
+            return "250 OK"
+
+        async def handle_DATA(self, server, session, envelope):
+            if envelope.rcpt_tos[0].startswith("slow"):
+                await asyncio.sleep(3)
+            self.received.append(envelope.rcpt_tos[0])
+            return "250 OK"
+
+    handler = Planners()
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        mailer = Mailer(SMTPConfig(server="127.0.0.1", port=port, sender="agent@example.com", starttls=False),
+                        workers=3, backoff=0.01)
+        results = [
+            {"SKU_ID": "P-1", "Location": "NJ", "Current_Stock": 5, "Forecast": 100, "po_qty": 120},
+            {"SKU_ID": "P-2", "Location": "TX", "Current_Stock": 50, "Forecast": 50},
+            {"SKU_ID": "P-3", "Location": "CA", "Current_Stock": 400, "Forecast": 50},
+            {"SKU_ID": "P-4", "Location": "FL", "Current_Stock": 10, "Forecast": 50},
+        ]
+        recipients = {"NJ": "nj@example.com", "TX": "nobody@example.com", "CA": "slow@example.com", "FL": "fl-planner"}
+        digests = build_digests(results, "location", recipients)
+
+        print("\n=== TEST: Digest statuses come from the mailer ===")
+        def summarize(digest):
+            if digest.recipient.startswith("nj"):
+                raise ConnectionError("LLM unreachable")
+            return "All quiet."
+
+        statuses = {s["recipient"]: s for s in send_digests(digests, summarize=summarize, mailer=mailer, timeout=1.0)}
+        assert statuses["nj@example.com"]["status"] == "sent", "A failed summary doesn't stop the digest"
+        assert statuses["nobody@example.com"]["status"].startswith("failed:")
+        assert statuses["slow@example.com"]["status"] == "pending"
+        assert statuses["fl-planner"]["status"] == "failed: invalid recipient address"
+        assert "message_id" not in statuses["fl-planner"]
+        assert all(s["message_id"].startswith("msg-") for r, s in statuses.items() if r != "fl-planner")
+        assert mailer.flush(timeout=10) and "slow@example.com" in handler.received
+        print(f"✅ {[(r, s['status'][:20]) for r, s in statuses.items()]}")
+        mailer.close()
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    test_digest_delivery_status()
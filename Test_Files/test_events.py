@@ -0,0 +1,27 @@
+from core.events import EventLog, TOOL, gc_spills, load_payload
+import os
+import tempfile
+import time
+
+def test_spill_and_gc():
+    root = tempfile.mkdtemp()
+
+    print("\n=== TEST: Large payloads spill to disk ===")
+    old = EventLog(run_id="old-run", spill_threshold=100, spill_dir=root)
+    event = old.record("Root Cause Agent", TOOL, "x" * 500, tool="search_web")
+    assert event.payload is None and event.payload_ref and load_payload(event.to_dict()) == "x" * 500
+    recent = EventLog(run_id="recent-run", spill_threshold=100, spill_dir=root)
+    recent.record("Root Cause Agent", TOOL, "y" * 500, tool="search_web")
+    print(f"✅ Payload spilled to {event.payload_ref}")
+
+    print("\n=== TEST: Spills of old runs are garbage-collected ===")
+    week_ago = time.time() - 8 * 86400
+    os.utime(old.spill_dir, (week_ago, week_ago))
+    assert gc_spills(root) == 1
+    assert sorted(os.listdir(root)) == ["recent-run"]
+    assert load_payload(event.to_dict()).startswith("(payload unavailable")
+    assert gc_spills(os.path.join(root, "missing")) == 0
+    print("✅ Old run's spill directory removed; recent one kept.")
+
+if __name__ == "__main__":
+    test_spill_and_gc()
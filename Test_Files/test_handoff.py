@@ -0,0 +1,39 @@
+from core.handoff import Handoff, handoff_report
+from core.orchestrator import Orchestrator
+from core.llm_service import SimulatedBackend
+import random
+import pandas as pd
+
+def test_handoff_compaction():
+    print("\n=== TEST: Compact context at agent handoffs ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    sku_data = df[df["SKU_ID"] == "P-142"].iloc[0].to_dict()  # transfer + PO
+
+    # Market news is picked at random; same seed for both runs
+    random.seed(42)
+    compact = Orchestrator(llm=SimulatedBackend()).run(sku_data)
+    random.seed(42)
+    full = Orchestrator(llm=SimulatedBackend(), compact_handoffs=False).run(sku_data)
+
+    for key in ("status", "new_forecast", "root_cause", "transfer_qty", "po_qty", "final_summary"):
+        assert compact.get(key) == full.get(key), key
+    print("✅ Same decisions with and without compaction.")
+
+    report = {r["agent"]: r for r in handoff_report(compact)}
+    assert report["Monitoring Agent"]["saved"] == 0
+    assert all(report[a]["saved"] > 0 for a in ("Inventory Agent", "Procurement Agent", "Communication Agent"))
+    assert all(r["saved"] == 0 for r in handoff_report(full))
+    print(f"✅ History tokens sent {sum(r['sent'] for r in report.values())} of {sum(r['full'] for r in report.values())}.")
+
+    print("\n=== TEST: Handoff message ===")
+    messages = [{"role": "user", "content": "kickoff"},
+                {"role": "assistant", "content": '{"status": "Risk", "rationale": "Coverage 0.05, below lead time."}'},
+                {"role": "tool", "tool_call_id": "t1", "content": "long search output " * 50}]
+    handoff = Handoff()
+    handoff.begin(messages[:1])
+    handoff.end("Monitoring Agent", messages)
+    assert handoff.notes["Monitoring Agent"] == "Coverage 0.05, below lead time."
+    print("✅ Note taken from the decision rationale.")
+
+if __name__ == "__main__":
+    test_handoff_compaction()
@@ -0,0 +1,49 @@
+from core.history import SalesHistory, seed_from_inventory
+import numpy as np
+import pandas as pd
+import tempfile
+
+def test_sales_history():
+    print("\n=== TEST: Sales history rolling aggregates ===")
+    root = tempfile.mkdtemp()
+    df = pd.read_csv("data/inventory_data_real.csv")
+    history = seed_from_inventory(SalesHistory(root), df, days=300)  # grows past the initial 256-day file
+
+    # Incremental aggregates match a full rescan of the raw series
+    for sku in ["P-101", "P-150", "P-200"]:
+        stats = history.stats(sku)
+        dates, sales = history.series(sku, days=300)
+        sales = sales.astype(float)
+        last30 = sales[-30:]
+        assert stats["sales_7d"] == sales[-7:].sum()
+        assert stats["sales_30d"] == last30.sum()
+        assert stats["sales_90d"] == sales[-90:].sum()
+        assert np.isclose(stats["trend_slope"], np.polyfit(np.arange(30), last30, 1)[0])
+        assert np.isclose(stats["demand_cv"], last30.std() / last30.mean())
+        month = np.array([d.month for d in dates]) == dates[-1].month
+        assert np.isclose(stats["seasonality_index"], sales[month].mean() / sales.mean())
+    print("✅ 7/30/90-day sums, slope, CV and seasonality match a full rescan.")
+
+    print("\n=== TEST: Append-only ingestion ===")
+    reopened = SalesHistory(root)
+    before = reopened.stats("P-104")["sales_30d"]
+    reopened.record("2024-12-02", {"P-104": 40, "P-999": 5})  # skips Dec 1 (zero sales), adds a new SKU
+    assert reopened.last_date.isoformat() == "2024-12-02"
+    _, last30 = reopened.series("P-104", days=30)
+    assert reopened.stats("P-104")["sales_30d"] == last30.sum() != before
+    assert reopened.stats("P-999")["sales_7d"] == 5
+    try:
+        reopened.record("2024-11-15", {"P-104": 1})
+        assert False, "Backdated sales should be rejected"
+    except ValueError as e:
+        print(f"  rejected: {e}")
+
+    enriched = reopened.enrich(df)
+    row = enriched[enriched["SKU_ID"] == "P-104"].iloc[0]
+    assert row["Sales_Trend_Last_30_Days"] == round(last30.sum())
+    assert {"Trend_Slope", "Seasonality_Index", "Demand_CV"} <= set(enriched.columns)
+    assert len(reopened.monthly("P-104", months=6)) == 6
+    print("✅ New days and SKUs append in place and feed the inventory columns.")
+
+if __name__ == "__main__":
+    test_sales_history()
@@ -0,0 +1,135 @@
+from core.ingest import DeltaIngestor, tail_jsonl, serve_socket
+from core.history import SalesHistory, seed_from_inventory
+from core.orchestrator import inventory_lock
+from core.policy import PolicyEngine
+from core.rollups import PortfolioRollup
+from core.simulation import SimulationConfig
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import pandas as pd
+
+class CountingScreener:
+    """Stands in for the multi-SKU screen; records which SKUs were re-screened."""
+    def __init__(self):
+        self.calls = []
+
+    def screen(self, rows):
+        self.calls.append([str(r["SKU_ID"]) for r in rows])
+        return {str(r["SKU_ID"]): {"status": "Stock-out Risk" if r["Current_Stock"] < 10 else "Healthy"} for r in rows}
+
+class BrokenView:
+    """A view whose incremental update always raises."""
+    def update_row(self, row):
+        raise RuntimeError("view out of sync")
+
+def test_delta_ingest():
+    print("\n=== TEST: Debounced delta events ===")
+    data_file = os.path.join(tempfile.mkdtemp(), "inventory.csv")
+    shutil.copy("data/inventory_data_real.csv", data_file)
+    df = pd.read_csv(data_file)
+    busy, other = df.iloc[0], df.iloc[1]
+    simulation = SimulationConfig(n_samples=200)
+    rollup, policy, screener = PortfolioRollup(df, simulation=simulation), PolicyEngine(df), CountingScreener()
+    ingestor = DeltaIngestor(data_file, debounce=1.0, max_wait=10.0, screener=screener, rollup=rollup, policy=policy)
+
+    for t in range(50):
+        ingestor.submit({"type": "sale", "sku": busy["SKU_ID"], "qty": 1}, now=t * 0.1)
+    ingestor.submit({"type": "receipt", "sku": other["SKU_ID"], "qty": 20}, now=5.5)
+    assert ingestor.due(now=5.5) == [], "Still inside the debounce window"
+    assert ingestor.due(now=6.0) == [busy["SKU_ID"]]
+    ingestor.flush(ingestor.due(now=6.0))
+    assert screener.calls == [[busy["SKU_ID"]]], "50 sales, one re-screen, only the affected SKU"
+
+    after = pd.read_csv(data_file).set_index("SKU_ID")
+    assert after.loc[busy["SKU_ID"], "Current_Stock"] == max(busy["Current_Stock"] - 50, 0)
+    assert after.loc[other["SKU_ID"], "Current_Stock"] == other["Current_Stock"], "Pending SKU not written yet"
+    assert policy.for_sku(busy["SKU_ID"]) == PolicyEngine(after.reset_index()).for_sku(busy["SKU_ID"])
+
+    ingestor.flush()
+    after = pd.read_csv(data_file).set_index("SKU_ID")
+    assert after.loc[other["SKU_ID"], "Current_Stock"] == other["Current_Stock"] + 20
+    assert after.loc[other["SKU_ID"], "On_Order"] == max((other["On_Order"] if other["On_Order"] == other["On_Order"] else 0) - 20, 0)
+    fresh = PortfolioRollup(after.reset_index(), simulation=simulation)
+    assert rollup.totals()["stockout_skus"] == fresh.totals()["stockout_skus"]
+    assert rollup.sku_simulation(busy["SKU_ID"]) == fresh.sku_simulation(busy["SKU_ID"])
+    print(f"✅ {ingestor.counts}")
+
+    print("\n=== TEST: File tail and socket sources ===")
+    events_file = os.path.join(os.path.dirname(data_file), "events.jsonl")
+    open(events_file, "w").close()
+    stop = threading.Event()
+    tailed = DeltaIngestor(data_file, debounce=0.1, screen=False)
+    tailed.start(tail_jsonl(events_file, from_start=True, poll=0.05, stop=stop))
+    with open(events_file, "a") as f:
+        f.write(json.dumps({"type": "stock", "sku": busy["SKU_ID"], "qty": 77}) + "\n")
+        f.write("not json\n")
+    for _ in range(100):
+        if tailed.counts["skus_flushed"]:
+            break
+        time.sleep(0.05)
+    stop.set()
+    tailed.stop()
+    assert pd.read_csv(data_file).set_index("SKU_ID").loc[busy["SKU_ID"], "Current_Stock"] == 77
+
+    listener = DeltaIngestor(data_file, debounce=0.1, screen=False)
+    server = serve_socket(listener, port=0, tick=0.05)
+    with socket.create_connection(server.server_address) as conn:
+        conn.sendall((json.dumps({"type": "sale", "sku": busy["SKU_ID"], "qty": 7}) + "\n").encode())
+    for _ in range(100):
+        if listener.counts["skus_flushed"]:
+            break
+        time.sleep(0.05)
+    server.shutdown()
+    listener.stop()
+    assert pd.read_csv(data_file).set_index("SKU_ID").loc[busy["SKU_ID"], "Current_Stock"] == 70
+    print("✅ Events from a tailed file and a socket were applied.")
+
+    print("\n=== TEST: Sales land on known history days ===")
+    history = seed_from_inventory(SalesHistory(tempfile.mkdtemp()), df, days=60)
+    latest = history.last_date
+    before = history.enrich(df)["Sales_Trend_Last_30_Days"].to_numpy()
+    dated = DeltaIngestor(data_file, debounce=0.1, screen=False, history=history)
+    dated.submit({"type": "sale", "sku": busy["SKU_ID"], "qty": 2})                      # no ts: latest day
+    dated.submit({"type": "sale", "sku": busy["SKU_ID"], "qty": 5, "ts": "2026-10-19"})  # far future: dropped
+    dated.flush()
+    assert history.last_date == latest and dated.counts["sales_not_recorded"] == 1
+    after_sales = history.enrich(df)["Sales_Trend_Last_30_Days"].to_numpy()
+    assert after_sales[0] == before[0] + 2 and (after_sales[1:] == before[1:]).all()
+    print("✅ Undated sale recorded on the latest day; far-future sale not recorded.")
+
+    print("\n=== TEST: Flushes wait for readers of the same inventory file ===")
+    locked = DeltaIngestor(data_file, debounce=0.1, screen=False, rollup=rollup)
+    locked.submit({"type": "stock", "sku": busy["SKU_ID"], "qty": 5})
+    stock_before = pd.read_csv(data_file).set_index("SKU_ID").loc[busy["SKU_ID"], "Current_Stock"]
+    with inventory_lock(os.path.join(os.path.dirname(data_file), ".", "inventory.csv")):
+        flusher = threading.Thread(target=locked.flush)
+        flusher.start()
+        flusher.join(timeout=0.3)
+        assert flusher.is_alive(), "Flush must block while the lock is held"
+        assert pd.read_csv(data_file).set_index("SKU_ID").loc[busy["SKU_ID"], "Current_Stock"] == stock_before
+    flusher.join()
+    assert pd.read_csv(data_file).set_index("SKU_ID").loc[busy["SKU_ID"], "Current_Stock"] == 5
+    print("✅ Flush applied only after the lock was released.")
+
+    print("\n=== TEST: A failing view does not stop ingest ===")
+    broken = DeltaIngestor(data_file, debounce=0.05, screen=False, rollup=BrokenView(), policy=policy)
+    events = iter([{"type": "stock", "sku": busy["SKU_ID"], "qty": 7}, None, None,
+                   {"type": "stock", "sku": other["SKU_ID"], "qty": 9}])
+    def paced():
+        for event in events:
+            time.sleep(0.1)
+            yield event
+    broken.start(paced()).join(timeout=10)
+    after = pd.read_csv(data_file).set_index("SKU_ID")
+    assert after.loc[busy["SKU_ID"], "Current_Stock"] == 7 and after.loc[other["SKU_ID"], "Current_Stock"] == 9
+    assert broken.counts["flushes"] == 2 and broken.counts["view_errors"] == 2
+    assert policy.for_sku(other["SKU_ID"]) == PolicyEngine(after.reset_index()).for_sku(other["SKU_ID"])
+    print(f"✅ Both deltas applied despite the broken view: {broken.counts}")
+
+if __name__ == "__main__":
+    test_delta_ingest()
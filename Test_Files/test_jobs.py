@@ -0,0 +1,39 @@
+from core.jobs import JobManager, DONE, CANCELLED
+import threading
+import time
+
+def slow_runner(run_data, cancel_event):
+    # Stand-in for Orchestrator.run: six "agents", checking for cancellation at each handoff
+    for _ in range(6):
+        if cancel_event.is_set():
+            return {"SKU_ID": run_data["SKU_ID"], "cancelled": True}
+        time.sleep(0.05)
+    return {"SKU_ID": run_data["SKU_ID"], "final_summary": "ok"}
+
+def test_jobs():
+    jobs = JobManager(runner=slow_runner, max_workers=2)
+    sku_data = {"SKU_ID": "P-101", "Current_Stock": 50, "Forecast": 100, "Season": "Winter"}
+
+    print("\n=== TEST: Duplicate submissions attach to one job ===")
+    first = jobs.submit(sku_data)
+    second = jobs.submit(dict(sku_data))
+    assert first.job_id == second.job_id, "Identical runs should share a job"
+    assert jobs.attach(sku_data).job_id == first.job_id
+
+    jobs.wait(first.job_id, timeout=5)
+    assert jobs.status(first.job_id) == DONE
+    assert first.result["final_summary"] == "ok"
+    print(f"✅ Job {first.job_id} finished in {first.elapsed:.2f}s")
+
+    print("\n=== TEST: Cancellation ===")
+    other = jobs.submit({**sku_data, "SKU_ID": "P-102"})
+    time.sleep(0.07)
+    assert jobs.cancel(other.job_id)
+    jobs.wait(other.job_id, timeout=5)
+    assert other.status == CANCELLED, other.status
+    print(f"✅ Job {other.job_id} cancelled")
+
+    jobs.shutdown()
+
+if __name__ == "__main__":
+    test_jobs()
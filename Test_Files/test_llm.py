@@ -1,10 +1,26 @@
-from core.llm_service import LLMService
+from core.llm_service import LLMBackend, LLMService, BackendNotConfigured, get_backend
 import os
 
+class FailingBackend(LLMBackend):
+    """A backend whose every call fails, like an unreachable endpoint."""
+    name = "failing"
+
+    def chat(self, model, messages, tools=None, **kwargs):
+        raise ConnectionError("endpoint unreachable")
+
 def test_llm():
     print(f"Checking API Key: {'Found' if os.environ.get('OPENAI_API_KEY') else 'Not Found'}")
-    
-    llm = LLMService()
+
+    configured = os.environ.get("OPENAI_API_KEY") or os.environ.get("LLM_BACKEND")
+    if not configured:
+        # The simulator is opt-in: no silent fallback to made-up decisions
+        try:
+            get_backend()
+            assert False, "Expected BackendNotConfigured"
+        except BackendNotConfigured as e:
+            print(f"✅ No backend configured: {e}")
+
+    llm = LLMService(None if configured else "simulated")
     prompt = "Explain the concept of safety stock in one sentence."
     print(f"\nPrompt: {prompt}")
     
@@ -16,5 +32,26 @@ def test_llm():
     else:
         print("\n❌ Unexpected response.")
 
+    print("\n=== TEST: Backend errors surface unless running simulated ===")
+    try:
+        LLMBackend()
+        raise AssertionError("LLMBackend is abstract")
+    except TypeError:
+        pass
+    saved = os.environ.pop("LLM_BACKEND", None)
+    try:
+        try:
+            LLMService(backend=FailingBackend()).generate_response(prompt)
+            raise AssertionError("Expected the backend error")
+        except ConnectionError:
+            pass
+        os.environ["LLM_BACKEND"] = "simulated"
+        assert LLMService(backend=FailingBackend()).generate_response(prompt)
+    finally:
+        os.environ.pop("LLM_BACKEND", None)
+        if saved is not None:
+            os.environ["LLM_BACKEND"] = saved
+    print("✅ Errors raised by default; simulator answers only with LLM_BACKEND=simulated.")
+
 if __name__ == "__main__":
     test_llm()
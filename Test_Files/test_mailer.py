@@ -0,0 +1,71 @@
+from core.mailer import Mailer, SMTPConfig, FAILED, PENDING, SENT, UNKNOWN
+import socket
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_pooled_delivery():
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+    except ImportError:
+        print("aiosmtpd not installed; skipping (pip install aiosmtpd).")
+        return
+
+    class Recorder(Sink):
+        def __init__(self):
+            self.received = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.received.append(envelope.rcpt_tos[0])
+            return "250 OK"
+
+    handler = Recorder()
+    port = _free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        config = SMTPConfig(server="127.0.0.1", port=port, sender="agent@example.com", starttls=False)
+        mailer = Mailer(config, workers=2, backoff=0.01)
+
+        print("\n=== TEST: Pooled SMTP delivery ===")
+        ids = [mailer.send(f"planner{i}@example.com", "Supply Chain Digest", "Body") for i in range(20)]
+        assert mailer.flush(timeout=30), "Deliveries did not finish"
+
+        assert all(mailer.status(i) == SENT for i in ids)
+        assert len(handler.received) == 20
+        # 20 emails over at most 2 pooled connections instead of 20 handshakes
+        assert mailer.pool.connections_opened <= 2, mailer.pool.connections_opened
+        print(f"✅ 20 emails sent over {mailer.pool.connections_opened} connection(s).")
+        mailer.close()
+
+        print("\n=== TEST: Finished deliveries are kept up to the history limit ===")
+        mailer = Mailer(config, workers=2, backoff=0.01, history=5)
+        ids = [mailer.send(f"planner{i}@example.com", "Supply Chain Digest", "Body") for i in range(20)]
+        assert mailer.flush(timeout=30), "Deliveries did not finish"
+        assert len(mailer.deliveries()) == 5
+        assert sum(mailer.status(i) == SENT for i in ids) == 5 and mailer.status(ids[0]) is None
+        assert mailer.wait(ids[0], timeout=0).status == UNKNOWN
+        print("✅ Only the 5 most recent finished deliveries are retained.")
+        mailer.close()
+
+        print("\n=== TEST: wait() always reports a status ===")
+        mailer = Mailer(config, workers=1, backoff=0.01)
+        broken = mailer.send("planner@example.com", "Supply Chain Digest", None)
+        delivery = mailer.wait(broken, timeout=10)
+        assert delivery.status == FAILED and delivery.attempts == 1 and delivery.error
+        mailer.close()
+        unreachable = Mailer(SMTPConfig(server="127.0.0.1", port=_free_port(), starttls=False, timeout=1),
+                             workers=1, max_attempts=2, backoff=0.5)
+        slow = unreachable.send("planner@example.com", "Supply Chain Digest", "Body")
+        assert unreachable.wait(slow, timeout=0.1).status == PENDING
+        assert unreachable.wait(slow, timeout=10).status == FAILED
+        unreachable.close()
+        print("✅ Unbuildable message failed; in-flight delivery reported as pending.")
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    test_pooled_delivery()
@@ -0,0 +1,37 @@
+from core.multi_sku import MultiSkuRunner
+from core.llm_service import SimulatedBackend
+import pandas as pd
+import json
+
+class DropLastItem(SimulatedBackend):
+    """Simulator that leaves the last SKU out of every multi-SKU answer."""
+    def chat(self, model, messages, tools=None, **kwargs):
+        response = super().chat(model, messages, tools, **kwargs)
+        message = response.choices[0].message
+        data = json.loads(message.content)
+        if len(data["results"]) > 1:
+            data["results"] = data["results"][:-1]
+            message.content = json.dumps(data)
+        return response
+
+def test_multi_sku_batches():
+    rows = pd.read_csv("data/inventory_data_real.csv").to_dict(orient="records")
+
+    print("\n=== TEST: Batch size follows the token budget ===")
+    wide = MultiSkuRunner(SimulatedBackend(), budget=8000)
+    narrow = MultiSkuRunner(SimulatedBackend(), budget=1500)
+    a = wide.run_stage("Monitoring Agent", rows)
+    b = narrow.run_stage("Monitoring Agent", rows)
+    assert a == b and len(a) == len(rows)
+    assert wide.stats["requests"] < narrow.stats["requests"] < len(rows)
+    print(f"✅ {len(rows)} SKUs in {wide.stats['requests']} vs {narrow.stats['requests']} requests.")
+
+    print("\n=== TEST: Missing items are re-run on their own ===")
+    flaky = MultiSkuRunner(DropLastItem(), budget=1500)
+    c = flaky.run_stage("Monitoring Agent", rows)
+    assert c == a
+    assert flaky.stats["reruns"] == narrow.stats["requests"] and flaky.stats["failed"] == 0
+    print(f"✅ {flaky.stats['reruns']} items recovered by single-SKU re-runs.")
+
+if __name__ == "__main__":
+    test_multi_sku_batches()
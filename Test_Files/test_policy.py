@@ -0,0 +1,41 @@
+from core.policy import PolicyEngine, policy_row
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+def test_reorder_policy():
+    print("\n=== TEST: Safety stock and reorder point ===")
+    row = {"SKU_ID": "X-1", "Category": "Personal Care", "Forecast": 300, "Supplier_Lead_Time": 10,
+           "Demand_CV": 0.4, "Current_Stock": 50, "On_Order": 0}
+    policy = policy_row(row)
+    d, z = 10.0, NormalDist().inv_cdf(0.98)
+    expected_ss = z * np.sqrt(10 * (0.4 * d) ** 2 + d ** 2 * (0.25 * 10) ** 2)
+    assert policy["Service_Level"] == 0.98
+    assert policy["Safety_Stock"] == np.ceil(expected_ss)
+    assert policy["Reorder_Point"] == 100 + policy["Safety_Stock"]
+    assert policy["Suggested_Order"] == policy["Order_Up_To"] - 50  # position 50 is below the reorder point
+    print(f"  {policy}")
+
+    longer = policy_row({**row, "Supplier_Lead_Time": 30})
+    steadier = policy_row({**row, "Demand_CV": 0.1})
+    assert longer["Reorder_Point"] > policy["Reorder_Point"] and steadier["Safety_Stock"] < policy["Safety_Stock"]
+    assert policy_row({**row, "Current_Stock": 1000})["Suggested_Order"] == 0
+    print("✅ Policy follows lead time, variability and service level.")
+
+    print("\n=== TEST: Incremental policy updates ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    engine = PolicyEngine(df)
+    sku = df.iloc[0]["SKU_ID"]
+    assert engine.update_row({"SKU_ID": sku, "Current_Stock": 0, "On_Order": 5})
+    df.loc[0, "Current_Stock"], df.loc[0, "On_Order"] = 0, 5
+    pd.testing.assert_frame_equal(engine.frame(), PolicyEngine(df).frame())
+
+    toys = int((df["Category"] == "Toys").sum())
+    assert engine.set_service_levels({"Toys": 0.99, "Home": engine.levels["Home"]}) == toys
+    assert (engine.frame().loc[df.loc[df["Category"] == "Toys", "SKU_ID"], "Service_Level"] == 0.99).all()
+    due = engine.reorder_now(5)
+    assert (due["Inventory_Position"] <= due["Reorder_Point"]).all()
+    print("✅ Row and service-level updates match a full rebuild.")
+
+if __name__ == "__main__":
+    test_reorder_policy()
@@ -0,0 +1,74 @@
+from core.profiling import Profiler
+from core.orchestrator import Orchestrator
+from core.batch import run_batch
+from core.llm_service import SimulatedBackend
+import json
+import os
+import tempfile
+import threading
+import pandas as pd
+
+class ThreadRecorder:
+    # Records which threads ran SKUs; no pipeline
+    def __init__(self):
+        self.threads = set()
+
+    def run(self, sku_data, full_inventory=None):
+        self.threads.add(threading.get_ident())
+        return {"SKU_ID": sku_data["SKU_ID"], "status": "Healthy"}
+
+def test_profiled_run():
+    print("\n=== TEST: Per-stage profile of a run ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    sku_data = df[df["SKU_ID"] == "P-142"].iloc[0].to_dict()
+    root = tempfile.mkdtemp()
+
+    # Some latency for the call threads to be sampled in
+    orchestrator = Orchestrator(llm=SimulatedBackend(latency=0.05), profiler=Profiler(root, interval=0.002))
+    result = orchestrator.run(sku_data)
+
+    profile = result["profile"]
+    stages = profile["stages"]
+    assert list(stages)[0] == "Build Context" and "Communication Agent" in stages
+    assert all(s["wall_ms"] > 0 and "alloc_kb" in s for s in stages.values())
+    for name in ("stacks.folded", "cpu.txt", "memory.txt", "summary.json"):
+        assert os.path.exists(os.path.join(profile["dir"], name)), name
+
+    with open(os.path.join(profile["dir"], "stacks.folded")) as f:
+        stacks = [line.rsplit(" ", 1) for line in f.read().splitlines()]
+    assert all(count.isdigit() for _, count in stacks)
+    assert any(stack.startswith("Forecast Agent;") and "[call thread]" in stack for stack, _ in stacks)
+    assert all(stack.split(";")[1].startswith("Orchestrator.run") for stack, _ in stacks if "[call thread]" not in stack)
+    with open(os.path.join(profile["dir"], "summary.json")) as f:
+        assert json.load(f)["stages"] == stages
+    assert profile["memory_scope"] == "process" and not any("concurrent_runs" in s for s in stages.values())
+    print(f"✅ {profile['samples']} samples over {len(stages)} stages in {profile['dir']}")
+
+    print("\n=== TEST: Memory figures shared with a concurrent run are flagged ===")
+    profiler = Profiler(root, interval=0.01)
+    first, second = profiler.start("first"), profiler.start("second")
+    with first.stage("Build Context"):
+        pass
+    second.finish()
+    summary = first.finish()
+    assert summary["stages"]["Build Context"]["concurrent_runs"] == 1
+    with open(os.path.join(summary["dir"], "memory.txt")) as f:
+        assert f.readline().startswith("Process-wide") and "overlapped 1 other profiled run" in f.read()
+    print("✅ Overlapping stage marked in summary and memory.txt.")
+
+    print("\n=== TEST: Profiled batch runs one SKU at a time ===")
+    data_file = os.path.join(root, "inventory.csv")
+    df.head(8).to_csv(data_file, index=False)
+    recorder = ThreadRecorder()
+    run_batch(data_file, os.path.join(root, "results.jsonl"), concurrency=4, orchestrator=recorder, profile=root)
+    assert len(recorder.threads) == 1
+    print("✅ Concurrency dropped to 1 while profiling.")
+
+    print("\n=== TEST: Profiling off ===")
+    os.environ.pop("SC_PROFILE", None)
+    plain = Orchestrator(llm=SimulatedBackend())
+    assert plain.profiler is None and "profile" not in plain.run(sku_data)
+    print("✅ No profile without a profiler.")
+
+if __name__ == "__main__":
+    test_profiled_run()
@@ -0,0 +1,40 @@
+from core.orchestrator import Orchestrator
+from core.prompts import build_prompt
+from agents.inventory_agent import inventory_agent, INVENTORY_INSTRUCTIONS
+from agents.root_cause_agent import root_cause_agent, ROOT_CAUSE_INSTRUCTIONS
+import pandas as pd
+
+def test_prompt_builder():
+    df = pd.read_csv("data/inventory_data_real.csv")
+    orchestrator = Orchestrator()
+
+    print("\n=== TEST: Static prefix is shared across SKUs ===")
+    for agent, static in ((inventory_agent, INVENTORY_INSTRUCTIONS), (root_cause_agent, ROOT_CAUSE_INSTRUCTIONS)):
+        texts = [orchestrator.instructions_for(agent, orchestrator.build_context(row)).text
+                 for row in df.head(3).to_dict(orient="records")]
+        assert all(t.startswith(static.rstrip()) for t in texts), agent.name
+        assert len(set(texts)) == 3
+    print("✅ Dynamic values come after the static instructions.")
+
+    print("\n=== TEST: Inventory table holds only the same product ===")
+    row = df[df["SKU_ID"] == "P-142"].iloc[0].to_dict()
+    prompt = orchestrator.instructions_for(inventory_agent, orchestrator.build_context(row))
+    table = prompt.text.split("Other Locations:\n", 1)[1].strip().splitlines()
+    same_product = set(df[df["Product_Name"] == row["Product_Name"]]["SKU_ID"]) - {"P-142"}
+    assert {line.split("|")[0] for line in table[1:]} == same_product
+    assert "{" not in prompt.text and not prompt.over_budget
+    print(f"✅ {prompt.table_rows} rows, {prompt.tokens}/{prompt.budget} tokens.")
+
+    print("\n=== TEST: Table rows are dropped to fit the budget ===")
+    rows = [{"SKU_ID": f"X-{i}", "Location": "NJ", "Current_Stock": i, "Forecast": 10, "On_Order": 0, "Surplus": i - 10}
+            for i in range(200)]
+    small = build_prompt("Inventory Agent", INVENTORY_INSTRUCTIONS, table=rows, budget=300)
+    assert small.tokens <= 300 and small.dropped_rows > 0
+    assert "X-0|" in small.text  # earlier (more relevant) rows are kept
+    one_more = build_prompt("Inventory Agent", INVENTORY_INSTRUCTIONS, table=rows[:small.table_rows + 1], budget=10_000)
+    assert one_more.tokens > 300, "As many rows as fit are kept"
+    assert build_prompt("Inventory Agent", INVENTORY_INSTRUCTIONS, table=rows, budget=1).table_rows == 0
+    print(f"✅ Kept {small.table_rows} of {len(rows)} rows.")
+
+if __name__ == "__main__":
+    test_prompt_builder()
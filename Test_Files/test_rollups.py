@@ -0,0 +1,55 @@
+from core.rollups import PortfolioRollup
+from core.simulation import SimulationConfig
+import numpy as np
+import pandas as pd
+
+def test_incremental_rollup():
+    df = pd.read_csv("data/inventory_data_real.csv")
+    rollup = PortfolioRollup(df)
+
+    print("\n=== TEST: Portfolio Rollup ===")
+    print(rollup.heatmap("weeks_of_supply").round(2))
+
+    # Simulate a stock-out landing on one SKU and compare against a full rebuild
+    row = df.iloc[0].to_dict()
+    row["Current_Stock"] = 0
+    row["On_Order"] = 10
+    assert rollup.update_row(row)
+
+    df.loc[0, "Current_Stock"] = 0
+    df.loc[0, "On_Order"] = 10
+    rebuilt = PortfolioRollup(df)
+
+    for name, values in rollup.sums.items():
+        assert np.allclose(values, rebuilt.sums[name]), f"Rollup '{name}' drifted from rebuild"
+
+    top = rollup.top_at_risk(5)
+    assert top.iloc[0]["SKU_ID"] == row["SKU_ID"], "Emptied SKU should have the largest deficit"
+    print("✅ Incremental update matches full rebuild.")
+
+    print("\n=== TEST: Incremental update with simulated stock-out risk ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    config = SimulationConfig(n_samples=200)
+    simulated = PortfolioRollup(df, simulation=config)
+    assert simulated.update_row(row), "update_row must be able to write the simulated columns"
+    df.loc[0, "Current_Stock"] = 0
+    df.loc[0, "On_Order"] = 10
+    rebuilt = PortfolioRollup(df, simulation=config)
+    for name, values in simulated.sums.items():
+        assert np.allclose(values, rebuilt.sums[name]), f"Simulated rollup '{name}' drifted from rebuild"
+    assert simulated.sku_simulation(row["SKU_ID"]) == rebuilt.sku_simulation(row["SKU_ID"])
+    print("✅ Simulated rollup update matches full rebuild.")
+
+    print("\n=== TEST: Updates keep the SKU's own demand variability ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    df["Demand_CV"] = 1.2  # far from the 0.35 default
+    volatile = PortfolioRollup(df, simulation=SimulationConfig(n_samples=400))
+    i = volatile.sku_position("P-200")
+    before = volatile.p_stockout[i]
+    # Rows from the inventory file or a delta carry no Demand_CV
+    assert volatile.update_row({k: v for k, v in df.iloc[i].to_dict().items() if k != "Demand_CV"})
+    assert abs(volatile.p_stockout[i] - before) < 0.1, (before, volatile.p_stockout[i])
+    print(f"✅ P-200 P(stock-out) {before:.2f} -> {volatile.p_stockout[i]:.2f} after a no-op update.")
+
+if __name__ == "__main__":
+    test_incremental_rollup()
@@ -0,0 +1,44 @@
+from core.scenarios import Scenario, matrix, pivot, run_scenarios, scenario_grid, summary
+from core.policy import PolicyEngine
+from core.risk import classify_coverage, coverage, deficit_units
+from core.simulation import SimulationConfig
+import numpy as np
+import pandas as pd
+
+def test_scenario_sweep():
+    print("\n=== TEST: Scenario x SKU sweep ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    scenarios = [Scenario()] + scenario_grid(shocks=(-0.2, 0.0, 0.2), slips=(0, 7))
+    frame = run_scenarios(df, scenarios)
+    assert len(frame) == len(scenarios) * len(df)
+    assert matrix(frame, "Deficit").shape == (len(scenarios), len(df))
+    assert list(summary(frame).index) == [s.name for s in scenarios]
+
+    # As-is scenario matches the single-SKU rules and the policy engine
+    base = frame.loc["As-is"].reindex(df["SKU_ID"])
+    rules = df.apply(lambda r: classify_coverage(coverage(r["Current_Stock"], r["Forecast"])), axis=1)
+    deficits = df.apply(lambda r: deficit_units(r["Current_Stock"], r["Forecast"], r["On_Order"]), axis=1)
+    assert (base["Risk"].to_numpy() == rules.to_numpy()).all()
+    assert np.allclose(base["Deficit"].to_numpy(), deficits.to_numpy())
+    assert np.allclose(base["Suggested_Order"].to_numpy(), PolicyEngine(df).frame()["Suggested_Order"].to_numpy())
+    print(f"✅ {len(frame)} scenario x SKU rows; as-is scenario matches the per-SKU rules.")
+
+    print("\n=== TEST: Scenario effects ===")
+    row = df.set_index("SKU_ID").loc["P-142"]
+    assert frame.loc[("Winter, demand +20%", "P-142"), "Deficit"] >= frame.loc[("Winter", "P-142"), "Deficit"]
+    assert frame.loc[("Winter, lead +7d", "P-142"), "Supplier_Lead_Time"] == row["Supplier_Lead_Time"] + 7
+    # P-142 is a Winter product: unchanged as Winter, far less December demand as a Summer one
+    assert frame.loc[("Winter", "P-142"), "Forecast"] == row["Forecast"]
+    assert frame.loc[("Summer", "P-142"), "Forecast"] < row["Forecast"]
+    by_category = pivot(frame, "Stockout_Risk", "Category")
+    assert by_category.loc["Winter, demand +20%"].sum() >= by_category.loc["Winter, demand -20%"].sum()
+    print("✅ Shocks and slips move deficits and lead times as expected.")
+
+    print("\n=== TEST: Simulated stock-out probability ===")
+    simulated = run_scenarios(df, scenario_grid(shocks=(0.0, 0.5)), simulation=SimulationConfig(n_samples=100))
+    assert simulated["p_stockout"].between(0, 1).all()
+    assert simulated.xs("Winter, demand +50%")["p_stockout"].mean() > simulated.xs("Winter")["p_stockout"].mean()
+    print("✅ Stock-out probability rises with demand.")
+
+if __name__ == "__main__":
+    test_scenario_sweep()
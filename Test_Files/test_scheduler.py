@@ -0,0 +1,48 @@
+from core.scheduler import UrgencyQueue, urgency, urgency_scores
+from core.batch import iter_by_urgency
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+def test_urgency_order():
+    print("\n=== TEST: Urgency score ===")
+    base = {"Forecast": 300, "Current_Stock": 50, "On_Order": 0, "Supplier_Lead_Time": 10}  # 5 days cover
+    healthy = urgency({**base, "Current_Stock": 3000})
+    short = urgency(base)
+    shorter = urgency({**base, "Supplier_Lead_Time": 20})
+    bigger = urgency({**base, "Forecast": 3000, "Current_Stock": 500})  # same 5 days cover, 10x the units
+    assert healthy < 0 < short < shorter and bigger > short
+    df = pd.read_csv("data/inventory_data_real.csv")
+    assert np.allclose(urgency_scores(df), [urgency(row) for row in df.to_dict(orient="records")])
+    print(f"✅ healthy={healthy:.1f} short={short:.1f} shorter={shorter:.1f} bigger deficit={bigger:.1f}")
+
+    print("\n=== TEST: Queue order and mid-sweep updates ===")
+    rows = df.to_dict(orient="records")
+    queue = UrgencyQueue(rows)
+    first = queue.pop()
+    assert urgency(first) == max(urgency_scores(df))
+    calm = min((r for r in rows if r["Forecast"] > 0), key=urgency)
+    assert queue.update({"SKU_ID": calm["SKU_ID"], "Current_Stock": 0, "On_Order": 0, "Supplier_Lead_Time": 90})
+    assert queue.pop()["SKU_ID"] == calm["SKU_ID"], "A SKU that just ran dry jumps the queue"
+    assert not queue.update({"SKU_ID": first["SKU_ID"], "Current_Stock": 0})
+    assert len(queue) == len(rows) - 2
+    order = [urgency(queue.pop()) for _ in range(len(queue))]
+    assert order == sorted(order, reverse=True)
+    print(f"✅ Most urgent first ({first['SKU_ID']}); updated SKU re-prioritized.")
+
+    print("\n=== TEST: Batch re-reads a changed inventory file ===")
+    path = os.path.join(tempfile.mkdtemp(), "inventory.csv")
+    df.to_csv(path, index=False)
+    rows_iter = iter_by_urgency(path, lambda: pd.read_csv(path).to_dict(orient="records"))
+    next(rows_iter)
+    df.loc[df["SKU_ID"] == calm["SKU_ID"], ["Current_Stock", "On_Order", "Supplier_Lead_Time"]] = [0, 0, 90]
+    time.sleep(0.01)
+    df.to_csv(path, index=False)
+    os.utime(path, (time.time() + 5,) * 2)
+    assert next(rows_iter)["SKU_ID"] == calm["SKU_ID"]
+    print("✅ Waiting SKUs are re-scored when the inventory file changes.")
+
+if __name__ == "__main__":
+    test_urgency_order()
@@ -0,0 +1,40 @@
+from core.orchestrator import Orchestrator
+from core.llm_service import SimulatedBackend
+from core.schemas import DecisionError, parse_decision
+import pandas as pd
+
+def test_structured_decisions():
+    print("\n=== TEST: Decision validation ===")
+    ok = parse_decision("Monitoring Agent", '{"status": "Risk", "risk_type": "Stock-out Risk", "rationale": "low"}')
+    assert ok["risk_type"] == "Stock-out Risk"
+    bad = [
+        "not json",
+        '{"status": "Risk", "risk_type": null, "rationale": "x"}',            # Risk needs a risk type
+        '{"status": "Fine", "risk_type": null, "rationale": "x"}',            # not in enum
+        '{"po_qty": "100", "rationale": "x"}',                                 # wrong agent's field
+    ]
+    for content in bad:
+        try:
+            parse_decision("Monitoring Agent", content)
+            assert False, content
+        except DecisionError as e:
+            print(f"  rejected: {e}")
+    try:
+        parse_decision("Procurement Agent", '{"po_qty": -5, "rationale": "x"}')
+        assert False
+    except DecisionError:
+        pass
+    print("✅ Invalid decisions are rejected.")
+
+    print("\n=== TEST: Run results come from decisions ===")
+    df = pd.read_csv("data/inventory_data_real.csv")
+    orchestrator = Orchestrator(llm=SimulatedBackend())
+    res = orchestrator.run(df[df["SKU_ID"] == "P-104"].iloc[0].to_dict())  # Forecast 149 vs trend 279
+    assert res["status"] == "Risk" and res["risk_type"] == "Stock-out Risk"
+    assert res["new_forecast"] == 279
+    # One call per agent, plus one for the root cause agent's research
+    assert res["usage"]["llm_calls"] <= len(orchestrator.agents) + 1
+    print(f"✅ status={res['status']}, new_forecast={res['new_forecast']}, {res['usage']['llm_calls']} LLM calls.")
+
+if __name__ == "__main__":
+    test_structured_decisions()
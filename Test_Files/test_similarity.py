@@ -0,0 +1,67 @@
+from core.similarity import RootCauseIndex
+from core.orchestrator import Orchestrator
+from core.llm_service import SimulatedBackend
+import tempfile
+import time
+import pandas as pd
+
+class CountingBackend(SimulatedBackend):
+    def __init__(self):
+        super().__init__()
+        self.agents_called = []
+
+    def chat(self, model, messages, tools=None, **kwargs):
+        self.agents_called.append(self._agent(messages))
+        return super().chat(model, messages, tools=tools, **kwargs)
+
+def test_similarity_index():
+    print("\n=== TEST: Nearest past root-cause conclusions ===")
+    df = pd.read_csv("data/inventory_data_real.csv").set_index("SKU_ID", drop=False)
+    root = tempfile.mkdtemp()
+    # Scores depend on what else is stored; thresholds set for this small index
+    index = RootCauseIndex(root, skip_threshold=0.8)
+    index.add(df.loc["P-139"].to_dict(), "Viral demand for sneakers.", "Stock-out Risk")
+    index.add(df.loc["P-133"].to_dict(), "Early summer heat wave.", "Stock-out Risk")
+
+    matches = index.search(df.loc["P-140"].to_dict(), "Stock-out Risk")
+    assert [m.sku_id for m in matches] == ["P-139", "P-133"]
+    assert matches[0].score > 0.8 > matches[1].score
+    assert index.lookup(df.loc["P-140"].to_dict(), "Stock-out Risk")[0] == "skip"
+    # Different risk: no longer safe to skip
+    assert index.lookup(df.loc["P-140"].to_dict(), "Overstock Risk")[0] != "skip"
+    assert index.search(df.loc["P-139"].to_dict(), "Stock-out Risk")[0].sku_id == "P-133"  # never itself
+    assert index.search(df.loc["P-140"].to_dict(), "Stock-out Risk", now=time.time() + 60 * 86400) == []
+
+    reloaded = RootCauseIndex(root, skip_threshold=0.8)
+    assert len(reloaded) == 2 and reloaded.search(df.loc["P-140"].to_dict(), "Stock-out Risk")[0].score == matches[0].score
+    print(f"✅ P-140 -> {matches[0].sku_id} ({matches[0].score}), reloaded from disk.")
+
+    print("\n=== TEST: Index grows and compacts without rewriting on every add ===")
+    rows = df.to_dict(orient="records")
+    for rerun in range(3):
+        for row in rows:
+            reloaded.add(row, f"Conclusion {rerun}", "Stock-out Risk")
+    assert len(reloaded) == len(rows) and reloaded.vectors.shape[0] >= len(rows)
+    assert reloaded._log_lines <= 2 * len(rows) + 64, "Superseded log lines are compacted away"
+    again = RootCauseIndex(root, skip_threshold=0.8)
+    assert len(again) == len(rows) and {e["root_cause"] for e in again.entries} == {"Conclusion 2"}
+    probe = df.loc["P-140"].to_dict()
+    assert again.search(probe, "Stock-out Risk")[0].score == reloaded.search(probe, "Stock-out Risk")[0].score
+    print(f"✅ {len(again)} entries in {again.vectors.shape[0]} rows after {3 * len(rows)} adds.")
+
+    print("\n=== TEST: Root Cause Agent skipped on a close match ===")
+    backend = CountingBackend()
+    orchestrator = Orchestrator(llm=backend, similarity=RootCauseIndex(tempfile.mkdtemp(), skip_threshold=0.8))
+    first = orchestrator.run(df.loc["P-139"].to_dict())
+    assert "root_cause_reuse" not in first and len(orchestrator.similarity) == 1
+
+    backend.agents_called.clear()
+    second = orchestrator.run(df.loc["P-140"].to_dict())
+    assert second["root_cause_reuse"]["mode"] == "skip" and second["root_cause_reuse"]["sku_id"] == "P-139"
+    assert second["root_cause"] == first["root_cause"]
+    assert "Root Cause Agent" not in backend.agents_called and "Inventory Agent" in backend.agents_called
+    assert len(orchestrator.similarity) == 1  # reused conclusions are not stored again
+    print(f"✅ P-140 reused: {second['root_cause']}")
+
+if __name__ == "__main__":
+    test_similarity_index()
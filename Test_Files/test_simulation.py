@@ -0,0 +1,50 @@
+from core.simulation import SimulationConfig, SIM_COLUMNS, simulate, simulate_row
+from core.risk import classify_row, STOCKOUT_RISK
+from core.rollups import PortfolioRollup
+import numpy as np
+import pandas as pd
+
+def test_monte_carlo_stockout():
+    print("\n=== TEST: Monte Carlo stock-out engine ===")
+    config = SimulationConfig(n_samples=500, horizon_days=60)
+    base = {"Current_Stock": 100, "Forecast": 300, "On_Order": 0}
+
+    short_lead = simulate_row({**base, "Supplier_Lead_Time": 3}, config)
+    long_lead = simulate_row({**base, "Supplier_Lead_Time": 30}, config)
+    print(f"  lead 3d: {short_lead}\n  lead 30d: {long_lead}")
+    assert long_lead["p_stockout"] > short_lead["p_stockout"], "Longer lead time should raise stock-out odds"
+    assert long_lead["expected_shortfall"] > 0
+    assert long_lead["days_to_stockout_p10"] <= long_lead["days_to_stockout_p50"] <= long_lead["days_to_stockout_p90"]
+
+    # 10 units a day against 100 on hand runs out around day 10
+    assert 8 <= long_lead["days_to_stockout_p50"] <= 12
+
+    # On-order stock landing within the lead time helps
+    covered = simulate_row({**base, "On_Order": 1000, "Supplier_Lead_Time": 30}, config)
+    assert covered["p_stockout"] < long_lead["p_stockout"]
+
+    # A tiny memory budget forces one SKU per chunk; results stay aligned with the input
+    df = pd.read_csv("data/inventory_data_real.csv").head(12)
+    df.index = df.index + 100
+    tiny = SimulationConfig(n_samples=200, horizon_days=60, memory_budget_mb=0.01)
+    assert tiny.chunk_size() == 1
+    sim = simulate(df, tiny)
+    assert list(sim.columns) == SIM_COLUMNS and list(sim.index) == list(df.index)
+    assert sim["p_stockout"].between(0, 1).all()
+    print("✅ Stock-out probability, shortfall and days-to-stock-out look right.")
+
+    print("\n=== TEST: Simulation feeds risk and rollups ===")
+    # Coverage 1.0 is healthy on the coverage rule, but not with a 45-day lead time
+    row = {"Current_Stock": 300, "Forecast": 300, "On_Order": 0, "Supplier_Lead_Time": 45}
+    row.update(simulate_row(row, config))
+    assert classify_row(row) == STOCKOUT_RISK
+
+    full = pd.read_csv("data/inventory_data_real.csv")
+    rollup = PortfolioRollup(full, simulation=config)
+    assert rollup.totals()["stockout_skus"] >= PortfolioRollup(full).totals()["stockout_skus"]
+    assert "P(Stock-out)" in rollup.top_at_risk(5).columns
+    assert np.isfinite(rollup.heatmap("weeks_of_supply").values).any()
+    print("✅ Simulated probabilities flag lead-time risk on top of coverage.")
+
+if __name__ == "__main__":
+    test_monte_carlo_stockout()
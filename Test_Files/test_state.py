@@ -0,0 +1,35 @@
+from core.state import AgentState, BatchState
+from core.risk import HEALTHY, classify_row
+import pandas as pd
+
+def test_batch_state():
+    df = pd.read_csv("data/inventory_data_real.csv").head(200)
+
+    print("\n=== TEST: Columnar rules match the per-row rules ===")
+    batch = BatchState.from_dataframe(df)
+    batch.classify_rules()
+    frame = batch.to_frame()
+    for row, status, risk_type in zip(df.to_dict(orient="records"), frame["status"], frame["risk_type"]):
+        expected = classify_row(row)
+        assert status == ("Healthy" if expected == HEALTHY else "Risk"), row["SKU_ID"]
+        assert (pd.isna(risk_type) if expected == HEALTHY else risk_type == expected), row["SKU_ID"]
+    tally = batch.tally()
+    assert tally["Healthy"] + tally["Risk"] == len(df) and tally["Unknown"] == 0
+    print(f"✅ {len(df)} SKUs classified in one pass: {tally}")
+
+    print("\n=== TEST: Results round-trip through the columns ===")
+    row = df.iloc[0].to_dict()
+    sku = str(row["SKU_ID"])
+    result = {"status": "Risk", "risk_type": "Stock-out Risk", "po_qty": 120, "transfer_qty": None,
+              "new_forecast": 95, "root_cause": "Promotion", "final_summary": "Reorder 120 units."}
+    batch.set_result(sku, result)
+    back = batch.to_result(sku)
+    for key, value in result.items():
+        assert back[key] == value, key
+    assert back["Current_Stock"] == int(row["Current_Stock"]) and back["Location"] == row["Location"]
+    state = batch.to_state(sku)
+    assert isinstance(state, AgentState) and state.po_qty == 120 and state.root_cause == "Promotion"
+    print("✅ set_result / to_result / to_state agree.")
+
+if __name__ == "__main__":
+    test_batch_state()
@@ -0,0 +1,75 @@
+from core.work_queue import SQLiteWorkQueue, WorkQueue
+from core.worker import Worker
+import os
+import pandas as pd
+import sqlite3
+import tempfile
+import time
+
+class StubOrchestrator:
+    # Stands in for the LLM pipeline so the queue mechanics can be tested offline
+    data_file = None
+
+    def run(self, sku_data):
+        return {"SKU_ID": sku_data["SKU_ID"], "status": "Healthy"}
+
+class StalledOrchestrator(StubOrchestrator):
+    # Takes so long on its first SKU that the shard is handed to another worker meanwhile
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def run(self, sku_data):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE shards SET owner = 'other-worker'")
+        return super().run(sku_data)
+
+def test_lease_reassignment():
+    db_path = os.path.join(tempfile.mkdtemp(), "queue.db")
+    queue = SQLiteWorkQueue(db_path)
+    sku_ids = ["P-101", "P-102", "P-103", "P-104", "P-105"]
+    assert queue.enqueue(sku_ids, shard_size=2, data_file="data/inventory_data_real.csv") == 3
+
+    print("\n=== TEST: Crashed worker's shard is reassigned ===")
+    crashed = queue.claim("crashed-worker", lease_seconds=0.1)
+    assert queue.put_result(crashed.shard_id, "crashed-worker", crashed.sku_ids[0], {"SKU_ID": crashed.sku_ids[0], "status": "Healthy"})
+    time.sleep(0.2)  # Let the lease lapse without a heartbeat
+
+    worker = Worker(queue, lease_seconds=5, orchestrator=StubOrchestrator())
+    processed = worker.run()
+
+    stats = queue.stats()
+    print(stats)
+    assert stats["done"] == 3 and stats["results"] == 5
+    assert processed == 4, "The SKU finished before the crash should not be re-run"
+    assert not queue.heartbeat(crashed.shard_id, "crashed-worker", 5), "Old owner must lose the lease"
+    assert not queue.put_result(crashed.shard_id, "crashed-worker", crashed.sku_ids[1], {"SKU_ID": crashed.sku_ids[1], "error": "late"})
+    assert not any("error" in r for r in queue.results()), "Old owner's late result is refused"
+    print("✅ Expired shard was reclaimed and completed.")
+
+    print("\n=== TEST: Results are dropped once the lease is lost ===")
+    stalled_db = os.path.join(tempfile.mkdtemp(), "queue.db")
+    stalled = SQLiteWorkQueue(stalled_db)
+    stalled.enqueue(["P-101", "P-102"], shard_size=2, data_file="data/inventory_data_real.csv")
+    assert Worker(stalled, lease_seconds=5, orchestrator=StalledOrchestrator(stalled_db)).run() == 0
+    assert stalled.stats()["results"] == 0 and stalled.stats()["leased"] == 1
+    print("✅ Worker stopped without writing over the new owner's shard.")
+
+    print("\n=== TEST: Numeric SKU IDs are found ===")
+    data_file = os.path.join(tempfile.mkdtemp(), "inventory.csv")
+    df = pd.read_csv("data/inventory_data_real.csv").head(3)
+    df["SKU_ID"] = [101, 102, 103]  # pandas reads these back as integers
+    df.to_csv(data_file, index=False)
+    numeric = SQLiteWorkQueue(os.path.join(tempfile.mkdtemp(), "queue.db"))
+    numeric.enqueue([str(s) for s in df["SKU_ID"]], shard_size=3, data_file=data_file)
+    assert Worker(numeric, lease_seconds=5, orchestrator=StubOrchestrator()).run() == 3
+    assert not any("error" in r for r in numeric.results())
+    print("✅ Integer SKU_IDs in the file matched the queued string IDs.")
+
+    try:
+        WorkQueue()
+        raise AssertionError("WorkQueue is abstract")
+    except TypeError:
+        pass
+
+if __name__ == "__main__":
+    test_lease_reassignment()
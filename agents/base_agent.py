@@ -5,8 +5,12 @@ class Agent:
                  name: str, 
                  model: str = "gpt-4o", 
                  instructions: Union[str, Callable[[], str]] = "You are a helpful agent.", 
-                 tools: List[Callable] = None):
+                 tools: List[Callable] = None,
+                 actions: List[Callable] = None):
         self.name = name
         self.model = model
         self.instructions = instructions
+        # Tools the model may call (research). Actions are run by the orchestrator
+        # from the agent's structured decision, without another LLM round-trip.
         self.tools = tools or []
+        self.actions = actions or []
@@ -1,24 +1,39 @@
 from .base_agent import Agent
 from .tools import send_email
+from core.prompts import build_prompt
 
-def email_instructions(context_variables):
-    summary = context_variables.get("summary", "No summary provided.")
-    logs = context_variables.get("logs", [])
-    recipient = context_variables.get("user_email", "unknown@example.com")
-    
-    return f"""You are an Email Reporting Agent.
+EMAIL_INSTRUCTIONS = """You are an Email Reporting Agent.
 Your job is to send a professional supply chain status report to the user.
 
-1. Format a clear email body based on the 'summary' and key insights from the 'logs'.
+1. Format a clear email body based on the 'Summary' and the 'Key Actions' recorded by the agents.
 2. Use a subject line like: "Supply Chain Alert: [Product Name] - [Status]".
-3. Use the 'send_email' tool to send the report to: {recipient}.
+3. Use the 'send_email' tool to send the report to the Recipient in the context.
 4. Confirm to the user that the email has been sent.
-
-Context:
-- Summary: {summary}
-- Recipient: {recipient}
 """
 
+def _key_events(events, limit=12):
+    # Tool actions and errors are what the report needs; narrative messages are in the summary
+    rows = []
+    for event in events:
+        if event.get("kind") == "tool":
+            rows.append({"Agent": event["agent"], "Action": event["tool"], "Result": event["text"]})
+        elif event.get("kind") == "error":
+            rows.append({"Agent": event["agent"], "Action": "error", "Result": event["text"]})
+    return rows[-limit:]
+
+def email_instructions(context_variables):
+    return build_prompt(
+        "Email Agent",
+        EMAIL_INSTRUCTIONS,
+        fields={
+            "Summary": context_variables.get("summary", "No summary provided."),
+            "Recipient": context_variables.get("user_email", "unknown@example.com"),
+        },
+        table=_key_events(context_variables.get("events", [])),
+        columns=["Agent", "Action", "Result"],
+        table_title="Key Actions",
+    )
+
 email_agent = Agent(
     name="Email Agent",
     model="gpt-4o",
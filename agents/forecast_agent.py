@@ -1,20 +1,39 @@
 from .base_agent import Agent
 from .tools import update_forecast
 
-def forecast_instructions(context_variables):
-    return """You are a Forecast Agent.
+FORECAST_INSTRUCTIONS = """You are a Forecast Agent.
 Your goal is to predict future demand based on sales trends and seasonality.
 
 1. Analyze the 'Sales_Trend_Last_30_Days' and 'Season'.
 2. If the product is "In Season" (e.g., Winter for Coats), expect higher demand.
 3. Compare the current 'Forecast' with recent sales.
 4. If the Forecast seems too low (e.g., < Sales Trend), recommend an increase.
-5. Use the 'update_forecast' tool to propose a new forecast number if needed.
+5. Set new_forecast to the proposed forecast number, or null if the current forecast is fine, and give a short rationale.
+
+When sales history is given: Trend Slope is the daily change in units/day over the last 30 days
+(positive = accelerating), and Seasonality Index compares this month's daily sales with the
+SKU's average (above 1 = seasonal peak). Weigh the 7-day pace against the 30-day total.
 """
 
+HISTORY_FIELDS = {
+    "Sales Last 7 Days": "Sales_7d",
+    "Sales Last 30 Days": "Sales_Trend_Last_30_Days",
+    "Sales Last 90 Days": "Sales_90d",
+    "Trend Slope": "Trend_Slope",
+    "Seasonality Index": "Seasonality_Index",
+}
+
+def forecast_instructions(context_variables):
+    fields = {label: context_variables[key] for label, key in HISTORY_FIELDS.items()
+              if context_variables.get(key) is not None and context_variables[key] == context_variables[key]}
+    if "Trend Slope" not in fields:
+        return FORECAST_INSTRUCTIONS
+    from core.prompts import build_prompt
+    return build_prompt("Forecast Agent", FORECAST_INSTRUCTIONS, fields)
+
 forecast_agent = Agent(
     name="Forecast Agent",
     model="gpt-4o",
     instructions=forecast_instructions,
-    tools=[update_forecast]
+    actions=[update_forecast]
 )
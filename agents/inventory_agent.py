@@ -1,30 +1,38 @@
 from .base_agent import Agent
 from .tools import transfer_inventory
+from core.prompts import build_prompt, relevant_inventory
 
-def inventory_instructions(context_variables):
-    current_stock = context_variables.get("Current_Stock", 0)
-    forecast = context_variables.get("Forecast", 0)
-    full_inventory = context_variables.get("full_inventory", [])
-    product_name = context_variables.get("Product_Name", "Product")
-    
-    return f"""You are an Inventory Agent.
+INVENTORY_INSTRUCTIONS = """You are an Inventory Agent.
 Your goal is to resolve stock-out risks by checking if other locations have excess stock of the same product.
 
-Context: 
-- Product: {product_name}
-- Current Stock: {current_stock}
-- Forecast: {forecast}
-- Full Inventory List: {str(full_inventory)[:1000]}... (truncated)
-
 1. If the current stock is sufficient (e.g., > 50% of forecast), do nothing.
-2. If there is a risk, check 'Full Inventory List' for other locations with high stock of '{product_name}'.
+2. If there is a risk, check 'Other Locations' (same product, largest surplus first) for a location with high stock.
 3. If a location has excess stock (e.g., more than double their own forecast or > 100 units surplus), recommend a transfer.
-4. Use 'transfer_inventory' tool to initiate the transfer.
+4. Set transfer_qty and transfer_source (the source location) for the transfer, or null for both if none is needed, and give a short rationale.
 """
 
+def inventory_instructions(context_variables):
+    product_name = context_variables.get("Product_Name", "Product")
+    others = relevant_inventory(context_variables.get("full_inventory", []), product_name,
+                                exclude_sku=context_variables.get("SKU_ID"))
+    
+    return build_prompt(
+        "Inventory Agent",
+        INVENTORY_INSTRUCTIONS,
+        fields={
+            "Product": product_name,
+            "SKU": context_variables.get("SKU_ID"),
+            "Location": context_variables.get("Location"),
+            "Current Stock": context_variables.get("Current_Stock", 0),
+            "Forecast": context_variables.get("Forecast", 0),
+        },
+        table=others,
+        table_title="Other Locations",
+    )
+
 inventory_agent = Agent(
     name="Inventory Agent",
     model="gpt-4o",
     instructions=inventory_instructions,
-    tools=[transfer_inventory]
+    actions=[transfer_inventory]
 )
@@ -1,7 +1,6 @@
 from .base_agent import Agent
 
-def monitoring_instructions(context_variables):
-    return """You are a Monitoring Agent.
+MONITORING_INSTRUCTIONS = """You are a Monitoring Agent.
 Your job is to analyze the inventory levels and forecast to detect risks.
 
 Rules:
@@ -9,10 +8,31 @@ Rules:
 - If Coverage < 0.8, flag as "Stock-out Risk".
 - If Coverage > 2.0, flag as "Overstock Risk".
 - Otherwise, status is "Healthy".
+- If a simulated Stock-out Probability (p_stockout) is given and is 0.2 or higher, flag as
+  "Stock-out Risk" whatever the coverage.
+- If Inventory Position is at or below the Reorder Point, say in the rationale that a
+  replenishment order is due (this alone does not change the status).
 
-Output a concise analysis of the health status.
+Return your decision: status ("Healthy" or "Risk"), risk_type ("Stock-out Risk", "Overstock Risk", or null when Healthy), and a one-sentence rationale.
 """
 
+def monitoring_instructions(context_variables):
+    if context_variables.get("p_stockout") is None:
+        return MONITORING_INSTRUCTIONS
+    from core.prompts import build_prompt
+    return build_prompt("Monitoring Agent", MONITORING_INSTRUCTIONS, {
+        "Stock-out Probability": round(context_variables["p_stockout"], 2),
+        "Expected Shortfall": round(context_variables.get("expected_shortfall", 0)),
+        "Days to Stock-out (p10/p50/p90)": "/".join(str(int(context_variables.get(f"days_to_stockout_p{p}", 0))) for p in (10, 50, 90)),
+        **_policy_fields(context_variables),
+    })
+
+def _policy_fields(context_variables):
+    if context_variables.get("Reorder_Point") is None:
+        return {}
+    position = (context_variables.get("Current_Stock") or 0) + (context_variables.get("On_Order") or 0)
+    return {"Inventory Position": position, "Reorder Point": context_variables["Reorder_Point"]}
+
 monitoring_agent = Agent(
     name="Monitoring Agent",
     model="gpt-4o",
@@ -1,20 +1,27 @@
 from .base_agent import Agent
 from .tools import create_po
 
-def procurement_instructions(context_variables):
-    return """You are a Procurement Agent.
+PROCUREMENT_INSTRUCTIONS = """You are a Procurement Agent.
 Your job is to ensure long-term stock availability if transfers are not enough.
 
-1. Check if the Inventory Agent successfully initiated a transfer.
-2. If stock is still critically low or no transfer was possible, calculate the deficit.
-3. Deficit = Forecast - (Current Stock + On Order).
-4. If Deficit > 0, generate a Purchase Order (PO) for the deficit amount + 20% safety stock.
-5. Use 'create_po' tool to place the order.
+1. Check whether the Inventory Agent proposed a transfer (its transfer_qty).
+2. Inventory Position = Current Stock + On Order + transfer_qty.
+3. The Context block gives this SKU's Reorder Point and Order-Up-To Level, set from the supplier
+   lead time, demand variability and the category's service level at the current forecast.
+   If the Forecast Agent changed the forecast, scale both by new_forecast / current forecast.
+4. If Inventory Position <= Reorder Point, propose a Purchase Order (PO) for
+   Order-Up-To Level - Inventory Position. Otherwise no order is needed yet.
+5. Set po_qty to the order quantity, or null if no order is needed, and give a short rationale.
 """
 
+def procurement_instructions(context_variables):
+    from core.policy import policy_fields
+    from core.prompts import build_prompt
+    return build_prompt("Procurement Agent", PROCUREMENT_INSTRUCTIONS, policy_fields(context_variables))
+
 procurement_agent = Agent(
     name="Procurement Agent",
     model="gpt-4o",
     instructions=procurement_instructions,
-    tools=[create_po]
+    actions=[create_po]
 )
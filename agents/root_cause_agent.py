@@ -1,24 +1,31 @@
 from .base_agent import Agent
 from .tools import search_web, get_market_news
+from core.prompts import build_prompt
 
-def root_cause_instructions(context_variables):
-    product_name = context_variables.get("Product_Name", "Product")
-    sku_id = context_variables.get("SKU_ID", "Unknown SKU")
-    
-    return f"""You are a Root Cause Analysis Agent. 
-Your goal is to investigate supply chain issues for SKU {sku_id} ({product_name}).
+ROOT_CAUSE_INSTRUCTIONS = """You are a Root Cause Analysis Agent. 
+Your goal is to investigate supply chain issues for the SKU described in the context below.
 
 1. Use the 'search_web' tool to find real-time news about supply chain disruptions, component shortages, or logistics issues related to this product or its category.
 2. If no clear news is found, use 'get_market_news' to get market context.
 3. Analyze the provided context (Sales Trend, Forecast, Seasonality) alongside the news.
-4. Conclude with a specific, professional root cause for any risk status.
-
-Context:
-- Sales Trend: {context_variables.get('Sales_Trend_Last_30_Days')}
-- Forecast: {context_variables.get('Forecast')}
-- Season: {context_variables.get('Season')}
+4. If a Similar Past Conclusion is given, check it against the news and the figures; keep it only if it still fits.
+5. Conclude with a specific, professional root_cause for any risk status (null if the SKU is healthy) and a short rationale.
 """
 
+def root_cause_instructions(context_variables):
+    fields = {
+        "SKU": context_variables.get("SKU_ID", "Unknown SKU"),
+        "Product": context_variables.get("Product_Name", "Product"),
+        "Category": context_variables.get("Category"),
+        "Sales Trend": context_variables.get("Sales_Trend_Last_30_Days"),
+        "Forecast": context_variables.get("Forecast"),
+        "Season": context_variables.get("Season"),
+    }
+    # Draft from a similar SKU's conclusion (core.similarity), when there is one
+    if context_variables.get("similar_root_cause"):
+        fields["Similar Past Conclusion"] = context_variables["similar_root_cause"]
+    return build_prompt("Root Cause Agent", ROOT_CAUSE_INSTRUCTIONS, fields=fields)
+
 root_cause_agent = Agent(
     name="Root Cause Agent",
     model="gpt-4o",
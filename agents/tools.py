@@ -1,14 +1,17 @@
-from duckduckgo_search import DDGS
 import random
 
-def search_web(query: str, **kwargs) -> str:
+def search_web(query: str, timeout: int = 10, **kwargs) -> str:
     """
     Search the web for the given query using DuckDuckGo.
     """
     print(f"  [Tool] Searching web for: '{query}'")
     try:
+        # Imported here so agents that never search don't pay for it
+        from duckduckgo_search import DDGS
+
         results = []
-        with DDGS() as ddgs:
+        # Per-request HTTP timeout; the orchestrator's tool deadline bounds the whole call
+        with DDGS(timeout=timeout) as ddgs:
             # Get up to 3 results
             ddgs_gen = ddgs.text(query, max_results=3)
             if ddgs_gen:
@@ -56,39 +59,30 @@ def get_market_news(product_name: str, **kwargs) -> str:
     print(f"  [Tool] Found simulated news: {news}")
     return news
 
-def send_email(to_email: str, subject: str, body: str, **kwargs) -> str:
+def send_email(to_email: str, subject: str, body: str, wait: bool = True, **kwargs) -> str:
     """
     Send an email using SMTP credentials from environment variables.
     """
-    import smtplib
-    from email.mime.text import MIMEText
-    from email.mime.multipart import MIMEMultipart
     import os
+    from core.mailer import get_mailer, SENT, PENDING
     
-    sender_email = os.getenv("SMTP_EMAIL")
-    password = os.getenv("SMTP_PASSWORD")
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
-    
-    if not sender_email or not password:
+    if not os.getenv("SMTP_EMAIL") or not os.getenv("SMTP_PASSWORD"):
         return "Error: SMTP credentials (SMTP_EMAIL, SMTP_PASSWORD) not found in .env"
 
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-        
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, password)
-        text = msg.as_string()
-        server.sendmail(sender_email, to_email, text)
-        server.quit()
-        
+    # Delivery goes through the pooled background mailer; batch callers can pass wait=False
+    mailer = get_mailer()
+    message_id = mailer.send(to_email, subject, body)
+    if not wait:
+        print(f"  [Tool] Email to {to_email} queued ({message_id})")
+        return f"Email to {to_email} queued for delivery ({message_id})."
+
+    delivery = mailer.wait(message_id, timeout=120)
+    if delivery.status == PENDING:
+        # Still queued or retrying; the mailer keeps delivering in the background
+        print(f"  [Tool] Email to {to_email} still pending ({message_id})")
+        return f"Email to {to_email} still pending after 120s ({message_id}); delivery continues in the background."
+    if delivery.status == SENT:
         print(f"  [Tool] Email sent to {to_email}")
         return f"Email successfully sent to {to_email}."
-    except Exception as e:
-        print(f"  [Tool] Failed to send email: {e}")
-        return f"Failed to send email: {e}"
+    print(f"  [Tool] Failed to send email: {delivery.error}")
+    return f"Failed to send email: {delivery.error}"
@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
 import time
-import plotly.graph_objects as go
-from core.orchestrator import Orchestrator
-import graphviz
+from core.orchestrator import Orchestrator, inventory_lock
+from core.jobs import JobManager, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from core.events import load_payload
 from datetime import datetime
+# plotly, graphviz and the rollup engine are imported where they are used,
+# so each view only pays for the libraries it draws with.
 
 # --- CONFIGURATION ---
 st.set_page_config(
@@ -57,31 +59,112 @@ with col_head_2:
 st.divider()
 
 # --- DATA LOADER ---
+DATA_FILE = "data/inventory_data_real.csv"
+# Streamed deltas (core.ingest) and approved changes write the file and the cached views below
+# from other threads; reads of them go through the same lock
+data_lock = inventory_lock(DATA_FILE)
+
+@st.cache_resource
+def get_sales_history():
+    # Memory-mapped daily sales (core.history); seeded from the inventory CSV on first run
+    from core.history import open_history
+    return open_history()
+
 @st.cache_data
 def load_data():
     try:
-        return pd.read_csv("data/inventory_data_real.csv")
+        # Demand columns (30-day sales, trend slope, seasonality, demand CV) come from sales history
+        with data_lock:
+            return get_sales_history().enrich(pd.read_csv(DATA_FILE))
     except FileNotFoundError:
         st.error("❌ Data source unavailable. Check connection.")
         return pd.DataFrame()
 
+@st.cache_resource
+def get_job_manager():
+    # One worker pool shared by every session of this server process
+    return JobManager(max_workers=4)
+
 df = load_data()
 if df.empty:
     st.stop()
 
+jobs = get_job_manager()
+
+# Which LLM answers the agents (core.llm_service); the simulator is opt-in and its decisions are made up
+from core.llm_service import configured_backend
+llm_backend = configured_backend()
+if llm_backend is None:
+    st.error("❌ No LLM backend configured. Set OPENAI_API_KEY, or LLM_BACKEND=simulated for offline demo answers.")
+elif llm_backend == "simulated":
+    st.warning("🧪 Simulated LLM (LLM_BACKEND=simulated): agent decisions are generated offline for demos, not real analysis.")
+
+@st.cache_resource
+def get_portfolio_rollup():
+    # Built once with a single vectorized pass; kept current via update_row()
+    from core.rollups import PortfolioRollup
+    from core.simulation import SimulationConfig
+    return PortfolioRollup(load_data(), simulation=SimulationConfig())
+
+@st.cache_resource
+def get_policy_engine():
+    # Safety stock / reorder point / order-up-to for every SKU; kept current via update_row()
+    from core.policy import PolicyEngine
+    return PolicyEngine(load_data())
+
+@st.cache_data
+def get_sku_simulation(stock, forecast, on_order, lead_time, demand_cv=None):
+    # Monte Carlo stock-out metrics for the selected SKU (core.simulation)
+    from core.simulation import simulate_row
+    row = {"Current_Stock": stock, "Forecast": forecast, "On_Order": on_order, "Supplier_Lead_Time": lead_time}
+    if demand_cv is not None and demand_cv == demand_cv:
+        row["Demand_CV"] = demand_cv
+    return simulate_row(row)
+
+SCENARIO_SAMPLES = 200
+
+@st.cache_data
+def get_scenarios(seasons, shocks, slips):
+    # Scenario x SKU what-if results for the whole catalog in one vectorized pass (core.scenarios).
+    # Simulated stock-out probability, as in the rollup, so lead-time slips count; fewer samples per pair
+    from core.scenarios import run_scenarios, scenario_grid
+    from core.simulation import SimulationConfig
+    return run_scenarios(load_data(), scenario_grid(seasons, shocks, slips), simulation=SimulationConfig(n_samples=SCENARIO_SAMPLES))
+
+@st.cache_resource
+def get_delta_ingestor():
+    # Follows SC_EVENTS_FILE (stock/sales/receipt deltas, see core.ingest) in the background; off when unset
+    import os
+    path = os.getenv("SC_EVENTS_FILE")
+    if not path:
+        return None
+    from core.ingest import DeltaIngestor, tail_jsonl
+    # No background LLM screening: nothing on the dashboard would show its results
+    ingestor = DeltaIngestor(DATA_FILE, rollup=get_portfolio_rollup(), policy=get_policy_engine(), screen=False,
+                             history=get_sales_history(), on_flush=lambda rows, screened: load_data.clear())
+    ingestor.start(tail_jsonl(path))
+    return ingestor
+
+ingestor = get_delta_ingestor()
+
 # --- SIDEBAR ---
 with st.sidebar:
     st.subheader("📍 Control Panel")
+    if ingestor is not None:
+        st.caption(f"📡 Live deltas: {ingestor.counts['events']} events received, {ingestor.counts['skus_flushed']} SKU updates applied")
+    view = st.radio("View", ["SKU Detail", "Portfolio Overview"], horizontal=True)
+    product_names = dict(zip(df["SKU_ID"], df["Product_Name"]))
     selected_sku = st.selectbox(
         "Select Product SKU", 
         df["SKU_ID"].tolist(),
-        format_func=lambda x: f"{x} - {df[df['SKU_ID']==x]['Product_Name'].values[0]}"
+        format_func=lambda x: f"{x} - {product_names[x]}"
     )
     
     # State Management Logic
     if "active_sku" not in st.session_state or st.session_state["active_sku"] != selected_sku:
         st.session_state["active_sku"] = selected_sku
         st.session_state["analysis_result"] = None # Reset analysis on valid SKU switch
+        st.session_state["job_id"] = None
 
     st.markdown("---")
     st.markdown("### 🛠️ Simulation Params")
@@ -90,6 +173,89 @@ with st.sidebar:
     st.info(f"System Time: {datetime.now().strftime('%H:%M')} EST")
     st.caption("v2.1.0-Production | OpenAI Agents")
 
+# --- PORTFOLIO OVERVIEW ---
+if view == "Portfolio Overview":
+    rollup = get_portfolio_rollup()
+    with data_lock:
+        totals = rollup.totals()
+
+    st.subheader("🗺️ Portfolio Risk Overview")
+    p1, p2, p3, p4 = st.columns(4)
+    with p1:
+        st.metric("SKUs Tracked", f"{int(totals['count']):,}")
+    with p2:
+        st.metric("Stock-out Risk SKUs", f"{int(totals['stockout_skus']):,}")
+    with p3:
+        st.metric("Total Deficit", f"{int(totals['deficit']):,} units")
+    with p4:
+        st.metric("Total Overstock", f"{int(totals['overstock']):,} units")
+
+    metric_label = st.radio("Heatmap Metric", ["Weeks of Supply", "Coverage"], horizontal=True)
+    metric = "weeks_of_supply" if metric_label == "Weeks of Supply" else "coverage"
+    with data_lock:
+        pivot = rollup.heatmap(metric)
+
+    import plotly.graph_objects as go
+    heat = go.Figure(data=go.Heatmap(
+        z=pivot.values,
+        x=list(pivot.columns),
+        y=list(pivot.index),
+        colorscale="RdYlGn",
+        zmid=4 if metric == "weeks_of_supply" else 1,
+        text=pivot.round(2).values,
+        texttemplate="%{text}",
+    ))
+    heat.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='#fafafa'),
+        margin=dict(l=20, r=20, t=20, b=20),
+        height=420
+    )
+    st.plotly_chart(heat, width="stretch")
+
+    top_n = st.slider("Top-N At-Risk", 5, 50, 10)
+    with data_lock:
+        top_deficits = rollup.top_at_risk(top_n, kind="stockout")
+        top_overstock = rollup.top_at_risk(top_n, kind="overstock")
+        reorder_now = get_policy_engine().reorder_now(top_n)
+    t1, t2 = st.columns(2)
+    with t1:
+        st.markdown("#### 🚨 Largest Deficits")
+        st.dataframe(top_deficits, hide_index=True, width="stretch")
+    with t2:
+        st.markdown("#### 📦 Largest Overstock")
+        st.dataframe(top_overstock, hide_index=True, width="stretch")
+
+    st.markdown("#### 🔁 Reorder Now (at or below reorder point)")
+    st.dataframe(reorder_now, hide_index=True, width="stretch")
+
+    st.markdown("#### 🧪 What-if Scenarios")
+    w1, w2, w3 = st.columns(3)
+    with w1:
+        seasons = st.multiselect("Seasons", ["Winter", "Summer", "All Year"], default=["Winter", "Summer", "All Year"])
+    with w2:
+        shocks = st.multiselect("Demand Shocks", [-0.3, -0.2, -0.1, 0.0, 0.1, 0.2, 0.3], default=[-0.2, 0.0, 0.2],
+                                format_func=lambda x: f"{x:+.0%}")
+    with w3:
+        slips = st.multiselect("Lead-Time Slips (days)", [0, 7, 14, 30], default=[0, 7])
+    if seasons and shocks and slips:
+        from core.risk import STOCKOUT_PROBABILITY
+        from core.scenarios import pivot, summary
+        scenario_frame = get_scenarios(tuple(seasons), tuple(sorted(shocks)), tuple(sorted(slips)))
+        v1, v2 = st.columns(2)
+        with v1:
+            value = st.selectbox("Metric", ["Stockout_Risk", "Deficit", "Suggested_Order"],
+                                 format_func=lambda v: {"Stockout_Risk": "Stock-out SKUs", "Deficit": "Deficit (units)",
+                                                        "Suggested_Order": "Proposed Orders (units)"}[v])
+        with v2:
+            by = st.selectbox("Pivot By", ["Category", "Location", "SKU_ID"])
+        st.caption(f"Stock-out SKUs: coverage below threshold or simulated P(stock-out) within lead time "
+                   f"≥ {STOCKOUT_PROBABILITY:.0%} ({SCENARIO_SAMPLES} Monte Carlo samples per SKU and scenario).")
+        st.dataframe(summary(scenario_frame), width="stretch")
+        st.dataframe(pivot(scenario_frame, value, by), width="stretch")
+    st.stop()
+
 # --- KPI DASHBOARD ---
 sku_data = df[df["SKU_ID"] == selected_sku].iloc[0]
 
@@ -106,7 +272,22 @@ with col4:
     st.metric("On Order", f"{sku_data.get('On_Order', 0):,}", help="Inbound stock")
 with col5:
     coverage = round(sku_data['Current_Stock'] / sku_data['Forecast'], 2) if sku_data['Forecast'] else 0
-    st.metric("Weeks of Supply", f"{coverage * 4} wks", delta="Low Risk" if 0.8 < coverage < 1.5 else "High Risk", delta_color="normal" if 0.8 < coverage < 1.5 else "inverse")
+    sim = get_sku_simulation(float(sku_data['Current_Stock']), float(sku_data['Forecast']),
+                             float(sku_data.get('On_Order', 0) or 0), float(sku_data.get('Supplier_Lead_Time', 14) or 14),
+                             sku_data.get('Demand_CV'))
+    from core.risk import STOCKOUT_PROBABILITY, STOCKOUT_RISK, classify_risk
+    low_risk = sim["p_stockout"] < STOCKOUT_PROBABILITY
+    st.metric("Weeks of Supply", f"{sim['days_to_stockout_p50'] / 7:.1f} wks",
+              delta=f"P(stock-out) {sim['p_stockout']:.0%}", delta_color="normal" if low_risk else "inverse",
+              help="Median simulated weeks until stock-out; delta is the chance of running out within the supplier lead time.")
+
+with data_lock:
+    policy = get_policy_engine().for_sku(selected_sku)
+if policy:
+    position = sku_data['Current_Stock'] + (sku_data.get('On_Order', 0) or 0)
+    due = " — **reorder due**" if position <= policy["Reorder_Point"] else ""
+    st.caption(f"Replenishment policy ({policy['Service_Level']:.0%} service level): safety stock {policy['Safety_Stock']:,.0f} · "
+               f"reorder point {policy['Reorder_Point']:,.0f} · order-up-to {policy['Order_Up_To']:,.0f} · position {position:,.0f}{due}")
 
 # --- MAIN CHARTS & AGENT INTERFACE ---
 col_main, col_logs = st.columns([1.8, 1.2])
@@ -114,20 +295,18 @@ col_main, col_logs = st.columns([1.8, 1.2])
 with col_main:
     st.subheader("📈 Supply & Demand Intelligence")
     
-    # CHART: Plotly Forecast vs Actuals (Simulated history for demo)
-    # In a real app, we'd pull historicals. Here we generate a simple line chart.
-    import numpy as np
+    # CHART: Monthly sales from the sales history store vs. the 30-day forecast
+    import plotly.graph_objects as go
     
-    # Simulate past 6 months data for the chart
-    months = ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    base_sales = sku_data['Sales_Trend_Last_30_Days']
-    # Add random variance
-    history = [base_sales * (0.8 + 0.1 * i + np.random.normal(0, 0.05)) for i in range(6)]
-    forecast_line = [None] * 5 + [sku_data['Forecast']] # Forecast point
+    with data_lock:
+        monthly = get_sales_history().monthly(selected_sku, months=6)
+    months = [m for m, _ in monthly]
+    history = [units for _, units in monthly]
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=months, y=history, mode='lines+markers', name='Sales History', line=dict(color='#4e8cff', width=3)))
-    fig.add_trace(go.Scatter(x=["Dec", "Jan Forecast"], y=[history[-1], sku_data['Forecast']], mode='lines+markers', name='Forecast', line=dict(color='#00cc96', dash='dot')))
+    if months:
+        fig.add_trace(go.Scatter(x=[months[-1], "Next 30d Forecast"], y=[history[-1], sku_data['Forecast']], mode='lines+markers', name='Forecast', line=dict(color='#00cc96', dash='dot')))
     
     fig.update_layout(
         paper_bgcolor='rgba(0,0,0,0)',
@@ -144,6 +323,7 @@ with col_main:
     st.markdown("### 🌐 Agent Network Status")
     
     # Reusing the Graphviz visual but cleaner
+    import graphviz
     graph = graphviz.Digraph()
     graph.attr(rankdir='LR', bgcolor='transparent')
     graph.attr('node', shape='box', style='rounded,filled', fontcolor='white', fillcolor='#262730', color='#4e8cff')
@@ -170,29 +350,41 @@ with col_logs:
     with action_box:
         st.markdown(f"""
         **Context**: SKU {selected_sku} ({sku_data['Product_Name']})  
-        **Issue**: {'⚠️ Stock Risk Deteceted' if coverage < 0.8 else '✅ Healthy'}
+        **Issue**: {'⚠️ Stock Risk Deteceted' if classify_risk(coverage, sim['p_stockout']) == STOCKOUT_RISK else '✅ Healthy'}
         """)
         
-        # Fixing the button as well
-        if st.button("RUN DIAGNOSTINC & RESOLVE", type="primary", use_container_width=True):
+        # Add simulation params to data
+        run_data = sku_data.to_dict()
+        run_data["Season"] = sim_season
+
+        # Attach to a run another session already started for this exact request
+        if not st.session_state.get("job_id"):
+            existing = jobs.attach(run_data)
+            if existing:
+                st.session_state["job_id"] = existing.job_id
+
+        if st.button("RUN DIAGNOSTINC & RESOLVE", type="primary", use_container_width=True, disabled=llm_backend is None):
             st.session_state["analysis_result"] = None # Clear old
-            
-            # Streaming UI
-            placeholder = st.empty()
-            with placeholder.container():
-                st.info("🔄 Initializing Multi-Agent System...")
-            
-            orchestrator = Orchestrator()
-            
-            # Add simulation params to data
-            run_data = sku_data.to_dict()
-            run_data["Season"] = sim_season
-            
-            with st.spinner("🤖 Agents working..."):
-                result = orchestrator.run(run_data)
-                st.session_state["analysis_result"] = result
-            
-            placeholder.empty()
+            job = jobs.submit(run_data)
+            st.session_state["job_id"] = job.job_id
+
+        job = jobs.get(st.session_state["job_id"]) if st.session_state.get("job_id") else None
+        if job:
+            if job.status in (QUEUED, RUNNING):
+                st.info(f"🤖 Agents working... (job `{job.job_id}`, {job.status}, {job.elapsed:.0f}s)")
+                if st.button("⏹️ Cancel Run", use_container_width=True):
+                    jobs.cancel(job.job_id)
+                # Poll the worker pool without blocking widget interaction
+                time.sleep(1)
+                st.rerun()
+            elif job.status == DONE:
+                st.session_state["analysis_result"] = job.result
+            elif job.status == FAILED:
+                st.error(f"Run failed: {job.error}")
+            elif job.status == CANCELLED:
+                st.warning("Run cancelled.")
+                if job.result:
+                    st.session_state["analysis_result"] = job.result
 
     if st.session_state["analysis_result"]:
         st.divider()
@@ -208,7 +400,7 @@ with col_logs:
                 results = st.session_state["analysis_result"]
                 email_ctx = {
                     "summary": results.get("final_summary", ""),
-                    "logs": results.get("logs", []),
+                    "events": results.get("events", []),
                     "user_email": email_addr
                 }
                 
@@ -237,6 +429,8 @@ with col_logs:
         # Only show approval if there are actions AND they haven't been processed yet
         if actions:
             st.info("✋ **Human Approval Required**")
+            if llm_backend == "simulated":
+                st.warning("These actions come from the simulated LLM; approving writes them to the inventory file.")
             
             # Show diff
             act_df = pd.DataFrame(list(actions.items()), columns=["Action", "Details"])
@@ -249,6 +443,12 @@ with col_logs:
                     orch = Orchestrator()
                     status_msg = orch.persist_changes(sku_data["SKU_ID"], res)
                     st.success(status_msg)
+                    if orch.last_persisted_row:
+                        with data_lock:
+                            get_portfolio_rollup().update_row(orch.last_persisted_row)
+                            get_policy_engine().update_row(orch.last_persisted_row)
+                    load_data.clear()
+                    st.session_state["job_id"] = None
                     time.sleep(1) 
                     st.rerun()
             with c2:
@@ -274,21 +474,21 @@ with col_logs:
             
         # Action Log Timeline
         st.subheader("📜 Execution Trace")
-        logs = res.get("logs", [])
+        events = res.get("events", [])
         
-        for log in logs:
-            if "Tool" in log:
-                 st.markdown(f"🛠️ `{log}`")
-            elif "Error" in log:
-                st.error(log)
-            elif "[" in log:
-                # Format: [AgentName] Message
-                parts = log.split("]", 1)
-                agent = parts[0].replace("[", "")
-                msg = parts[1]
-                st.markdown(f"**{agent}**: {msg}")
+        for event in events:
+            took = f" · {event['duration_ms']:.0f} ms" if event.get("duration_ms") is not None else ""
+            if event["kind"] == "tool":
+                st.markdown(f"🛠️ **{event['agent']}** `{event['tool']}`{took}: `{event['text']}`")
+            elif event["kind"] == "error":
+                st.error(f"{event['agent']}: {event['text']}")
+            elif event["kind"] == "message":
+                st.markdown(f"**{event['agent']}**{took}: {event['text']}")
             else:
-                st.info(log)
+                st.info(f"{event['agent']}: {event['text']}")
+            if event.get("payload") or event.get("payload_ref"):
+                with st.expander(f"Full output ({event['payload_size']:,} chars)"):
+                    st.text(load_payload(event))
                 
     else:
         st.info("👆 Click 'Run' to start the autonomous agents.")
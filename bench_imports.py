@@ -0,0 +1,155 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def app_imports(path="app.py", view=None):
+    """
+    Import statements executed at the top level of a Streamlit script.
+
+    With `view`, also the deferred imports a first render of that view runs:
+    those inside module-level functions it calls (cached loaders) and inside
+    `if view == ...` branches for that view. Other views' branches,
+    `st.button(...)` click handlers and code after an early-return guard
+    are left out.
+    """
+    with open(os.path.join(ROOT, path), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    if view is None:
+        return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+    functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+    lines, called = [], set()
+
+    def calls(node):
+        # Module-level functions called from this expression or simple statement
+        for sub in ast.walk(node):
+            if isinstance(sub, ast.Call) and isinstance(sub.func, ast.Name) and sub.func.id in functions \
+                    and sub.func.id not in called:
+                called.add(sub.func.id)
+                visit(functions[sub.func.id].body)
+
+    def view_branch(test):
+        # True/False for `view == "<name>"` tests, None for any other condition
+        if (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "view"
+                and len(test.ops) == 1 and isinstance(test.ops[0], (ast.Eq, ast.NotEq))
+                and isinstance(test.comparators[0], ast.Constant)):
+            return (test.comparators[0].value == view) == isinstance(test.ops[0], ast.Eq)
+        return None
+
+    def clicked(test):
+        return any(isinstance(sub, ast.Call) and isinstance(sub.func, ast.Attribute) and sub.func.attr == "button"
+                   for sub in ast.walk(test))
+
+    def visit(statements):
+        for node in statements:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                line = ast.unparse(node)
+                if line not in lines:
+                    lines.append(line)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            elif isinstance(node, ast.If):
+                calls(node.test)
+                branch = view_branch(node.test)
+                if branch is None:
+                    if not clicked(node.test):
+                        visit(node.body)
+                    visit(node.orelse)
+                    if node.body and isinstance(node.body[-1], ast.Return) and not node.orelse:
+                        # Early-return guard (a feature that is off unless configured): stop here
+                        return
+                else:
+                    visit(node.body if branch else node.orelse)
+            elif isinstance(node, (ast.With, ast.For, ast.While, ast.Try)):
+                for item in getattr(node, "items", []):
+                    calls(item)
+                visit(node.body)
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body)
+                visit(getattr(node, "orelse", []))
+                visit(getattr(node, "finalbody", []))
+            else:
+                calls(node)
+
+    visit(tree.body)
+    return "\n".join(lines)
+
+
+TARGETS = {
+    "core.orchestrator": "import core.orchestrator",
+    # Filled from app.py's own imports: the script's top level alone, and everything
+    # a first render of the default view imports (plotly, graphviz, NumPy via the loaders)
+    "app.py (top-level)": lambda: app_imports(),
+    "app.py (SKU Detail view)": lambda: app_imports(view="SKU Detail"),
+}
+
+
+def measure(code, runs=5):
+    """
+    Cold-start time of `code` in fresh interpreters, plus the heaviest imports
+    from `-X importtime` of the last run.
+    """
+    timings = []
+    importtime = ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+        importtime = proc.stderr
+
+    # "import time: self [us] | cumulative | imported package", top-level packages only
+    top = []
+    for line in importtime.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit() and not parts[2].startswith("  "):
+            top.append((int(parts[1]) / 1000, parts[2].strip()))
+    top.sort(reverse=True)
+    return {"median_ms": round(statistics.median(timings), 1), "min_ms": round(min(timings), 1), "heaviest": top[:5]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track cold-start import time of core.orchestrator and app.py")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="Exit non-zero if any target's median exceeds this")
+    parser.add_argument("--output", default=None, help="Append results as one JSON line (e.g. bench_output.txt)")
+    args = parser.parse_args()
+
+    baseline = measure("pass", args.runs)["median_ms"]
+    print(f"Interpreter baseline: {baseline} ms")
+
+    results = {"timestamp": time.time(), "baseline_ms": baseline, "targets": {}}
+    failed = False
+    for name, code in TARGETS.items():
+        code = code() if callable(code) else code
+        res = measure(code, args.runs)
+        results["targets"][name] = res
+        print(f"\n{name}: median {res['median_ms']} ms (min {res['min_ms']} ms, {res['median_ms'] - baseline:.1f} ms over baseline)")
+        for ms, module in res["heaviest"]:
+            print(f"  {ms:8.1f} ms  {module}")
+        if args.max_ms is not None and res["median_ms"] > args.max_ms:
+            failed = True
+
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(results) + "\n")
+
+    if failed:
+        print(f"\n❌ Import time above {args.max_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
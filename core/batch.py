@@ -0,0 +1,356 @@
+"""
+Headless batch runner.
+
+    python -m core.batch --data data/inventory_data_real.csv --output results.jsonl \\
+        --location NJ --category Electronics --risk "Stock-out Risk" --concurrency 8 --resume
+
+Reads the inventory file in chunks, runs the agent pipeline for every SKU
+that passes the filters and appends one JSON line per SKU as soon as it
+finishes. SKUs are streamed in file order, so memory stays flat for any
+catalog size (other locations of each product are looked up in an on-disk
+index, see LocationIndex); with --by-urgency they are run most urgent first
+instead (core.scheduler), which holds the filtered rows in memory.
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set
+
+from core.risk import RISK_CLASSES, classify_row
+
+
+def iter_inventory(data_file: str,
+                   locations: Optional[Sequence[str]] = None,
+                   categories: Optional[Sequence[str]] = None,
+                   risk_classes: Optional[Sequence[str]] = None,
+                   chunksize: int = 10_000,
+                   history=None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield inventory rows matching the filters, reading the file chunk by chunk.
+    With a `history` store (core.history), demand columns come from sales history.
+    """
+    import pandas as pd
+
+    for chunk in pd.read_csv(data_file, chunksize=chunksize):
+        if locations:
+            chunk = chunk[chunk["Location"].isin(locations)]
+        if categories and "Category" in chunk.columns:
+            chunk = chunk[chunk["Category"].isin(categories)]
+        if history is not None:
+            chunk = history.enrich(chunk)
+        for row in chunk.to_dict(orient="records"):
+            if risk_classes and classify_row(row) not in risk_classes:
+                continue
+            yield row
+
+
+# Columns the Inventory Agent's cross-location table needs (core.prompts.relevant_inventory)
+LOCATION_COLUMNS = ["SKU_ID", "Product_Name", "Location", "Current_Stock", "Forecast", "On_Order"]
+
+
+class LocationIndex:
+    """
+    Every location of every product, indexed by Product_Name in a temporary
+    SQLite file. Built once per sweep so each SKU's run doesn't re-read the
+    whole file for its cross-location context, without holding the catalog
+    in memory. Missing values come back as None.
+    """
+    def __init__(self, data_file: str, chunksize: int = 10_000):
+        import pandas as pd
+
+        self._dir = tempfile.mkdtemp(prefix="sc-locations-")
+        self.path = os.path.join(self._dir, "locations.db")
+        header = pd.read_csv(data_file, nrows=0).columns
+        conn = sqlite3.connect(self.path)
+        try:
+            for chunk in pd.read_csv(data_file, chunksize=chunksize, usecols=[c for c in LOCATION_COLUMNS if c in header]):
+                chunk.to_sql("locations", conn, if_exists="append", index=False)
+            if "Product_Name" in header:
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_product ON locations (Product_Name)")
+            conn.commit()
+        finally:
+            conn.close()
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+
+    def rows(self, product_name: Any) -> List[Dict[str, Any]]:
+        """All locations of one product, in file order."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # One read-only connection per thread; close() may run on another thread
+            conn = self._local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._conns.append(conn)
+        try:
+            cursor = conn.execute("SELECT * FROM locations WHERE Product_Name = ? ORDER BY rowid", (product_name,))
+        except sqlite3.OperationalError:
+            return []  # no Product_Name column
+        return [dict(r) for r in cursor]
+
+    def close(self):
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self) -> "LocationIndex":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def iter_by_urgency(data_file: str, read_rows: Callable[[], Iterator[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """
+    Rows from `read_rows()`, most urgent first (core.scheduler.UrgencyQueue).
+    If the data file changes during the sweep, the SKUs still waiting are
+    re-scored from the new figures before the next one is handed out.
+    """
+    from core.scheduler import UrgencyQueue
+
+    queue = UrgencyQueue(read_rows())
+    seen = _mtime(data_file)
+    while queue:
+        current = _mtime(data_file)
+        if current != seen:
+            seen = current
+            updated = sum(queue.update(row) for row in read_rows())
+            print(f"[Batch] Inventory changed; re-prioritized {updated} waiting SKUs", file=sys.stderr)
+        yield queue.pop()
+
+
+def completed_skus(output_file: str) -> Set[str]:
+    """
+    SKU IDs already present in a (possibly partially written) JSONL output.
+    A torn final line from an interrupted run is truncated away. Failed SKUs
+    (`{"error": ...}` lines) don't count as done and their lines are removed,
+    so a resume retries them and every SKU ends up with exactly one line.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_file):
+        return done
+
+    valid_bytes = 0
+    failed = 0
+    with open(output_file, "rb") as f:
+        for raw in f:
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                break
+            if not raw.endswith(b"\n"):
+                break
+            valid_bytes += len(raw)
+            if "error" in record:
+                failed += 1
+            elif "SKU_ID" in record:
+                done.add(str(record["SKU_ID"]))
+
+    if failed:
+        # Rewrite without the error lines (and any torn tail), then swap in atomically
+        tmp = output_file + ".tmp"
+        with open(output_file, "rb") as src, open(tmp, "wb") as dst:
+            remaining = valid_bytes
+            for raw in src:
+                if remaining <= 0:
+                    break
+                remaining -= len(raw)
+                if "error" not in json.loads(raw):
+                    dst.write(raw)
+        os.replace(tmp, output_file)
+    elif valid_bytes < os.path.getsize(output_file):
+        with open(output_file, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+def run_batch(data_file: str,
+              output_file: str,
+              locations: Optional[Sequence[str]] = None,
+              categories: Optional[Sequence[str]] = None,
+              risk_classes: Optional[Sequence[str]] = None,
+              season: Optional[str] = None,
+              concurrency: int = 4,
+              resume: bool = False,
+              orchestrator=None,
+              screen: bool = False,
+              screen_chunk: int = 200,
+              history=None,
+              checkpoint: bool = False,
+              prioritize: bool = False,
+              profile: Optional[str] = None) -> Dict[str, int]:
+    """
+    Run the pipeline over the filtered catalog, writing one JSONL line per SKU.
+
+    With `screen`, SKUs are first screened in multi-SKU requests (monitoring
+    and forecast review, see core.multi_sku); healthy ones are written with a
+    batched summary and only at-risk SKUs get the full per-SKU pipeline.
+
+    With `checkpoint`, every finished agent step is checkpointed (core.checkpoint),
+    so SKUs that were mid-pipeline when a run died resume at the next agent.
+
+    Rows stream in file order by default. With `prioritize`, the filtered rows
+    are queued by urgency and the SKUs closest to stocking out within their
+    lead time run first; this holds the filtered rows in memory and re-reads
+    the file whenever it changes, so use it with filters on large catalogs.
+
+    With `profile` (a directory), every SKU run and screening chunk writes a
+    per-stage CPU/memory profile there (core.profiling). SKUs then run one at
+    a time: memory tracing is process-wide, so concurrent runs would show up
+    in each other's figures.
+    """
+    profiler = None
+    if profile:
+        from core.profiling import Profiler
+        profiler = Profiler(profile)
+        if concurrency > 1:
+            print(f"[Batch] Profiling: running one SKU at a time instead of {concurrency}", file=sys.stderr)
+            concurrency = 1
+    if orchestrator is None:
+        from core.orchestrator import Orchestrator
+        checkpoints = None
+        if checkpoint:
+            from core.checkpoint import CheckpointStore
+            checkpoints = CheckpointStore()
+        orchestrator = Orchestrator(data_file=data_file, checkpoints=checkpoints, profiler=profiler)
+
+    skip = completed_skus(output_file) if resume else set()
+    counts = {"processed": 0, "skipped": len(skip), "failed": 0, "screened_healthy": 0}
+    runner = None
+    if screen:
+        from core.multi_sku import MultiSkuRunner
+        runner = MultiSkuRunner(orchestrator.llm, orchestrator.agents)
+
+    def run_one(row: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return orchestrator.run(dict(row), full_inventory=location_index.rows(row.get("Product_Name")))
+        except Exception as e:
+            return {"SKU_ID": row["SKU_ID"], "error": str(e)}
+
+    # Other locations of each product, for the Inventory Agent; indexed once instead of read per SKU
+    with LocationIndex(data_file) as location_index, \
+            open(output_file, "a" if resume else "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+
+        def drain(block_until: int):
+            # Write finished results until at most `block_until` are still in flight
+            nonlocal pending
+            while len(pending) > block_until:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    out.write(json.dumps(result, default=str) + "\n")
+                    out.flush()
+                    counts["failed" if "error" in result else "processed"] += 1
+
+        def write(result: Dict[str, Any]):
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+            counts["processed"] += 1
+
+        def screen_chunk_rows(rows):
+            from core.profiling import stage
+
+            run_profile = profiler.start(f"screen-{rows[0]['SKU_ID']}") if profiler is not None else None
+            try:
+                with stage(run_profile, "Screen"):
+                    screened = runner.screen(rows)
+                healthy = [r for r in rows if screened[str(r["SKU_ID"])]["status"] == "Healthy"
+                           and "error" not in screened[str(r["SKU_ID"])]]
+                with stage(run_profile, "Summarize"):
+                    summaries = runner.summarize(healthy, screened) if healthy else {}
+            finally:
+                if run_profile is not None:
+                    run_profile.finish()
+            healthy_ids = {str(r["SKU_ID"]) for r in healthy}
+            for row in rows:
+                sku = str(row["SKU_ID"])
+                if sku in healthy_ids:
+                    result = {k: v for k, v in screened[sku].items() if k != "rationale"}
+                    write({**row, **result, "final_summary": summaries.get(sku) or screened[sku]["rationale"], "screened": True})
+                    counts["screened_healthy"] += 1
+                else:
+                    pending.add(pool.submit(run_one, row))
+                    drain(concurrency * 2)
+
+        def read_rows():
+            return iter_inventory(data_file, locations, categories, risk_classes, history=history)
+
+        buffer = []
+        for row in iter_by_urgency(data_file, read_rows) if prioritize else read_rows():
+            if str(row["SKU_ID"]) in skip:
+                continue
+            if season:
+                row["Season"] = season
+            if runner is not None:
+                buffer.append(row)
+                if len(buffer) >= screen_chunk:
+                    screen_chunk_rows(buffer)
+                    buffer = []
+                continue
+            pending.add(pool.submit(run_one, row))
+            # Bounded in-flight work keeps memory constant regardless of catalog size
+            drain(concurrency * 2)
+        if buffer:
+            screen_chunk_rows(buffer)
+        drain(0)
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.batch", description="Run the agent pipeline over a catalog and stream JSONL results")
+    parser.add_argument("--data", default="data/inventory_data_real.csv", help="Inventory CSV")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL output file")
+    parser.add_argument("--location", action="append", help="Only these locations (repeatable)")
+    parser.add_argument("--category", action="append", help="Only these categories (repeatable)")
+    parser.add_argument("--risk", action="append", choices=RISK_CLASSES, help="Only SKUs in this rule-based risk class (repeatable)")
+    parser.add_argument("--season", default=None, help="Override the Season column")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--resume", action="store_true", help="Skip SKUs already in --output and append")
+    parser.add_argument("--screen", action="store_true", help="Screen SKUs in multi-SKU requests first; only at-risk SKUs run the full pipeline")
+    parser.add_argument("--checkpoint", action="store_true", help="Checkpoint each agent step so interrupted SKUs resume mid-pipeline")
+    parser.add_argument("--history", default=None, help="Sales history directory (core.history) for demand columns")
+    parser.add_argument("--by-urgency", action="store_true",
+                        help="Run the most urgent SKUs first (holds the filtered rows in memory) instead of streaming in file order")
+    parser.add_argument("--profile", default=None, metavar="DIR", help="Write per-stage CPU/memory profiles (core.profiling) to DIR")
+    args = parser.parse_args(argv)
+
+    history = None
+    if args.history:
+        from core.history import SalesHistory
+        history = SalesHistory(args.history)
+
+    counts = run_batch(
+        args.data, args.output,
+        locations=args.location,
+        categories=args.category,
+        risk_classes=args.risk,
+        season=args.season,
+        concurrency=args.concurrency,
+        resume=args.resume,
+        screen=args.screen,
+        history=history,
+        checkpoint=args.checkpoint,
+        prioritize=args.by_urgency,
+        profile=args.profile,
+    )
+    print(f"Batch complete: {counts['processed']} processed ({counts['screened_healthy']} healthy by screening), {counts['failed']} failed, {counts['skipped']} skipped (already done)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
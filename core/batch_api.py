@@ -0,0 +1,422 @@
+"""
+Batch API sweep mode.
+
+    python -m core.batch_api --data data/inventory_data_real.csv --output results.jsonl --client openai
+    python -m core.batch_api --output results.jsonl --client local      # offline, via the configured backend
+
+Instead of running the agent pipeline SKU by SKU, each stage is compiled for
+every SKU into one chat-completions Batch API request file (one JSON line per
+SKU: custom_id, method, url, body) and submitted as a single batch job. When
+the batch completes its outputs are applied, tools run locally, and only then
+is the next stage compiled, so stages stay aligned with `Orchestrator.agents`.
+Results are written in the same JSONL format as `python -m core.batch`.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.events import EventLog, ERROR
+from core.risk import OVERSTOCK_RISK, RISK_CLASSES, STOCKOUT_RISK
+from core.state import AgentState, BatchState
+
+ENDPOINT = "/v1/chat/completions"
+
+# Batch lifecycle states (same names as the OpenAI Batch API)
+COMPLETED = "completed"
+FAILED = "failed"
+TERMINAL_STATES = {COMPLETED, FAILED, "expired", "cancelled"}
+
+
+def batch_line(custom_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+
+
+def write_requests(path: str, requests: Dict[str, Dict[str, Any]]):
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests.items():
+            f.write(json.dumps(batch_line(custom_id, body), default=str) + "\n")
+
+
+def read_outputs(path: str) -> Dict[str, Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Map custom_id -> (chat-completion body, error) from a batch output file.
+    """
+    outputs = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error"):
+                error = record["error"]
+                outputs[record["custom_id"]] = (None, error.get("message", str(error)) if isinstance(error, dict) else str(error))
+            elif response.get("status_code", 200) != 200:
+                outputs[record["custom_id"]] = (None, f"HTTP {response.get('status_code')}: {response.get('body')}")
+            else:
+                outputs[record["custom_id"]] = (response.get("body"), None)
+    return outputs
+
+
+class BatchClient(ABC):
+    """
+    Submits a request file and hands back its output file once the batch is done.
+    """
+    poll_interval = 30.0
+
+    @abstractmethod
+    def submit(self, input_path: str, description: str = "") -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def download(self, batch_id: str, output_path: str):
+        raise NotImplementedError
+
+
+class OpenAIBatchClient(BatchClient):
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    def submit(self, input_path: str, description: str = "") -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window="24h",
+            metadata={"description": description} if description else None,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download(self, batch_id: str, output_path: str):
+        batch = self.client.batches.retrieve(batch_id)
+        with open(output_path, "w", encoding="utf-8") as f:
+            # Failed requests land in a separate error file; both share the line format
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    f.write(self.client.files.content(file_id).text)
+
+
+class LocalBatchClient(BatchClient):
+    """
+    Offline stand-in for the Batch API. Processes request files in a background
+    thread through an LLMBackend (the simulator by default when no API key is
+    set) and writes OpenAI-format output lines.
+    """
+    poll_interval = 0.05
+
+    def __init__(self, backend=None, concurrency: int = 8):
+        self._backend = backend
+        self.concurrency = concurrency
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from core.llm_service import get_backend
+            self._backend = get_backend()
+        return self._backend
+
+    def _process(self, line: Dict[str, Any]) -> Dict[str, Any]:
+        # Any per-request problem (malformed line, backend error) becomes that request's error result
+        try:
+            body = dict(line["body"])
+            response = self.backend.chat(body.pop("model"), body.pop("messages"), tools=body.pop("tools", None), **body)
+            return {"custom_id": line["custom_id"],
+                    "response": {"status_code": 200, "body": response.model_dump()},
+                    "error": None}
+        except Exception as e:
+            return {"custom_id": line.get("custom_id"), "response": None,
+                    "error": {"code": "backend_error", "message": str(e)}}
+
+    def _run(self, batch: Dict[str, Any]):
+        # The batch always reaches a terminal state, so pollers never wait on a dead thread
+        try:
+            with open(batch["input_path"], "r", encoding="utf-8") as f:
+                lines = [json.loads(l) for l in f if l.strip()]
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                batch["output"] = list(pool.map(self._process, lines))
+            batch["status"] = COMPLETED
+        except Exception as e:
+            batch["error"] = str(e)
+            batch["status"] = FAILED
+
+    def submit(self, input_path: str, description: str = "") -> str:
+        with self._lock:
+            batch_id = f"batch_local_{len(self._batches) + 1}"
+            batch = {"input_path": input_path, "status": "in_progress", "output": []}
+            self._batches[batch_id] = batch
+        threading.Thread(target=self._run, args=(batch,), name=batch_id, daemon=True).start()
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        return self._batches[batch_id]["status"]
+
+    def download(self, batch_id: str, output_path: str):
+        with open(output_path, "w", encoding="utf-8") as f:
+            for record in self._batches[batch_id]["output"]:
+                f.write(json.dumps(record) + "\n")
+
+
+@dataclass
+class _Session:
+    """One SKU's run, carried across stage batches."""
+    sku_data: Dict[str, Any]
+    state: AgentState
+    context: Dict[str, Any]
+    messages: List[Dict[str, Any]]
+    events: EventLog = field(default_factory=EventLog)
+    usage: Any = None
+    handoff: Any = None
+
+
+class BatchSweep:
+    """
+    Runs the orchestrator's agent pipeline over many SKUs, one batch job per
+    stage turn (a second turn only for SKUs whose agent called research
+    tools). `workdir` keeps every request and output file for inspection.
+
+    `locations` (a core.batch.LocationIndex) supplies each SKU's other
+    locations; without it each `run` loads the inventory once and groups it
+    by product.
+    """
+    def __init__(self, orchestrator=None, client: Optional[BatchClient] = None,
+                 workdir: str = "data/batches", poll_interval: Optional[float] = None,
+                 timeout: Optional[float] = None, locations=None):
+        if orchestrator is None:
+            from core.orchestrator import Orchestrator
+            orchestrator = Orchestrator()
+        self.orchestrator = orchestrator
+        self.client = client or LocalBatchClient()
+        self.workdir = workdir
+        self.poll_interval = poll_interval if poll_interval is not None else self.client.poll_interval
+        self.timeout = timeout
+        self.locations = locations
+        self.batch_ids: List[str] = []
+
+    def _submit_and_wait(self, label: str, requests: Dict[str, Dict[str, Any]]):
+        os.makedirs(self.workdir, exist_ok=True)
+        input_path = os.path.join(self.workdir, f"{label}.jsonl")
+        output_path = os.path.join(self.workdir, f"{label}.output.jsonl")
+        write_requests(input_path, requests)
+
+        batch_id = self.client.submit(input_path, description=label)
+        self.batch_ids.append(batch_id)
+        print(f"Submitted {label}: {len(requests)} requests as {batch_id}")
+
+        started = time.time()
+        status = self.client.status(batch_id)
+        while status not in TERMINAL_STATES:
+            if self.timeout is not None and time.time() - started > self.timeout:
+                raise TimeoutError(f"Batch {batch_id} ({label}) still {status} after {self.timeout}s")
+            time.sleep(self.poll_interval)
+            status = self.client.status(batch_id)
+        if status != COMPLETED:
+            raise RuntimeError(f"Batch {batch_id} ({label}) ended as {status}")
+
+        self.client.download(batch_id, output_path)
+        outputs = read_outputs(output_path)
+        missing = set(requests) - set(outputs)
+        for custom_id in missing:
+            outputs[custom_id] = (None, "missing from batch output")
+        return outputs
+
+    def run(self, rows: Iterable[Dict[str, Any]], label: str = "sweep") -> List[Dict[str, Any]]:
+        # Profiled per stage when the orchestrator has a profiler (core.profiling)
+        profiler = getattr(self.orchestrator, "profiler", None)
+        if profiler is None:
+            return self._run(rows, label)
+        profile = profiler.start(label)
+        try:
+            return self._run(rows, label, profile)
+        finally:
+            print(f"Profile written to {profile.finish()['dir']}")
+
+    def _run(self, rows: Iterable[Dict[str, Any]], label: str, profile=None) -> List[Dict[str, Any]]:
+        from core.llm_service import ChatResponse
+        from core.handoff import Handoff, history_tokens
+        from core.orchestrator import MAX_TURNS, UsageTotals
+        from core.profiling import stage
+
+        orch = self.orchestrator
+        sessions = []
+        with stage(profile, "Build Context"):
+            # Each SKU gets only its own product's locations, not the whole inventory
+            if self.locations is not None:
+                locations_of = self.locations.rows
+            else:
+                by_product: Dict[Any, List[Dict[str, Any]]] = {}
+                for r in orch.load_inventory():
+                    by_product.setdefault(r.get("Product_Name"), []).append(r)
+                locations_of = lambda name: by_product.get(name, [])
+            for row in rows:
+                state = AgentState.from_dict(row)
+                context = orch.build_context(row, full_inventory=locations_of(row.get("Product_Name")))
+                session = _Session(row, state, context, orch.kickoff_messages(row), usage=UsageTotals(),
+                                   handoff=Handoff(getattr(orch, "compact_handoffs", True)))
+                state.events = session.events
+                sessions.append(session)
+        if not sessions:
+            return []
+
+        for stage_index, agent in enumerate(orch.agents):
+            with stage(profile, agent.name):
+                for s in sessions:
+                    s.handoff.begin(s.messages)
+                # SKUs whose root cause is reused from a similar SKU skip the agent (core.similarity)
+                active = {i: s for i, s in enumerate(sessions)
+                          if not orch.recall_root_cause(agent, s.sku_data, s.state, s.context, s.messages, s.events)}
+                for turn in range(MAX_TURNS):
+                    # Turn 0 is the agent's decision (or research tool calls); turn 1 decides after tool results
+                    requests = {}
+                    for i, s in active.items():
+                        prompt = orch.instructions_for(agent, s.context)
+                        if turn == 0:
+                            s.usage.add_prompt(prompt)
+                        sent = s.handoff.messages_for(agent.name, s.messages, s.state)
+                        s.usage.add_history(agent.name, history_tokens(sent), history_tokens(s.messages))
+                        requests[f"s{stage_index}-t{turn}-{i}"] = orch.stage_request(agent, s.context, sent,
+                                                                                    with_tools=turn < MAX_TURNS - 1, prompt=prompt)
+                    if not requests:
+                        break
+                    outputs = self._submit_and_wait(f"{label}-{stage_index}-{agent.name.replace(' ', '_').lower()}-{turn}", requests)
+
+                    next_active = {}
+                    for i, s in active.items():
+                        body, error = outputs[f"s{stage_index}-t{turn}-{i}"]
+                        if error:
+                            s.events.record(agent.name, ERROR, error)
+                            continue
+                        response = ChatResponse.from_dict(body)
+                        s.usage.add(response, agent.name)
+                        try:
+                            if orch.apply_response(agent, response.choices[0].message.model_dump(), s.messages, s.state, s.events):
+                                next_active[i] = s
+                        except Exception as e:
+                            s.events.record(agent.name, ERROR, e)
+                    active = next_active
+                for s in sessions:
+                    s.handoff.end(agent.name, s.messages)
+                    orch.remember_root_cause(agent, s.sku_data, s.state, s.context, s.events.run_id)
+
+        return [orch.finalize(s.state, s.context, s.messages, s.events, s.usage) for s in sessions]
+
+
+def run_sweep(data_file: str,
+              output_file: str,
+              client: Optional[BatchClient] = None,
+              locations: Optional[Sequence[str]] = None,
+              categories: Optional[Sequence[str]] = None,
+              risk_classes: Optional[Sequence[str]] = None,
+              season: Optional[str] = None,
+              chunk_size: int = 10_000,
+              workdir: str = "data/batches",
+              orchestrator=None,
+              profile: Optional[str] = None) -> Dict[str, int]:
+    """
+    Batch-mode counterpart of `core.batch.run_batch`. The catalog is swept in
+    chunks of `chunk_size` SKUs so each request file stays well under the
+    Batch API's per-file limits. With `profile` (a directory), each chunk
+    writes a per-stage CPU/memory profile there (core.profiling).
+
+    Each chunk's decisions are also collected in a columnar BatchState
+    (core.state), so the returned counts include SKUs per status and risk
+    type without keeping the result dicts around.
+    """
+    import pandas as pd
+    from core.batch import LocationIndex, iter_inventory
+
+    if orchestrator is None:
+        from core.orchestrator import Orchestrator
+        profiler = None
+        if profile:
+            from core.profiling import Profiler
+            profiler = Profiler(profile)
+        orchestrator = Orchestrator(data_file=data_file, profiler=profiler)
+    # Other locations of each product, indexed once for every chunk of the sweep
+    location_index = LocationIndex(data_file)
+    sweep = BatchSweep(orchestrator, client, workdir, locations=location_index)
+    counts = {"processed": 0, "failed": 0, "batches": 0}
+
+    def flush(rows, n, out):
+        decisions = BatchState.from_dataframe(pd.DataFrame(rows))
+        for result in sweep.run(rows, label=f"chunk{n}"):
+            out.write(json.dumps(result, default=str) + "\n")
+            counts["processed"] += 1
+            counts["failed"] += any(e["kind"] == ERROR for e in result["events"])
+            decisions.set_result(str(result["SKU_ID"]), result)
+        out.flush()
+        for key, value in decisions.tally().items():
+            counts[key] = counts.get(key, 0) + value
+
+    with location_index, open(output_file, "w", encoding="utf-8") as out:
+        chunk, n = [], 0
+        for row in iter_inventory(data_file, locations, categories, risk_classes):
+            if season:
+                row["Season"] = season
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk, n, out)
+                chunk, n = [], n + 1
+        if chunk:
+            flush(chunk, n, out)
+
+    counts["batches"] = len(sweep.batch_ids)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.batch_api", description="Run the agent pipeline over a catalog as one Batch API job per stage")
+    parser.add_argument("--data", default="data/inventory_data_real.csv", help="Inventory CSV")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL output file")
+    parser.add_argument("--client", choices=["openai", "local"], default="openai",
+                        help="openai submits to the Batch API; local processes the files in-process")
+    parser.add_argument("--workdir", default="data/batches", help="Where request/output JSONL files are kept")
+    parser.add_argument("--location", action="append", help="Only these locations (repeatable)")
+    parser.add_argument("--category", action="append", help="Only these categories (repeatable)")
+    parser.add_argument("--risk", action="append", choices=RISK_CLASSES, help="Only SKUs in this rule-based risk class (repeatable)")
+    parser.add_argument("--season", default=None, help="Override the Season column")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="SKUs per sweep (one batch per stage per chunk)")
+    parser.add_argument("--profile", default=None, metavar="DIR", help="Write per-stage CPU/memory profiles (core.profiling) to DIR")
+    args = parser.parse_args(argv)
+
+    client = OpenAIBatchClient() if args.client == "openai" else LocalBatchClient()
+    counts = run_sweep(
+        args.data, args.output, client,
+        locations=args.location,
+        categories=args.category,
+        risk_classes=args.risk,
+        season=args.season,
+        chunk_size=args.chunk_size,
+        workdir=args.workdir,
+        profile=args.profile,
+    )
+    print(f"Batch sweep complete: {counts['processed']} SKUs ({counts['failed']} with errors) in {counts['batches']} batch jobs; "
+          f"{counts.get('Risk', 0)} at risk ({counts.get(STOCKOUT_RISK, 0)} stock-out, {counts.get(OVERSTOCK_RISK, 0)} overstock)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
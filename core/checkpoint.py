@@ -0,0 +1,115 @@
+"""
+Durable checkpoints for in-flight pipeline runs.
+
+After each agent finishes, `Orchestrator.run` saves the conversation, the
+analysis fields decided so far, the handoff notes, the event records and
+token usage under the run ID. If the process dies (crash, Streamlit rerun, worker restart) the same
+run ID picks up at the next agent instead of paying for the finished LLM
+calls again. A run's checkpoint is deleted once it completes.
+
+One JSON file per run, written atomically (temp file + fsync + rename).
+Old or excess checkpoints are garbage-collected by age and total size.
+
+    store = CheckpointStore()
+    orchestrator = Orchestrator(checkpoints=store)
+    orchestrator.run(sku_data)          # run ID defaults to core.jobs.run_key(sku_data)
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+CHECKPOINT_DIR = "data/checkpoints"
+
+
+@dataclass
+class Checkpoint:
+    run_id: str
+    sku_id: str
+    next_stage: int
+    last_agent: str
+    messages: List[Dict[str, Any]]
+    analysis: Dict[str, Any]
+    events: List[Dict[str, Any]]
+    usage: Dict[str, Any]
+    updated_at: float = field(default_factory=time.time)
+    # Handoff notes left by finished agents (core.handoff)
+    notes: Dict[str, str] = field(default_factory=dict)
+
+
+class CheckpointStore:
+    def __init__(self, root: str = CHECKPOINT_DIR, max_age: float = 7 * 86400,
+                 max_bytes: int = 256 * 1024 * 1024, gc_every: int = 100):
+        self.root = root
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.gc_every = gc_every
+        self._saves = 0
+        os.makedirs(root, exist_ok=True)
+        self.gc()
+
+    def path(self, run_id: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in run_id)
+        return os.path.join(self.root, f"{safe}.json")
+
+    def save(self, checkpoint: Checkpoint):
+        checkpoint.updated_at = time.time()
+        path = self.path(checkpoint.run_id)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(checkpoint), f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        self._saves += 1
+        if self._saves % self.gc_every == 0:
+            self.gc()
+
+    def load(self, run_id: str) -> Optional[Checkpoint]:
+        path = self.path(run_id)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return Checkpoint(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            # A torn or outdated file is not worth failing the run over; start fresh
+            print(f"  [Checkpoint] Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+    def delete(self, run_id: str):
+        try:
+            os.remove(self.path(run_id))
+        except FileNotFoundError:
+            pass
+
+    def gc(self, now: Optional[float] = None) -> int:
+        """
+        Remove checkpoints older than `max_age`, then the oldest ones until the
+        directory is under `max_bytes`. Returns the number removed.
+        """
+        now = time.time() if now is None else now
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
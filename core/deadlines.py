@@ -0,0 +1,251 @@
+"""
+Deadlines, cancellation and hedged requests for pipeline runs.
+
+A run has an overall deadline; each agent gets its own budget inside it, and
+each tool call gets a budget inside the agent's. Blocking calls (LLM
+requests, tools such as web search) run on a daemon thread and are waited on
+in short slices, so a deadline or a job cancellation returns control promptly
+even when the call itself hangs. LLM requests also pass the remaining time as
+the client `timeout`, so the HTTP request is really abandoned; a hung tool
+thread is left to finish in the background and its result discarded.
+
+Hedging: once an agent has enough latency samples, a request still running
+past the chosen percentile (e.g. p95) gets a duplicate, and whichever answer
+arrives first wins. Every deadline or hedge that fires is noted on the run
+result under "deadlines".
+
+    policy = DeadlinePolicy(run_seconds=120, agent_seconds={"Root Cause Agent": 45},
+                            tool_seconds={"search_web": 8}, hedge_percentile=0.95)
+    Orchestrator(deadlines=policy).run(sku_data)
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# Deadline scopes, as recorded on the run result
+RUN = "run"
+AGENT = "agent"
+TOOL = "tool"
+HEDGE = "hedge"
+
+_POLL_SECONDS = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, scope: str, name: str, seconds: float):
+        super().__init__(f"{scope} deadline for {name} exceeded ({seconds:g}s)")
+        self.scope = scope
+        self.name = name
+        self.seconds = seconds
+
+
+class RunCancelled(Exception):
+    """The run's cancel event was set while waiting on a call."""
+
+
+@dataclass
+class DeadlinePolicy:
+    run_seconds: Optional[float] = float(os.getenv("RUN_DEADLINE_SECONDS", 600))
+    default_agent_seconds: Optional[float] = float(os.getenv("AGENT_DEADLINE_SECONDS", 120))
+    agent_seconds: Dict[str, float] = field(default_factory=dict)
+    default_tool_seconds: Optional[float] = float(os.getenv("TOOL_DEADLINE_SECONDS", 30))
+    tool_seconds: Dict[str, float] = field(default_factory=lambda: {"search_web": 15})
+    # Hedge an LLM request once it runs past this latency percentile (None = never hedge)
+    hedge_percentile: Optional[float] = None
+    hedge_min_samples: int = 20
+
+    def for_agent(self, name: str) -> Optional[float]:
+        return self.agent_seconds.get(name, self.default_agent_seconds)
+
+    def for_tool(self, name: str) -> Optional[float]:
+        return self.tool_seconds.get(name, self.default_tool_seconds)
+
+
+class Deadline:
+    """An absolute point in (monotonic) time, or None for no limit."""
+    def __init__(self, seconds: Optional[float], scope: str, name: str, parent: Optional["Deadline"] = None):
+        self.seconds = seconds
+        self.scope = scope
+        self.name = name
+        self.parent = parent
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before this deadline or any enclosing one, whichever is first."""
+        own = self.expires - time.monotonic() if self.expires is not None else None
+        outer = self.parent.remaining() if self.parent is not None else None
+        if own is None:
+            return outer
+        return own if outer is None else min(own, outer)
+
+    def binding(self) -> "Deadline":
+        """The deadline (this one or an enclosing one) that expires first."""
+        if self.parent is None:
+            return self
+        outer = self.parent.binding()
+        if self.expires is None:
+            return outer
+        return self if outer.expires is None or self.expires <= outer.expires else outer
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def exceeded(self) -> DeadlineExceeded:
+        first = self.binding()
+        return DeadlineExceeded(first.scope, first.name, first.seconds)
+
+
+class LatencyTracker:
+    """Recent call latencies per key (agent name), for hedge thresholds."""
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, p: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+def _spawn(fn: Callable[[], Any]) -> Future:
+    # A daemon thread per call: a hung call can be abandoned without tying up a pool worker
+    future: Future = Future()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    # Named after the calling thread, so core.profiling can attribute its samples to the run
+    threading.Thread(target=target, daemon=True, name=f"sc-deadline-call:{threading.get_ident()}").start()
+    return future
+
+
+def _wait_any(futures: List[Future], deadline: Deadline, cancel_event: Optional[threading.Event],
+              until: Optional[float] = None) -> Optional[Future]:
+    """
+    First finished future, or None when `until` (monotonic) passes first.
+    Raises DeadlineExceeded / RunCancelled.
+    """
+    while True:
+        for future in futures:
+            if future.done():
+                return future
+        if cancel_event is not None and cancel_event.is_set():
+            raise RunCancelled()
+        if deadline.expired():
+            raise deadline.exceeded()
+        if until is not None and time.monotonic() >= until:
+            return None
+        timeout = _POLL_SECONDS
+        remaining = deadline.remaining()
+        if remaining is not None:
+            timeout = min(timeout, max(remaining, 0.0))
+        wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+
+def call_with_deadline(fn: Callable[[], Any], deadline: Deadline,
+                       cancel_event: Optional[threading.Event] = None) -> Any:
+    """Run `fn` and return its result, or raise when the deadline passes or the run is cancelled."""
+    if deadline.expired():
+        raise deadline.exceeded()
+    future = _spawn(fn)
+    _wait_any([future], deadline, cancel_event)
+    return future.result()
+
+
+def hedged_call(fn: Callable[[], Any], deadline: Deadline, hedge_after: Optional[float],
+                cancel_event: Optional[threading.Event] = None) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """
+    Like call_with_deadline, but if `fn` hasn't returned after `hedge_after`
+    seconds a second identical call starts and the first result wins.
+    Returns (result, hedge record or None).
+    """
+    if deadline.expired():
+        raise deadline.exceeded()
+    started = time.monotonic()
+    primary = _spawn(fn)
+    if hedge_after is None:
+        _wait_any([primary], deadline, cancel_event)
+        return primary.result(), None
+
+    if _wait_any([primary], deadline, cancel_event, until=started + hedge_after) is primary:
+        return primary.result(), None
+
+    hedge = _spawn(fn)
+    record = {"after_ms": round(hedge_after * 1000, 1)}
+    pending = [primary, hedge]
+    while True:
+        winner = _wait_any(pending, deadline, cancel_event)
+        pending.remove(winner)
+        # A failed attempt only loses if the other one fails too
+        if winner.exception() is None or not pending:
+            record["winner"] = "primary" if winner is primary else "hedge"
+            return winner.result(), record
+
+
+# Process-wide latency samples, so hedge thresholds carry over between runs
+LATENCIES = LatencyTracker()
+
+
+class RunDeadlines:
+    """
+    Deadline bookkeeping for one run: the run deadline, the current agent's
+    deadline inside it, the cancel event, and a record of everything that fired.
+    """
+    def __init__(self, policy: DeadlinePolicy, cancel_event: Optional[threading.Event] = None,
+                 latencies: Optional[LatencyTracker] = None):
+        self.policy = policy
+        self.cancel_event = cancel_event
+        self.latencies = latencies or LATENCIES
+        self.run = Deadline(policy.run_seconds, RUN, "run")
+        self.agent = self.run
+        self.fired: List[Dict[str, Any]] = []
+
+    def start_agent(self, name: str) -> Deadline:
+        self.agent = Deadline(self.policy.for_agent(name), AGENT, name, parent=self.run)
+        return self.agent
+
+    def note(self, agent: str, error: DeadlineExceeded):
+        self.fired.append({"agent": agent, "scope": error.scope, "name": error.name, "seconds": error.seconds})
+
+    def call_llm(self, agent: str, fn: Callable[[Optional[float]], Any]) -> Any:
+        """
+        Run one LLM request inside the agent's deadline, hedged past the
+        agent's latency percentile when the policy asks for it. `fn` gets the
+        seconds remaining, to pass on as the client's own request timeout.
+        """
+        hedge_after = None
+        if self.policy.hedge_percentile is not None:
+            hedge_after = self.latencies.percentile(agent, self.policy.hedge_percentile, self.policy.hedge_min_samples)
+
+        started = time.monotonic()
+        result, hedge = hedged_call(lambda: fn(self.agent.remaining()), self.agent, hedge_after, self.cancel_event)
+        self.latencies.add(agent, time.monotonic() - started)
+        if hedge is not None:
+            print(f"  [Deadline] {agent} request hedged after {hedge['after_ms']}ms; {hedge['winner']} answered first")
+            self.fired.append({"agent": agent, "scope": HEDGE, "name": agent, **hedge})
+        return result
+
+    def call_tool(self, agent: str, name: str, fn: Callable[[], Any]) -> Any:
+        """Run one tool call inside its own deadline, itself inside the agent's."""
+        deadline = Deadline(self.policy.for_tool(name), TOOL, name, parent=self.agent)
+        return call_with_deadline(fn, deadline, self.cancel_event)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [dict(record) for record in self.fired]
@@ -0,0 +1,246 @@
+"""
+Digest reporting for sweep results.
+
+    python -m core.digest results.jsonl --group-by location --recipients recipients.json --dry-run
+
+Groups per-SKU results (e.g. the JSONL written by `python -m core.batch`) into
+one templated report per recipient. The LLM is asked for at most one short
+executive paragraph per digest; the tables are rendered locally.
+"""
+import argparse
+import json
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from core.risk import HEALTHY, classify_row, coverage
+
+GROUP_FIELDS = {"location": "Location", "category": "Category"}
+
+# Deliberately loose: catches typos and unmapped groups, the SMTP server has the final say
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+@dataclass
+class Digest:
+    recipient: str
+    groups: List[str] = field(default_factory=list)
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def risks(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if risk_of(r) != HEALTHY]
+
+    @property
+    def purchase_orders(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if r.get("po_qty")]
+
+    @property
+    def transfers(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if r.get("transfer_qty")]
+
+    @property
+    def forecast_updates(self) -> List[Dict[str, Any]]:
+        return [r for r in self.results if r.get("new_forecast")]
+
+
+def risk_of(result: Dict[str, Any]) -> str:
+    # Prefer the agents' verdict; fall back to the coverage rule for older results
+    if result.get("risk_type"):
+        return result["risk_type"]
+    if result.get("status") == HEALTHY:
+        return HEALTHY
+    try:
+        return classify_row(result)
+    except (KeyError, TypeError, ValueError):
+        return HEALTHY
+
+
+def load_results(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def build_digests(results: Iterable[Dict[str, Any]],
+                  group_by: str = "location",
+                  recipients: Optional[Dict[str, str]] = None,
+                  default_recipient: Optional[str] = None) -> List[Digest]:
+    """
+    One Digest per recipient. `recipients` maps a group value (a location or
+    category) to an email; unmapped groups go to `default_recipient` or are
+    dropped if there is none.
+    """
+    column = GROUP_FIELDS[group_by]
+    recipients = recipients or {}
+    digests: Dict[str, Digest] = {}
+    for result in results:
+        if "error" in result:
+            continue
+        group = str(result.get(column, "Unknown"))
+        recipient = recipients.get(group, default_recipient)
+        if not recipient:
+            continue
+        digest = digests.setdefault(recipient, Digest(recipient))
+        if group not in digest.groups:
+            digest.groups.append(group)
+        digest.results.append(result)
+    return list(digests.values())
+
+
+def _table(rows: List[Dict[str, Any]], columns: List[tuple]) -> str:
+    """
+    Fixed-width plain-text table. `columns` is a list of (header, getter).
+    """
+    if not rows:
+        return "  (none)"
+    cells = [[str(getter(r)) for _, getter in columns] for r in rows]
+    widths = [max(len(h), *(len(c[i]) for c in cells)) for i, (h, _) in enumerate(columns)]
+    header = "  " + "  ".join(h.ljust(w) for (h, _), w in zip(columns, widths))
+    rule = "  " + "  ".join("-" * w for w in widths)
+    body = ["  " + "  ".join(c.ljust(w) for c, w in zip(row, widths)) for row in cells]
+    return "\n".join([header, rule] + body)
+
+
+def digest_stats(digest: Digest) -> Dict[str, Any]:
+    return {
+        "skus": len(digest.results),
+        "at_risk": len(digest.risks),
+        "stockout_risks": sum(1 for r in digest.risks if "Stock-out" in risk_of(r)),
+        "po_units": sum(int(r["po_qty"]) for r in digest.purchase_orders),
+        "transfer_units": sum(int(r["transfer_qty"]) for r in digest.transfers),
+        "groups": digest.groups,
+    }
+
+
+def llm_executive_summary(digest: Digest) -> str:
+    """
+    One short LLM call per digest, fed only aggregate numbers.
+    """
+    from core.llm_service import LLMService
+
+    stats = digest_stats(digest)
+    prompt = (
+        "Write a 2-3 sentence executive summary for a supply chain planner digest. "
+        f"Scope: {', '.join(stats['groups'])}. SKUs reviewed: {stats['skus']}. "
+        f"At risk: {stats['at_risk']} ({stats['stockout_risks']} stock-out). "
+        f"Proposed purchase orders: {stats['po_units']} units. Proposed transfers: {stats['transfer_units']} units."
+    )
+    return LLMService().generate_response(prompt, system_prompt="You are a concise supply chain communication agent.")
+
+
+def render_digest(digest: Digest, executive_summary: Optional[str] = None) -> Dict[str, str]:
+    stats = digest_stats(digest)
+    subject = f"Supply Chain Digest: {', '.join(digest.groups)} - {stats['at_risk']} SKUs at risk"
+
+    sku = ("SKU", lambda r: r.get("SKU_ID", ""))
+    product = ("Product", lambda r: r.get("Product_Name", ""))
+    location = ("Location", lambda r: r.get("Location", ""))
+    sections = [
+        f"Supply chain digest for {', '.join(digest.groups)}",
+        "",
+        executive_summary or f"{stats['skus']} SKUs reviewed, {stats['at_risk']} at risk.",
+        "",
+        f"RISKS ({len(digest.risks)})",
+        _table(digest.risks, [sku, product, location,
+                              ("Risk", risk_of),
+                              ("Coverage", lambda r: f"{coverage(float(r.get('Current_Stock', 0)), float(r.get('Forecast', 0))):.2f}")]),
+        "",
+        f"PROPOSED PURCHASE ORDERS ({stats['po_units']} units)",
+        _table(digest.purchase_orders, [sku, product, location, ("Qty", lambda r: r["po_qty"])]),
+        "",
+        f"PROPOSED TRANSFERS ({stats['transfer_units']} units)",
+        _table(digest.transfers, [sku, product, location, ("Qty", lambda r: r["transfer_qty"])]),
+        "",
+        f"FORECAST UPDATES ({len(digest.forecast_updates)})",
+        _table(digest.forecast_updates, [sku, product, location,
+                                         ("Old", lambda r: r.get("Forecast", "")),
+                                         ("New", lambda r: r["new_forecast"])]),
+        "",
+        "All actions are proposals pending human approval.",
+    ]
+    return {"subject": subject, "body": "\n".join(sections)}
+
+
+def send_digests(digests: List[Digest],
+                 summarize: Optional[Callable[[Digest], str]] = llm_executive_summary,
+                 dry_run: bool = False,
+                 mailer=None,
+                 timeout: float = 300) -> List[Dict[str, str]]:
+    """
+    Render and deliver each digest through the background mailer (core.mailer),
+    then wait up to `timeout` seconds for delivery. Returns one status per
+    digest: "sent", "failed: <error>" or "pending" if it is still queued.
+    Digests for malformed recipient addresses are not sent. If `summarize`
+    fails, the digest goes out with the plain summary line instead.
+    `mailer` defaults to the process-wide one configured from SMTP_*.
+    """
+    import os
+    from core.mailer import FAILED, get_mailer
+
+    if not dry_run and mailer is None:
+        if not os.getenv("SMTP_EMAIL") or not os.getenv("SMTP_PASSWORD"):
+            error = "Error: SMTP credentials (SMTP_EMAIL, SMTP_PASSWORD) not found in .env"
+            return [{"recipient": d.recipient, "subject": render_digest(d)["subject"], "status": error} for d in digests]
+        mailer = get_mailer()
+
+    statuses, message_ids = [], []
+    for digest in digests:
+        if not dry_run and not EMAIL_PATTERN.match(digest.recipient or ""):
+            print(f"  [Digest] Not sending to invalid address {digest.recipient!r}")
+            statuses.append({"recipient": digest.recipient, "subject": render_digest(digest)["subject"],
+                             "status": f"{FAILED}: invalid recipient address"})
+            continue
+        summary = None
+        if summarize:
+            try:
+                summary = summarize(digest)
+            except Exception as e:
+                print(f"  [Digest] Executive summary for {digest.recipient} failed: {e}")
+        rendered = render_digest(digest, summary)
+        if dry_run:
+            print(f"To: {digest.recipient}\nSubject: {rendered['subject']}\n\n{rendered['body']}\n")
+            statuses.append({"recipient": digest.recipient, "subject": rendered["subject"], "status": "dry run"})
+        else:
+            message_ids.append(mailer.send(digest.recipient, rendered["subject"], rendered["body"]))
+            print(f"  [Digest] Queued digest for {digest.recipient} ({message_ids[-1]})")
+            statuses.append({"recipient": digest.recipient, "subject": rendered["subject"], "message_id": message_ids[-1]})
+
+    if message_ids:
+        mailer.flush(timeout=timeout)
+        for entry in statuses:
+            if "message_id" not in entry:
+                continue
+            delivery = mailer.wait(entry["message_id"], timeout=0)
+            # sent, pending or unknown as reported; failures carry the error
+            entry["status"] = f"{FAILED}: {delivery.error}" if delivery.status == FAILED else delivery.status
+            print(f"  [Digest] {entry['recipient']}: {entry['status']} ({entry['message_id']})")
+    return statuses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.digest", description="Send one digest email per recipient from sweep results")
+    parser.add_argument("results", help="JSONL results file (e.g. from python -m core.batch)")
+    parser.add_argument("--group-by", choices=sorted(GROUP_FIELDS), default="location")
+    parser.add_argument("--recipients", help="JSON file mapping location/category to an email address")
+    parser.add_argument("--default-recipient", help="Recipient for groups not in --recipients")
+    parser.add_argument("--no-llm", action="store_true", help="Skip the LLM executive paragraph")
+    parser.add_argument("--dry-run", action="store_true", help="Print digests instead of sending")
+    args = parser.parse_args(argv)
+
+    recipients = {}
+    if args.recipients:
+        with open(args.recipients, "r", encoding="utf-8") as f:
+            recipients = json.load(f)
+
+    digests = build_digests(load_results(args.results), args.group_by, recipients, args.default_recipient)
+    statuses = send_digests(digests, summarize=None if args.no_llm else llm_executive_summary, dry_run=args.dry_run)
+    for s in statuses:
+        print(f"{s['recipient']}: {s['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+# Event kinds
+MESSAGE = "message"
+TOOL = "tool"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+DEFAULT_SPILL_ROOT = os.path.join(tempfile.gettempdir(), "sc_control_events")
+# Spilled payloads stay readable from finished results (dashboard, batch JSONL) this long
+SPILL_MAX_AGE = 7 * 86400
+
+
+@dataclass(slots=True)
+class Event:
+    agent: str
+    kind: str
+    text: str = ""
+    tool: Optional[str] = None
+    payload: Optional[str] = None
+    payload_ref: Optional[str] = None
+    payload_size: int = 0
+    timestamp: float = 0.0
+    duration_ms: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """
+    One-line rendering of an event record, e.g. "[Forecast Agent] Tool update_forecast: ...".
+    """
+    if event["kind"] == TOOL:
+        return f"[{event['agent']}] Tool {event['tool']}: {event['text']}"
+    if event["kind"] == ERROR:
+        return f"[{event['agent']}] Error: {event['text']}"
+    return f"[{event['agent']}] {event['text']}"
+
+
+def load_payload(event: Dict[str, Any]) -> str:
+    """
+    Full payload of an event, reading it back from disk if it was spilled.
+    """
+    if event.get("payload_ref"):
+        try:
+            with open(event["payload_ref"], "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError as e:
+            return f"(payload unavailable: {e})"
+    return event.get("payload") or event.get("text", "")
+
+
+class EventLog:
+    """
+    Bounded per-run event log.
+
+    Keeps at most `maxlen` events in a ring buffer (oldest dropped first).
+    Payloads up to `spill_threshold` characters stay inline; larger ones are
+    written to `spill_dir/<run_id>/` and referenced by path, so a long web
+    search body never sits in memory or session state.
+    """
+    def __init__(self,
+                 run_id: Optional[str] = None,
+                 maxlen: int = 500,
+                 preview_chars: int = 200,
+                 spill_threshold: int = 2000,
+                 spill_dir: Optional[str] = None):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.preview_chars = preview_chars
+        self.spill_threshold = spill_threshold
+        self.spill_dir = os.path.join(spill_dir or DEFAULT_SPILL_ROOT, self.run_id)
+        self.dropped = 0
+        self._events: Deque[Event] = deque(maxlen=maxlen)
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def record(self,
+               agent: str,
+               kind: str,
+               payload: Any = "",
+               tool: Optional[str] = None,
+               duration: Optional[float] = None) -> Event:
+        """
+        Append an event. `duration` is in seconds.
+        """
+        payload = "" if payload is None else str(payload)
+        self._seq += 1
+
+        text = payload if len(payload) <= self.preview_chars else payload[:self.preview_chars] + "..."
+        inline, ref = None, None
+        if len(payload) > self.spill_threshold:
+            ref = self._spill(payload)
+        elif len(payload) > self.preview_chars:
+            inline = payload
+
+        event = Event(
+            agent=agent,
+            kind=kind,
+            text=text,
+            tool=tool,
+            payload=inline,
+            payload_ref=ref,
+            payload_size=len(payload),
+            timestamp=time.time(),
+            duration_ms=round(duration * 1000, 1) if duration is not None else None,
+        )
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+        return event
+
+    def _spill(self, payload: str) -> Optional[str]:
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{self._seq:05d}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            return path
+        except OSError as e:
+            print(f"Event spill failed: {e}")
+            return None
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [e.to_dict() for e in self._events]
+
+    def restore(self, records: Iterable[Dict[str, Any]]):
+        """Re-append records saved by `records()` (e.g. from a run checkpoint)."""
+        for record in records:
+            self._seq += 1
+            self._events.append(Event(**record))
+
+    def render(self) -> List[str]:
+        return [format_event(r) for r in self.records()]
+
+    def cleanup(self):
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+def gc_spills(root: str = DEFAULT_SPILL_ROOT, max_age: float = SPILL_MAX_AGE, now: Optional[float] = None) -> int:
+    """
+    Remove runs' spill directories not written to for `max_age` seconds.
+    Returns the number removed.
+    """
+    now = time.time() if now is None else now
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    for name in names:
+        path = os.path.join(root, name)
+        try:
+            if now - os.stat(path).st_mtime <= max_age:
+                continue
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
@@ -0,0 +1,132 @@
+"""
+Compact context at agent handoffs.
+
+Without compaction every agent is sent the whole run transcript: the
+kickoff message, each earlier agent's decision, tool-call turns and raw
+tool output (market news, web-search bodies). With it, an agent gets:
+
+    1. the kickoff message (SKU figures),
+    2. one handoff message: the facts and decisions so far (status, new
+       forecast, root cause, transfer / PO and the actions taken) plus a
+       one-line note from each earlier agent it depends on (HANDOFF_NOTES),
+    3. its own turns in this stage (its tool calls and their results).
+
+The full transcript is still kept for the run result, events and checkpoints;
+only what is sent changes. Per-agent history tokens, sent vs. what the full
+transcript would have cost, are recorded in the run's usage
+("history_tokens" / "history_tokens_full").
+
+    python -m core.handoff --sku P-142       # savings per agent for one SKU (simulated LLM)
+"""
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+from core.llm_service import estimate_tokens
+
+# Earlier agents whose one-line note (decision rationale) each agent is given
+HANDOFF_NOTES = {
+    "Forecast Agent": ("Monitoring Agent",),
+    "Root Cause Agent": ("Monitoring Agent", "Forecast Agent"),
+    "Inventory Agent": ("Monitoring Agent", "Root Cause Agent"),
+    "Procurement Agent": ("Forecast Agent", "Inventory Agent"),
+    "Communication Agent": ("Monitoring Agent", "Forecast Agent", "Root Cause Agent",
+                            "Inventory Agent", "Procurement Agent"),
+}
+NOTE_CHARS = 240
+
+# Analysis fields carried in the handoff message (final_summary is the last agent's own output)
+STATE_FIELDS = ("status", "risk_type", "new_forecast", "root_cause", "transfer_qty", "inventory_action",
+                "po_qty", "procurement_action")
+
+
+def history_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimated tokens for a message list as sent (content plus tool-call arguments)."""
+    return estimate_tokens(json.dumps(messages, default=str, separators=(",", ":")))
+
+
+def agent_note(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """One-line note from an agent's turns: its decision rationale, or its last reply."""
+    for message in reversed(messages):
+        content = str(message.get("content") or "").strip()
+        if message.get("role") != "assistant" or not content:
+            continue
+        if content.startswith("{"):
+            try:
+                content = str(json.loads(content).get("rationale") or "").strip() or content
+            except (ValueError, AttributeError):
+                pass
+        content = " ".join(content.split())
+        return content if len(content) <= NOTE_CHARS else content[:NOTE_CHARS - 3] + "..."
+    return None
+
+
+class Handoff:
+    """
+    Tracks where the current agent's turns start in the run transcript and
+    the notes left by finished agents, and builds what each agent is sent.
+    """
+    def __init__(self, enabled: bool = True, notes: Optional[Dict[str, str]] = None):
+        self.enabled = enabled
+        self.notes: Dict[str, str] = dict(notes or {})
+        self.start = 0
+
+    def begin(self, messages: List[Dict[str, Any]]):
+        self.start = len(messages)
+
+    def end(self, agent: str, messages: List[Dict[str, Any]]):
+        note = agent_note(messages[self.start:])
+        if note:
+            self.notes[agent] = note
+
+    def state_message(self, agent: str, state) -> Optional[Dict[str, Any]]:
+        analysis = state.analysis_dict()
+        handoff = {name: analysis[name] for name in STATE_FIELDS if analysis.get(name) is not None}
+        notes = {name: self.notes[name] for name in HANDOFF_NOTES.get(agent, ()) if name in self.notes}
+        if notes:
+            handoff["notes"] = notes
+        if not handoff:
+            return None
+        # Same shape as an earlier agent's structured decision, so it reads as the team's decisions so far
+        return {"role": "assistant", "content": json.dumps(handoff)}
+
+    def messages_for(self, agent: str, messages: List[Dict[str, Any]], state) -> List[Dict[str, Any]]:
+        if not self.enabled or self.start <= 1:
+            return messages  # nothing before this agent but the kickoff
+        handoff = self.state_message(agent, state)
+        return messages[:1] + ([handoff] if handoff else []) + messages[self.start:]
+
+
+def handoff_report(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Per-agent history tokens sent vs. the full transcript, from a run result's usage."""
+    report = []
+    for agent, totals in result.get("usage", {}).get("by_agent", {}).items():
+        full, sent = totals.get("history_tokens_full", 0), totals.get("history_tokens", 0)
+        report.append({"agent": agent, "full": full, "sent": sent, "saved": full - sent,
+                       "saved_pct": round(100 * (full - sent) / full, 1) if full else 0.0})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.handoff", description="Report handoff context savings per agent for a SKU")
+    parser.add_argument("--data", default="data/inventory_data_real.csv")
+    parser.add_argument("--sku", required=True)
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from core.llm_service import SimulatedBackend
+    from core.orchestrator import Orchestrator
+
+    df = pd.read_csv(args.data)
+    rows = df[df["SKU_ID"] == args.sku]
+    if rows.empty:
+        parser.error(f"SKU {args.sku} not found in {args.data}")
+    result = Orchestrator(data_file=args.data, llm=SimulatedBackend()).run(rows.iloc[0].to_dict())
+    report = handoff_report(result)
+    for r in report:
+        print(f"{r['agent']:<22} {r['sent']:>5} / {r['full']:<5} history tokens ({r['saved_pct']}% saved)")
+    print(f"{'Total':<22} {sum(r['sent'] for r in report):>5} / {sum(r['full'] for r in report):<5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Per-SKU daily sales history.
+
+Daily unit sales live in a memory-mapped SKU x day matrix (`sales.npy`) that
+only ever grows to the right: days are appended, never rewritten, except that
+the latest day can keep accumulating sales until a later day is recorded.
+Rolling aggregates are kept next to it (`stats.npy`) and updated with each
+append from the value entering and the value leaving each window, so a
+lookup is O(1) however long the history gets:
+
+- 7 / 30 / 90-day sums
+- trend slope: least-squares units/day change over the last 30 days
+- demand CV: std / mean of daily sales over the last 30 days
+- seasonality index: average daily sales in the current calendar month vs.
+  the SKU's overall daily average
+
+    history = SalesHistory("data/history")
+    history.record("2024-12-01", {"P-104": 12, "P-105": 3})
+    history.stats("P-104")["sales_30d"]
+    df = history.enrich(df)            # Sales_Trend_Last_30_Days etc. from history
+
+    python -m core.history seed        # demo history from the inventory CSV
+    python -m core.history show --sku P-104
+    python -m core.history ingest sales.csv   # Date,SKU_ID,Units rows
+
+Single writer: one process appends, any number may read.
+"""
+import argparse
+import json
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+HISTORY_DIR = "data/history"
+
+WINDOWS = (7, 30, 90)
+SLOPE_WINDOW = 30
+
+# stats.npy columns
+_SUM = {w: i for i, w in enumerate(WINDOWS)}
+_SUMSQ = len(WINDOWS)            # sum of squares over SLOPE_WINDOW
+_TSUM = _SUMSQ + 1               # sum of position * sales over SLOPE_WINDOW
+_FIRST_DAY = _TSUM + 1           # day the SKU was registered
+_MONTH_SUM = _FIRST_DAY + 1      # 12 columns: units sold per calendar month
+_MONTH_DAYS = _MONTH_SUM + 12    # 12 columns: days observed per calendar month
+_N_STATS = _MONTH_DAYS + 12
+
+_INITIAL_SKUS = 128
+_INITIAL_DAYS = 256
+
+
+def _as_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class SalesHistory:
+    def __init__(self, root: str = HISTORY_DIR):
+        import numpy as np
+
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._meta_path = os.path.join(root, "meta.json")
+        self._sales_path = os.path.join(root, "sales.npy")
+        self._stats_path = os.path.join(root, "stats.npy")
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            self.start = _as_date(meta["start"]) if meta["start"] else None
+            self.days = meta["days"]
+            self.skus: List[str] = meta["skus"]
+            self.sales = np.load(self._sales_path, mmap_mode="r+")
+            self.stats_array = np.load(self._stats_path, mmap_mode="r+")
+        else:
+            self.start, self.days, self.skus = None, 0, []
+            self.sales = self._allocate(self._sales_path, (_INITIAL_SKUS, _INITIAL_DAYS), np.float32)
+            self.stats_array = self._allocate(self._stats_path, (_INITIAL_SKUS, _N_STATS), np.float64)
+            self._save_meta()
+        self._pos = {sku: i for i, sku in enumerate(self.skus)}
+
+    # -- storage --
+
+    @staticmethod
+    def _allocate(path, shape, dtype):
+        import numpy as np
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    def _grow(self, path, array, shape):
+        # Double into a new file and swap it in; amortized O(1) per appended row/day
+        tmp = path + ".tmp.npy"
+        grown = self._allocate(tmp, shape, array.dtype)
+        grown[:array.shape[0], :array.shape[1]] = array
+        grown.flush()
+        del grown, array
+        os.replace(tmp, path)
+        import numpy as np
+        return np.load(path, mmap_mode="r+")
+
+    def _ensure_capacity(self, n_skus: int, n_days: int):
+        rows, cols = self.sales.shape
+        if n_skus > rows or n_days > cols:
+            while rows < n_skus:
+                rows *= 2
+            while cols < n_days:
+                cols *= 2
+            self.sales = self._grow(self._sales_path, self.sales, (rows, cols))
+        if n_skus > self.stats_array.shape[0]:
+            self.stats_array = self._grow(self._stats_path, self.stats_array, (rows, _N_STATS))
+
+    def _save_meta(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"start": self.start.isoformat() if self.start else None, "days": self.days, "skus": self.skus}, f)
+        os.replace(tmp, self._meta_path)
+
+    def flush(self):
+        self.sales.flush()
+        self.stats_array.flush()
+        self._save_meta()
+
+    # -- lookups --
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+    def __contains__(self, sku_id) -> bool:
+        return sku_id in self._pos
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return self.start + timedelta(days=self.days - 1) if self.days else None
+
+    def date_of(self, day: int) -> date:
+        return self.start + timedelta(days=day)
+
+    # -- ingestion --
+
+    def add_sku(self, sku_id: str) -> int:
+        pos = self._pos.get(sku_id)
+        if pos is not None:
+            return pos
+        pos = len(self.skus)
+        self._ensure_capacity(pos + 1, max(self.days, 1))
+        self.skus.append(sku_id)
+        self._pos[sku_id] = pos
+        self.stats_array[pos] = 0.0
+        first = max(self.days - 1, 0)
+        self.stats_array[pos, _FIRST_DAY] = first
+        if self.days:
+            # The SKU is observed from the latest day on; earlier days count as no sales
+            self.stats_array[pos, _MONTH_DAYS + self.date_of(first).month - 1] = 1
+        return pos
+
+    def _advance(self, to_day: int):
+        """Open days self.days .. to_day with zero sales, sliding every window."""
+        n = len(self.skus)
+        self._ensure_capacity(max(n, 1), to_day + 1)
+        stats = self.stats_array[:n]
+        for day in range(self.days, to_day + 1):
+            self.sales[:n, day] = 0.0
+            for w in WINDOWS:
+                if day - w < 0:
+                    continue
+                leaving = self.sales[:n, day - w].astype("float64")
+                if w == SLOPE_WINDOW:
+                    # Every remaining value moves one position left; the new day enters at 0 units
+                    stats[:, _TSUM] -= stats[:, _SUM[w]] - leaving
+                    stats[:, _SUMSQ] -= leaving ** 2
+                stats[:, _SUM[w]] -= leaving
+            if day < SLOPE_WINDOW:
+                stats[:, _TSUM] -= stats[:, _SUM[SLOPE_WINDOW]]
+            stats[:, _MONTH_DAYS + self.date_of(day).month - 1] += 1
+        self.days = to_day + 1
+
+    def _add(self, rows, day: int, units):
+        import numpy as np
+
+        rows = np.asarray(rows, dtype=np.int64)
+        units = np.asarray(units, dtype=np.float64)
+        stats = self.stats_array
+        old = self.sales[rows, day].astype(np.float64)
+        self.sales[rows, day] = old + units
+        for w in WINDOWS:
+            stats[rows, _SUM[w]] += units
+        stats[rows, _SUMSQ] += (old + units) ** 2 - old ** 2
+        stats[rows, _TSUM] += (SLOPE_WINDOW - 1) * units
+        stats[rows, _MONTH_SUM + self.date_of(day).month - 1] += units
+
+    def record(self, when, sales: Mapping[str, float], flush: bool = True):
+        """
+        Add units sold on `when` (a date or ISO string) per SKU. Days between
+        the latest recorded day and `when` are filled with zero sales. Sales
+        for a day before the latest one are rejected: the store is append-only.
+        """
+        when = _as_date(when)
+        if self.start is None:
+            self.start = when
+        day = (when - self.start).days
+        if day < self.days - 1 or day < 0:
+            raise ValueError(f"Sales history is append-only: {when} is before the latest recorded day {self.last_date}")
+        if day >= self.days:
+            self._advance(day)
+        rows = [self.add_sku(str(sku)) for sku in sales]
+        if rows:
+            self._add(rows, day, [float(v) for v in sales.values()])
+        if flush:
+            self.flush()
+
+    def append_days(self, first, sku_ids: Sequence[str], units):
+        """
+        Bulk append: `units` is a SKUs x days array for consecutive days
+        starting at `first`.
+        """
+        import numpy as np
+
+        units = np.asarray(units, dtype=np.float64)
+        first = _as_date(first)
+        for offset in range(units.shape[1]):
+            self.record(first + timedelta(days=offset), {}, flush=False)
+            if offset == 0:
+                rows = [self.add_sku(str(sku)) for sku in sku_ids]
+            self._add(rows, self.days - 1, units[:, offset])
+        self.flush()
+
+    # -- aggregates --
+
+    def _derived(self, rows):
+        import numpy as np
+
+        stats = self.stats_array[rows]
+        observed = np.maximum(self.days - stats[:, _FIRST_DAY], 0)
+        n = np.minimum(observed, SLOPE_WINDOW)
+
+        # Regression over positions SLOPE_WINDOW - n .. SLOPE_WINDOW - 1
+        lo = SLOPE_WINDOW - n
+        sx = n * (lo + SLOPE_WINDOW - 1) / 2
+        sxx = ((SLOPE_WINDOW - 1) * SLOPE_WINDOW * (2 * SLOPE_WINDOW - 1) - (lo - 1) * lo * (2 * lo - 1)) / 6
+        s, t = stats[:, _SUM[SLOPE_WINDOW]], stats[:, _TSUM]
+        denom = n * sxx - sx ** 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(denom > 0, (n * t - sx * s) / denom, 0.0)
+            mean = np.where(n > 0, s / n, 0.0)
+            var = np.maximum(np.where(n > 0, stats[:, _SUMSQ] / n, 0.0) - mean ** 2, 0.0)
+            cv = np.where(mean > 0, np.sqrt(var) / mean, np.nan)
+
+            month = self.last_date.month - 1 if self.days else 0
+            overall = stats[:, _MONTH_SUM:_MONTH_SUM + 12].sum(axis=1) / stats[:, _MONTH_DAYS:_MONTH_DAYS + 12].sum(axis=1)
+            this_month = stats[:, _MONTH_SUM + month] / stats[:, _MONTH_DAYS + month]
+            seasonality = np.where(overall > 0, this_month / overall, 1.0)
+        return {
+            "sales_7d": stats[:, _SUM[7]],
+            "sales_30d": stats[:, _SUM[30]],
+            "sales_90d": stats[:, _SUM[90]],
+            "trend_slope": slope,
+            "demand_cv": cv,
+            "seasonality_index": np.nan_to_num(seasonality, nan=1.0),
+            "days_observed": observed,
+        }
+
+    def stats(self, sku_id: str) -> Optional[Dict[str, float]]:
+        pos = self._pos.get(sku_id)
+        if pos is None:
+            return None
+        return {name: float(values[0]) for name, values in self._derived([pos]).items()}
+
+    def frame(self, sku_ids: Optional[Sequence[str]] = None):
+        """Aggregates for many SKUs at once, indexed by SKU_ID."""
+        import pandas as pd
+
+        sku_ids = list(self.skus if sku_ids is None else [s for s in sku_ids if s in self._pos])
+        derived = self._derived([self._pos[s] for s in sku_ids])
+        return pd.DataFrame(derived, index=pd.Index(sku_ids, name="SKU_ID"))
+
+    def enrich(self, df):
+        """
+        Inventory rows with history-backed demand columns: Sales_Trend_Last_30_Days
+        (when 30 days are on record), Sales_7d, Sales_90d, Trend_Slope,
+        Seasonality_Index and Demand_CV (picked up by core.simulation).
+        SKUs without history keep their CSV values.
+        """
+        import numpy as np
+
+        df = df.copy()
+        sku_ids = df["SKU_ID"].astype(str)
+        stats = self.frame(sku_ids.unique()).reindex(sku_ids)
+        full = (stats["days_observed"] >= 30).to_numpy()
+        trend = np.rint(stats["sales_30d"].to_numpy())
+        df["Sales_Trend_Last_30_Days"] = np.where(full, trend, df["Sales_Trend_Last_30_Days"]).astype(np.int64)
+        df["Sales_7d"] = stats["sales_7d"].to_numpy()
+        df["Sales_90d"] = stats["sales_90d"].to_numpy()
+        df["Trend_Slope"] = stats["trend_slope"].round(3).to_numpy()
+        df["Seasonality_Index"] = stats["seasonality_index"].round(2).to_numpy()
+        df["Demand_CV"] = stats["demand_cv"].round(3).to_numpy()
+        return df
+
+    def series(self, sku_id: str, days: int = 180) -> Tuple[List[date], Any]:
+        """Daily sales for the last `days` days (dates, values)."""
+        pos = self._pos.get(sku_id)
+        if pos is None or not self.days:
+            return [], []
+        first = max(0, self.days - days)
+        return [self.date_of(d) for d in range(first, self.days)], self.sales[pos, first:self.days].copy()
+
+    def monthly(self, sku_id: str, months: int = 6) -> List[Tuple[str, float]]:
+        """Units per calendar month for the last `months` months, oldest first."""
+        dates, values = self.series(sku_id, days=31 * (months + 1))
+        totals: Dict[Tuple[int, int], float] = {}
+        for d, v in zip(dates, values):
+            totals[(d.year, d.month)] = totals.get((d.year, d.month), 0.0) + float(v)
+        keys = sorted(totals)[-months:]
+        return [(date(y, m, 1).strftime("%b"), totals[(y, m)]) for y, m in keys]
+
+
+# --- Demo data ---------------------------------------------------------------
+
+# Monthly demand multipliers by the catalog's Season column
+SEASON_SHAPE = {
+    "Winter": [1.3, 1.1, 0.9, 0.7, 0.6, 0.6, 0.6, 0.7, 0.8, 1.0, 1.3, 1.5],
+    "Summer": [0.6, 0.6, 0.8, 1.0, 1.2, 1.4, 1.5, 1.3, 1.0, 0.8, 0.6, 0.6],
+}
+
+
+def seed_from_inventory(history: SalesHistory, df, days: int = 180, end="2024-11-30", seed: int = 0):
+    """
+    Fill an empty store with plausible daily sales for every row of `df`:
+    seasonal shape from `Season`, noise, and the last 30 days scaled to the
+    row's Sales_Trend_Last_30_Days. For demos and tests only.
+    """
+    import numpy as np
+
+    end = _as_date(end)
+    first = end - timedelta(days=days - 1)
+    months = np.array([(first + timedelta(days=d)).month - 1 for d in range(days)])
+    rng = np.random.default_rng(seed)
+
+    shape = np.array([SEASON_SHAPE.get(s, [1.0] * 12) for s in df["Season"].fillna("All Year")])[:, months]
+    daily = shape * rng.lognormal(0.0, 0.3, size=shape.shape)
+    target = df["Sales_Trend_Last_30_Days"].fillna(0).to_numpy(dtype=np.float64)
+    scale = target / np.maximum(daily[:, -30:].sum(axis=1), 1e-9)
+    units = np.rint(daily * scale[:, None])
+    history.append_days(first, df["SKU_ID"].astype(str).tolist(), units)
+    return history
+
+
+def open_history(root: str = HISTORY_DIR, data_file: str = "data/inventory_data_real.csv") -> SalesHistory:
+    """The store at `root`, seeded from `data_file` on first use."""
+    history = SalesHistory(root)
+    if not history.days:
+        import pandas as pd
+        seed_from_inventory(history, pd.read_csv(data_file))
+    return history
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.history", description="Per-SKU daily sales history")
+    parser.add_argument("--root", default=HISTORY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    seed_p = sub.add_parser("seed", help="Create demo history from the inventory CSV")
+    seed_p.add_argument("--data", default="data/inventory_data_real.csv")
+    seed_p.add_argument("--days", type=int, default=180)
+    show_p = sub.add_parser("show", help="Print aggregates for one SKU")
+    show_p.add_argument("--sku", required=True)
+    ingest_p = sub.add_parser("ingest", help="Append sales from a Date,SKU_ID,Units CSV")
+    ingest_p.add_argument("file")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    history = SalesHistory(args.root)
+    if args.command == "seed":
+        if history.days:
+            parser.error(f"{args.root} already has {history.days} days of history")
+        seed_from_inventory(history, pd.read_csv(args.data), days=args.days)
+        print(f"Seeded {len(history)} SKUs x {history.days} days into {args.root}")
+    elif args.command == "show":
+        stats = history.stats(args.sku)
+        if stats is None:
+            parser.error(f"No history for {args.sku}")
+        for name, value in stats.items():
+            print(f"{name:<18} {value:,.3f}")
+        print("monthly           " + ", ".join(f"{m} {v:,.0f}" for m, v in history.monthly(args.sku)))
+    else:
+        sales = pd.read_csv(args.file).sort_values("Date", kind="stable")
+        for day, group in sales.groupby("Date", sort=True):
+            totals = group.groupby("SKU_ID")["Units"].sum()
+            history.record(day, totals.to_dict(), flush=False)
+        history.flush()
+        print(f"Ingested {len(sales)} rows; history now ends {history.last_date}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Streaming ingestion of inventory delta events.
+
+    python -m core.ingest tail data/inventory_events.jsonl --debounce 5
+    python -m core.ingest socket --port 8765
+    echo '{"type": "sale", "sku": "P-104", "qty": 3}' | nc localhost 8765
+
+Each event is one JSON object per line:
+
+    {"type": "sale",    "sku": "P-104", "qty": 3,  "ts": "2024-12-01T10:15:00"}   stock -= qty, sales history += qty
+    {"type": "receipt", "sku": "P-104", "qty": 40}                                  stock += qty, on order -= qty
+    {"type": "stock",   "sku": "P-104", "qty": 118}                                 cycle count: stock = qty
+
+Events are buffered per SKU and applied in bursts: a SKU is flushed once no
+new event has arrived for `debounce` seconds (or `max_wait` after its first
+pending event, so a steady stream can't hold it back forever). A flush
+applies the deltas to the inventory CSV in one write, updates whatever is
+attached (rollups, policy engine, sales history, an urgency queue) for
+just those SKUs, and re-runs the risk screen (core.multi_sku) for them
+only, so 50 sales in a minute on one SKU cost one re-analysis, not 50.
+
+Sales history is append-only, so a sale is only recorded on a known day: a
+sale without `ts` counts towards the history's latest day, and one dated
+more than `max_gap_days` past it is not recorded (stock is still updated);
+otherwise a single stray timestamp would open weeks of zero-sales days.
+"""
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+SALE = "sale"
+RECEIPT = "receipt"
+STOCK = "stock"
+EVENT_TYPES = (SALE, RECEIPT, STOCK)
+
+DEFAULT_EVENTS = "data/inventory_events.jsonl"
+
+# Largest jump past the sales history's latest day a dated sale may open
+MAX_GAP_DAYS = 7
+
+
+def parse_event(line: str) -> Optional[Dict[str, Any]]:
+    """One JSONL line as an event, or None (with a message) if it isn't a valid one."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        event = json.loads(line)
+        if event.get("type") not in EVENT_TYPES:
+            raise ValueError(f"unknown type {event.get('type')!r}")
+        event["sku"] = str(event["sku"])
+        event["qty"] = float(event["qty"])
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"  [Ingest] Skipping bad event {line[:80]!r}: {e}")
+        return None
+    return event
+
+
+def apply_events(row: Dict[str, Any], events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Inventory row after a SKU's events, in arrival order (a new dict)."""
+    row = dict(row)
+    stock = float(row.get("Current_Stock") or 0)
+    on_order = row.get("On_Order")
+    on_order = 0.0 if on_order is None or on_order != on_order else float(on_order)
+    for event in events:
+        if event["type"] == SALE:
+            stock = max(stock - event["qty"], 0.0)
+        elif event["type"] == RECEIPT:
+            stock += event["qty"]
+            on_order = max(on_order - event["qty"], 0.0)
+        else:
+            stock = max(event["qty"], 0.0)
+    row["Current_Stock"] = int(round(stock))
+    row["On_Order"] = int(round(on_order))
+    return row
+
+
+def tail_jsonl(path: str, from_start: bool = False, poll: float = 0.5,
+               stop: Optional[threading.Event] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Follow a JSONL file like `tail -f`, yielding events as lines are appended.
+    Yields None whenever it is idle for `poll` seconds, so the consumer can
+    flush debounced SKUs between events. A truncated/rotated file is reopened.
+    """
+    stop = stop or threading.Event()
+    while not os.path.exists(path):
+        if stop.wait(poll):
+            return
+        yield None
+    f = open(path, "r", encoding="utf-8")
+    try:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        partial = ""
+        while not stop.is_set():
+            line = f.readline()
+            if line:
+                partial += line
+                if not partial.endswith("\n"):
+                    continue  # writer is mid-line
+                event, partial = parse_event(partial), ""
+                if event is not None:
+                    yield event
+                continue
+            if os.path.exists(path) and os.path.getsize(path) < f.tell():
+                f.close()
+                f = open(path, "r", encoding="utf-8")
+            yield None
+            stop.wait(poll)
+    finally:
+        f.close()
+
+
+class DeltaIngestor:
+    def __init__(self, data_file: str = "data/inventory_data_real.csv", debounce: float = 5.0,
+                 max_wait: float = 30.0, screener=None, screen: bool = True, rollup=None, policy=None,
+                 history=None, queue=None, on_flush: Optional[Callable[[List[Dict[str, Any]], Dict[str, Any]], None]] = None,
+                 max_gap_days: int = MAX_GAP_DAYS):
+        self.data_file = data_file
+        self.max_gap_days = max_gap_days
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.screen_enabled = screen
+        self._screener = screener
+        self.rollup = rollup
+        self.policy = policy
+        self.history = history
+        self.queue = queue
+        self.on_flush = on_flush
+        self.screened: Dict[str, Dict[str, Any]] = {}
+        self.counts = {"events": 0, "flushes": 0, "skus_flushed": 0, "screened": 0, "unknown_sku": 0,
+                       "sales_not_recorded": 0, "view_errors": 0, "flush_errors": 0}
+        self._pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._first: Dict[str, float] = {}
+        self._last: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def screener(self):
+        # Multi-SKU monitoring + forecast screen (core.multi_sku), created on first flush
+        if self._screener is None:
+            from core.multi_sku import MultiSkuRunner
+            self._screener = MultiSkuRunner()
+        return self._screener
+
+    def submit(self, event: Dict[str, Any], now: Optional[float] = None):
+        """Buffer one event; its SKU is flushed after the debounce window."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            sku = event["sku"]
+            self._pending[sku].append(event)
+            self._first.setdefault(sku, now)
+            self._last[sku] = now
+            self.counts["events"] += 1
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return [sku for sku in self._pending
+                    if now - self._last[sku] >= self.debounce or now - self._first[sku] >= self.max_wait]
+
+    def flush(self, skus: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Apply the pending events of `skus` (default: all pending) to the
+        inventory file and attached views, then re-screen those SKUs.
+        Returns the updated rows.
+        """
+        from core.orchestrator import inventory_lock
+
+        with self._lock:
+            skus = list(self._pending) if skus is None else [s for s in skus if s in self._pending]
+            batch = {sku: self._pending.pop(sku) for sku in skus}
+            for sku in skus:
+                self._first.pop(sku, None)
+                self._last.pop(sku, None)
+        if not batch:
+            return []
+
+        # Held across the read-modify-write and the view updates: approved changes
+        # (Orchestrator.persist_changes) and dashboard reads take the same lock
+        with inventory_lock(self.data_file):
+            updated = self._apply(batch)
+        if not updated:
+            return []
+
+        screened = self._screen(updated) if self.screen_enabled else {}
+        print(f"  [Ingest] Applied {sum(len(e) for e in batch.values())} events to {len(updated)} SKUs"
+              + (f", re-screened {len(screened)}" if screened else ""))
+        if self.on_flush is not None:
+            self._guarded("on_flush", self.on_flush, updated, screened)
+        return updated
+
+    def _apply(self, batch: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        import pandas as pd
+
+        # Re-read on every flush so edits made elsewhere (e.g. approved POs) aren't overwritten
+        df = pd.read_csv(self.data_file)
+        index = {str(sku): i for i, sku in enumerate(df["SKU_ID"].astype(str))}
+        updated = []
+        for sku, events in batch.items():
+            i = index.get(sku)
+            if i is None:
+                self.counts["unknown_sku"] += 1
+                print(f"  [Ingest] {len(events)} events for unknown SKU {sku} ignored")
+                continue
+            row = apply_events(df.iloc[i].to_dict(), events)
+            df.loc[df.index[i], ["Current_Stock", "On_Order"]] = [row["Current_Stock"], row["On_Order"]]
+            updated.append(row)
+        if not updated:
+            return []
+
+        tmp = self.data_file + ".tmp"
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, self.data_file)
+        self.counts["flushes"] += 1
+        self.counts["skus_flushed"] += len(updated)
+
+        self._guarded("sales history", self._record_sales, batch)
+        for row in updated:
+            if self.rollup is not None:
+                self._guarded("rollup", self.rollup.update_row, row)
+            if self.policy is not None:
+                self._guarded("policy", self.policy.update_row, row)
+            if self.queue is not None:
+                self._guarded("queue", self.queue.update, row)
+        return updated
+
+    def _guarded(self, name: str, update, *args):
+        # The file is already written; a view that fails to follow must not stop the other views or ingest
+        try:
+            update(*args)
+        except Exception as e:
+            self.counts["view_errors"] += 1
+            print(f"  [Ingest] Updating {name} failed: {e}")
+
+    def _record_sales(self, batch: Dict[str, List[Dict[str, Any]]]):
+        if self.history is None:
+            return
+        from core.history import _as_date
+
+        latest = self.history.last_date
+        by_day: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for sku, events in batch.items():
+            for event in events:
+                if event["type"] != SALE:
+                    continue
+                try:
+                    # Undated sales count towards the store's current day, never the wall clock
+                    day = _as_date(event["ts"]) if event.get("ts") else latest
+                except ValueError:
+                    day = None
+                if day is None or (latest is not None and (day - latest).days > self.max_gap_days):
+                    self.counts["sales_not_recorded"] += 1
+                    print(f"  [Ingest] Sale of {sku} at {event.get('ts') or 'no ts'} not recorded in history"
+                          f" (latest day {latest})")
+                    continue
+                by_day[day.isoformat()][sku] += event["qty"]
+        for day in sorted(by_day):
+            try:
+                self.history.record(day, by_day[day])
+            except ValueError as e:
+                print(f"  [Ingest] Sales for {day} not recorded: {e}")
+
+    def _screen(self, rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        import pandas as pd
+
+        if self.history is not None:
+            from core.orchestrator import inventory_lock
+            with inventory_lock(self.data_file):
+                rows = self.history.enrich(pd.DataFrame(rows)).to_dict(orient="records")
+        try:
+            screened = self.screener.screen(rows)
+        except Exception as e:
+            print(f"  [Ingest] Screen failed: {e}")
+            return {}
+        for sku, result in screened.items():
+            previous = self.screened.get(sku, {}).get("status")
+            if previous is not None and previous != result.get("status"):
+                print(f"  [Ingest] {sku}: {previous} -> {result.get('status')}")
+        self.screened.update(screened)
+        self.counts["screened"] += len(screened)
+        return screened
+
+    def consume(self, events: Iterable[Optional[Dict[str, Any]]]):
+        """
+        Feed events from a source (None = idle tick) and flush SKUs as their
+        debounce windows close. Returns when the source ends or `stop()` is called.
+        """
+        for event in events:
+            if event is not None:
+                self.submit(event)
+            due = self.due()
+            if due:
+                self._safe_flush(due)
+            if self._stop.is_set():
+                break
+        self._safe_flush()
+
+    def _safe_flush(self, skus: Optional[List[str]] = None):
+        # An error in one flush (e.g. an unreadable file) must not end the consumer thread
+        try:
+            self.flush(skus)
+        except Exception as e:
+            self.counts["flush_errors"] += 1
+            print(f"  [Ingest] Flush failed: {e}")
+
+    def start(self, events: Iterable[Optional[Dict[str, Any]]]) -> threading.Thread:
+        """`consume` on a background thread."""
+        self._thread = threading.Thread(target=self.consume, args=(events,), daemon=True, name="sc-ingest")
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            event = parse_event(raw.decode("utf-8", errors="replace"))
+            if event is not None:
+                self.server.ingestor.submit(event)
+
+
+def serve_socket(ingestor: DeltaIngestor, host: str = "127.0.0.1", port: int = 8765,
+                 tick: float = 0.5) -> socketserver.ThreadingTCPServer:
+    """
+    Accept JSONL events on a local TCP socket (one event per line, any
+    number of connections) and flush debounced SKUs every `tick` seconds.
+    Returns the running server; `server.shutdown()` then `ingestor.stop()` to end.
+    """
+    server = socketserver.ThreadingTCPServer((host, port), _LineHandler)
+    server.daemon_threads = True
+    server.ingestor = ingestor
+    threading.Thread(target=server.serve_forever, daemon=True, name="sc-ingest-socket").start()
+
+    def ticks():
+        while not ingestor._stop.wait(tick):
+            yield None
+    ingestor.start(ticks())
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.ingest", description="Apply streaming inventory delta events")
+    parser.add_argument("--data", default="data/inventory_data_real.csv", help="Inventory CSV to update")
+    parser.add_argument("--debounce", type=float, default=5.0, help="Quiet seconds before a SKU is flushed")
+    parser.add_argument("--max-wait", type=float, default=30.0, help="Flush a busy SKU at least this often")
+    parser.add_argument("--no-screen", action="store_true", help="Only apply deltas; skip the risk re-screen")
+    parser.add_argument("--history", default=None, help="Sales history directory (core.history) to record sales into")
+    sub = parser.add_subparsers(dest="command", required=True)
+    tail = sub.add_parser("tail", help="Follow a JSONL events file")
+    tail.add_argument("path", nargs="?", default=DEFAULT_EVENTS)
+    tail.add_argument("--from-start", action="store_true", help="Replay the whole file first")
+    sock = sub.add_parser("socket", help="Listen for JSONL events on a local TCP port")
+    sock.add_argument("--host", default="127.0.0.1")
+    sock.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    history = None
+    if args.history:
+        from core.history import SalesHistory
+        history = SalesHistory(args.history)
+    ingestor = DeltaIngestor(args.data, debounce=args.debounce, max_wait=args.max_wait,
+                             screen=not args.no_screen, history=history)
+    try:
+        if args.command == "tail":
+            print(f"Following {args.path} (Ctrl+C to stop)")
+            ingestor.consume(tail_jsonl(args.path, from_start=args.from_start))
+        else:
+            server = serve_socket(ingestor, args.host, args.port)
+            print(f"Listening on {args.host}:{args.port} (Ctrl+C to stop)")
+            try:
+                while True:
+                    time.sleep(1)
+            finally:
+                server.shutdown()
+                ingestor.stop()
+    except KeyboardInterrupt:
+        ingestor.flush()
+    print(f"Ingest stopped: {ingestor.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+def run_key(run_data: Dict[str, Any]) -> str:
+    """
+    Stable key for a run request. Two sessions asking for the same SKU with the
+    same inventory figures and season share one job.
+    """
+    payload = json.dumps(run_data, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Job:
+    job_id: str
+    key: str
+    sku_id: str
+    status: str = QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    @property
+    def elapsed(self) -> float:
+        start = self.started_at or self.submitted_at
+        end = self.finished_at or time.time()
+        return end - start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "sku_id": self.sku_id,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobStore:
+    """
+    Thread-safe in-process store shared by every Streamlit session.
+    Keeps every active job and the most recent `max_finished` finished ones.
+    """
+    def __init__(self, max_finished: int = 200):
+        self.max_finished = max_finished
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def add(self, job: Job):
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._by_key[job.key] = job.job_id
+            self._evict()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, key: str) -> Optional[Job]:
+        with self._lock:
+            job_id = self._by_key.get(key)
+            return self._jobs.get(job_id) if job_id else None
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _evict(self):
+        finished = [j for j in self._jobs.values() if not j.is_active]
+        excess = len(finished) - self.max_finished
+        if excess <= 0:
+            return
+        finished.sort(key=lambda j: j.finished_at or j.submitted_at)
+        for job in finished[:excess]:
+            self._jobs.pop(job.job_id, None)
+            if self._by_key.get(job.key) == job.job_id:
+                self._by_key.pop(job.key, None)
+
+
+class JobManager:
+    """
+    Runs orchestrator pipelines on a worker pool so the caller (e.g. a Streamlit
+    rerun) only submits and polls.
+    """
+    def __init__(self,
+                 runner: Optional[Callable[[Dict[str, Any], threading.Event], Dict[str, Any]]] = None,
+                 max_workers: int = 4,
+                 store: Optional[JobStore] = None):
+        self.runner = runner or self._default_runner
+        self.store = store or JobStore()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sc-job")
+        self._submit_lock = threading.Lock()
+
+    @staticmethod
+    def _default_runner(run_data: Dict[str, Any], cancel_event: threading.Event) -> Dict[str, Any]:
+        from core.checkpoint import CheckpointStore
+        from core.orchestrator import Orchestrator
+        # Checkpointed per agent, so a rerun or restart of the same request resumes where it stopped
+        return Orchestrator(checkpoints=CheckpointStore()).run(run_data, cancel_event=cancel_event)
+
+    def submit(self, run_data: Dict[str, Any], force: bool = False) -> Job:
+        """
+        Submit a run. If an identical run is in flight or already finished
+        successfully, that job is returned instead of starting a duplicate.
+        """
+        key = run_key(run_data)
+        with self._submit_lock:
+            existing = self.store.find(key)
+            if existing and not force and existing.status in (QUEUED, RUNNING, DONE):
+                return existing
+
+            job = Job(job_id=uuid.uuid4().hex[:12], key=key, sku_id=str(run_data.get("SKU_ID", "")))
+            self.store.add(job)
+            job.future = self.executor.submit(self._execute, job, dict(run_data))
+            return job
+
+    def attach(self, run_data: Dict[str, Any]) -> Optional[Job]:
+        """Return the job for an identical run, if any, without submitting."""
+        return self.store.find(run_key(run_data))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def status(self, job_id: str) -> Optional[str]:
+        job = self.store.get(job_id)
+        return job.status if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. Queued jobs never start; running jobs stop at the next
+        agent handoff.
+        """
+        job = self.store.get(job_id)
+        if not job or not job.is_active:
+            return False
+        job.cancel_event.set()
+        if job.future and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        job = self.store.get(job_id)
+        if job and job.future:
+            try:
+                job.future.result(timeout=timeout)
+            except Exception:
+                pass
+        return job
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _execute(self, job: Job, run_data: Dict[str, Any]):
+        if job.cancel_event.is_set():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            result = self.runner(run_data, job.cancel_event)
+            job.result = result
+            job.status = CANCELLED if job.cancel_event.is_set() else DONE
+        except Exception as e:
+            print(f"Job {job.job_id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
@@ -1,40 +1,438 @@
+import asyncio
+import hashlib
+import json
+import math
 import os
 import random
-from dotenv import load_dotenv
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
 
-load_dotenv()
 
-class LLMService:
-    def __init__(self, provider="openai"):
-        self.provider = provider
-        self.api_key = os.environ.get("OPENAI_API_KEY")
+# --- Response types -------------------------------------------------------
+# Mirror the attribute shape of OpenAI chat-completion objects so callers can
+# treat every backend's responses the same way.
 
-    def generate_response(self, prompt: str, system_prompt: str = "") -> str:
-        """
-        Generates a response from the LLM.
-        If no API key is present, returns a simulated response based on keywords in the prompt.
-        """
-        if not self.api_key:
-            return self._simulate_response(prompt)
-            
-        try:
+@dataclass
+class FunctionCall:
+    name: str
+    arguments: str
+
+
+@dataclass
+class ToolCall:
+    id: str
+    function: FunctionCall
+    type: str = "function"
+
+
+@dataclass
+class ChatMessage:
+    content: Optional[str] = None
+    tool_calls: Optional[List[ToolCall]] = None
+    role: str = "assistant"
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {
+            "role": self.role,
+            "content": self.content,
+            "tool_calls": [
+                {"id": tc.id, "type": tc.type, "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
+                for tc in self.tool_calls
+            ] if self.tool_calls else None,
+        }
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class Choice:
+    message: ChatMessage
+    finish_reason: str = "stop"
+    index: int = 0
+
+
+@dataclass
+class ChatResponse:
+    choices: List[Choice]
+    model: str = ""
+    usage: Usage = field(default_factory=Usage)
+
+    def model_dump(self) -> Dict[str, Any]:
+        return {
+            "object": "chat.completion",
+            "model": self.model,
+            "choices": [{"index": c.index, "message": c.message.model_dump(), "finish_reason": c.finish_reason}
+                        for c in self.choices],
+            "usage": {"prompt_tokens": self.usage.prompt_tokens, "completion_tokens": self.usage.completion_tokens,
+                      "total_tokens": self.usage.total_tokens},
+        }
+
+    @classmethod
+    def from_dict(cls, body: Dict[str, Any]) -> "ChatResponse":
+        """Rebuild a response from chat-completion JSON (e.g. a Batch API output line)."""
+        choices = []
+        for c in body.get("choices", []):
+            m = c.get("message") or {}
+            tool_calls = [
+                ToolCall(tc["id"], FunctionCall(tc["function"]["name"], tc["function"]["arguments"]), tc.get("type", "function"))
+                for tc in m.get("tool_calls") or []
+            ] or None
+            message = ChatMessage(m.get("content"), tool_calls, m.get("role", "assistant"))
+            choices.append(Choice(message, c.get("finish_reason", "stop"), c.get("index", 0)))
+        usage = body.get("usage") or {}
+        return cls(choices, body.get("model", ""),
+                   Usage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose / JSON
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+# --- Backends ---------------------------------------------------------------
+
+class LLMBackend(ABC):
+    """
+    Chat-completions interface shared by the Orchestrator and LLMService.
+
+    `chat()` returns an OpenAI-shaped response (choices[0].message with
+    content / tool_calls, plus usage). `achat()` is the async variant and
+    `stream()` yields content deltas.
+    """
+    name = "base"
+
+    @abstractmethod
+    def chat(self, model: str, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None, **kwargs):
+        raise NotImplementedError
+
+    async def achat(self, model: str, messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None, **kwargs):
+        return await asyncio.to_thread(self.chat, model, messages, tools, **kwargs)
+
+    def stream(self, model: str, messages: List[Dict[str, Any]], **kwargs) -> Iterator[str]:
+        content = self.chat(model, messages, **kwargs).choices[0].message.content or ""
+        yield content
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    OpenAI, or any OpenAI-compatible endpoint (vLLM, Ollama, LM Studio...) via `base_url`.
+    """
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 timeout: Optional[float] = None, client=None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url
+        self.timeout = timeout
+        self._client = client
+        self._async_client = None
+
+    def _kwargs(self) -> Dict[str, Any]:
+        kwargs = {"api_key": self.api_key}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        return kwargs
+
+    @property
+    def client(self):
+        if self._client is None:
             from openai import OpenAI
-            client = OpenAI(api_key=self.api_key)
-            
-            response = client.chat.completions.create(
-                model="gpt-4o-mini", # Fast and cost-effective
-                messages=[
-                    {"role": "system", "content": system_prompt or "You are a supply chain expert agent."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"LLM Error: {e}. Falling back to simulation.")
-            return self._simulate_response(prompt)
+            self._client = OpenAI(**self._kwargs())
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(**self._kwargs())
+        return self._async_client
+
+    @staticmethod
+    def _request(model, messages, tools, kwargs) -> Dict[str, Any]:
+        request = {"model": model, "messages": messages, **kwargs}
+        if tools:
+            request["tools"] = tools
+        return request
+
+    def chat(self, model, messages, tools=None, **kwargs):
+        return self.client.chat.completions.create(**self._request(model, messages, tools, kwargs))
+
+    async def achat(self, model, messages, tools=None, **kwargs):
+        return await self.async_client.chat.completions.create(**self._request(model, messages, tools, kwargs))
+
+    def stream(self, model, messages, **kwargs) -> Iterator[str]:
+        for chunk in self.client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class SimulatedBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for the agents' LLM.
+
+    Reads the SKU figures from the conversation and answers the way the
+    agent prompts ask: monitoring verdicts from the coverage rule, and tool
+    calls for `update_forecast`, `transfer_inventory`, `create_po` and
+    `send_email` when the numbers call for them. Root-cause research uses
+    `get_market_news` (offline) rather than live web search unless
+    `web_search=True`. The same conversation always gives the same answer.
+    """
+    name = "simulated"
+
+    _PATTERNS = {
+        "sku_id": r"SKU(?:_ID)?[:=]?\s+([A-Z][\w]*-[\w-]+)",
+        "product": r"Product:\s*([^\n(]+?)\s*(?:\(|\n)",
+        "stock": r"(?:Stock=|Current Stock:\s*)(-?\d+)",
+        "forecast": r"Forecast[=:]\s*(-?\d+)",
+        "on_order": r"On Order[=:]\s*(-?\d+)",
+        "trend": r"(?:Sales Trend|Sales_Trend_Last_30_Days)[=:]\s*(-?\d+)",
+        "location": r"Location[=:]\s*([A-Z]{2})",
+        "recipient": r"(?:send the report to:|Recipient:)\s*(\S+?)\.?\s*$",
+        "p_stockout": r"Stock-out Probability:\s*([\d.]+)",
+        "lead_time": r"Lead Time[=:]\s*(\d+)",
+        "reorder_point": r"Reorder Point:\s*(\d+)",
+        "order_up_to": r"Order-Up-To Level:\s*(\d+)",
+    }
+    _LOCATIONS = ["NJ", "CA", "TX", "NY", "FL"]
+
+    def __init__(self, latency: float = 0.0, web_search: bool = False):
+        self.latency = latency
+        self.web_search = web_search
+
+    # -- conversation parsing --
 
-    def _simulate_response(self, prompt: str) -> str:
+    def _facts(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        facts: Dict[str, Any] = {}
+        text = "\n".join(str(m.get("content") or "") for m in messages)
+        for key, pattern in self._PATTERNS.items():
+            match = re.search(pattern, text, re.MULTILINE)
+            if match:
+                value = match.group(1).strip()
+                facts[key] = int(value) if value.lstrip("-").isdigit() else value
+        # Actions already taken earlier in the chain (tool results only, not narration)
+        tool_text = "\n".join(str(m.get("content") or "") for m in messages if m.get("role") == "tool")
+        facts["transferred"] = sum(int(m) for m in re.findall(r"Transfer of (\d+) units", tool_text))
+        facts["ordered"] = sum(int(m) for m in re.findall(r"quantity (\d+)", tool_text))
+        facts["forecast_update"] = re.findall(r"updated to (\d+)", tool_text)
+        facts["research"] = [str(m.get("content")) for m in messages if m.get("role") == "tool"]
+        # ...and proposals from earlier agents' structured decisions
+        for decision in self._decisions(messages):
+            if decision.get("new_forecast") is not None:
+                facts["forecast_update"].append(str(decision["new_forecast"]))
+            facts["transferred"] += decision.get("transfer_qty") or 0
+            facts["ordered"] += decision.get("po_qty") or 0
+        # Best transfer source from an "Other Locations" table (largest surplus first)
+        source = re.search(r"^[A-Z][\w]*-[\w-]+\|([A-Z]{2})\|(?:[^|\n]*\|){3}(-?\d+)$", text, re.MULTILINE)
+        if source and int(source.group(2)) > 0:
+            facts["best_source"] = source.group(1)
+            facts["best_surplus"] = int(source.group(2))
+        return facts
+
+    @staticmethod
+    def _decisions(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        decisions = []
+        for m in messages:
+            content = str(m.get("content") or "")
+            if m.get("role") == "assistant" and content.startswith("{"):
+                try:
+                    decisions.append(json.loads(content))
+                except ValueError:
+                    pass
+        return decisions
+
+    @staticmethod
+    def _agent(messages: List[Dict[str, Any]]) -> str:
+        system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+        match = re.search(r"You are an? ([\w\s]+?Agent)", system)
+        return match.group(1) if match else "Agent"
+
+    def _rng(self, facts: Dict[str, Any]) -> random.Random:
+        seed = hashlib.sha1(str(facts.get("sku_id", "")).encode()).hexdigest()
+        return random.Random(int(seed[:8], 16))
+
+    @staticmethod
+    def _tool_call(name: str, args: Dict[str, Any]) -> ToolCall:
+        arguments = json.dumps(args, sort_keys=True)
+        call_id = "call_sim_" + hashlib.sha1(f"{name}:{arguments}".encode()).hexdigest()[:12]
+        return ToolCall(id=call_id, function=FunctionCall(name=name, arguments=arguments))
+
+    # -- decisions --
+
+    def _decide(self, messages, tools, response_format=None) -> ChatMessage:
+        facts = self._facts(messages)
+        agent = self._agent(messages)
+        tool_names = {t["function"]["name"] for t in tools or []}
+        after_tools = bool(messages) and messages[-1].get("role") == "tool"
+        fields = set()
+        if response_format and response_format.get("type") == "json_schema":
+            fields = set(response_format["json_schema"]["schema"]["properties"])
+        if fields == {"results"}:
+            items = response_format["json_schema"]["schema"]["properties"]["results"]["items"]["properties"]
+            return ChatMessage(content=json.dumps({"results": self._batch(messages, set(items) - {"sku_id"})}))
+
+        sku = facts.get("sku_id", "UNKNOWN")
+        stock = facts.get("stock", 0)
+        forecast = facts.get("forecast", 0)
+        on_order = facts.get("on_order", 0)
+        trend = facts.get("trend", forecast)
+        cov = stock / forecast if forecast else 0.0
+        status = self._status(cov, facts.get("p_stockout"))
+
+        if after_tools and not fields:
+            results = [m.get("content") for m in messages if m.get("role") == "tool"]
+            return ChatMessage(content=f"{agent}: action complete. {results[-1]}")
+
+        if "update_forecast" in tool_names and forecast and abs(trend - forecast) > 0.1 * forecast:
+            return ChatMessage(tool_calls=[self._tool_call("update_forecast", {"sku_id": sku, "new_forecast": int(trend)})])
+
+        if "transfer_inventory" in tool_names and cov < 0.5:
+            rng = self._rng(facts)
+            sources = [loc for loc in self._LOCATIONS if loc != facts.get("location")]
+            qty = max(1, int((forecast - stock) * 0.5))
+            return ChatMessage(tool_calls=[self._tool_call("transfer_inventory", {"sku_id": sku, "source_location": rng.choice(sources), "quantity": qty})])
+
+        if "create_po" in tool_names:
+            qty = self._po_qty(facts)
+            if qty:
+                return ChatMessage(tool_calls=[self._tool_call("create_po", {"sku_id": sku, "quantity": qty})])
+
+        if status != "Healthy" and {"search_web", "get_market_news"} & tool_names and not after_tools:
+            if self.web_search and "search_web" in tool_names:
+                return ChatMessage(tool_calls=[self._tool_call("search_web", {"query": f"{facts.get('product', sku)} supply chain news"})])
+            if "get_market_news" in tool_names:
+                return ChatMessage(tool_calls=[self._tool_call("get_market_news", {"product_name": facts.get("product", sku)})])
+
+        if fields:
+            decision = self._decision(fields, facts, status, cov)
+            return ChatMessage(content=json.dumps(decision))
+
+        if "send_email" in tool_names and facts.get("recipient"):
+            subject = f"Supply Chain Alert: {facts.get('product', sku)} - {status}"
+            return ChatMessage(tool_calls=[self._tool_call("send_email", {"to_email": facts["recipient"], "subject": subject, "body": f"Status: {status}. Coverage {cov:.2f}."})])
+
+        if agent == "Agent" and "stock" not in facts:
+            return ChatMessage(content=self._freeform(str(messages[-1].get("content") or "")))
+        if agent == "Monitoring Agent":
+            return ChatMessage(content=f"Coverage = {stock}/{forecast} = {cov:.2f}. Status: {status}.")
+        if agent == "Communication Agent":
+            return ChatMessage(content=self._summary(facts, status, cov))
+        return ChatMessage(content=f"{agent}: no action needed (coverage {cov:.2f}, status {status}).")
+
+    @staticmethod
+    def _po_qty(facts) -> Optional[int]:
+        # Reorder point / order-up-to policy from the prompt (core.policy), scaled to any new forecast
+        forecast = facts.get("forecast", 0)
+        if not forecast:
+            return None
+        if "reorder_point" not in facts:
+            from core.policy import policy_row
+            policy = policy_row({"Forecast": forecast, "Supplier_Lead_Time": facts.get("lead_time")})
+            facts = {**facts, "reorder_point": policy["Reorder_Point"], "order_up_to": policy["Order_Up_To"]}
+        scale = (int(facts["forecast_update"][-1]) if facts["forecast_update"] else forecast) / forecast
+        position = facts.get("stock", 0) + facts.get("on_order", 0) + facts["transferred"]
+        if position > facts["reorder_point"] * scale:
+            return None
+        return max(0, math.ceil(facts["order_up_to"] * scale - position)) or None
+
+    @staticmethod
+    def _status(cov, p_stockout=None) -> str:
+        from core.risk import classify_risk
+        return classify_risk(cov, float(p_stockout) if p_stockout not in (None, "") else None)
+
+    @staticmethod
+    def _summary(facts, status, cov) -> str:
+        actions = []
+        if facts["forecast_update"]:
+            actions.append(f"forecast updated to {facts['forecast_update'][-1]}")
+        if facts["transferred"]:
+            actions.append(f"transfer of {facts['transferred']} units initiated")
+        if facts["ordered"]:
+            actions.append(f"PO for {facts['ordered']} units created")
+        done = "; ".join(actions) or "no action required"
+        return f"Final Summary: SKU {facts.get('sku_id', 'UNKNOWN')} status is {status} (coverage {cov:.2f}). Actions: {done}."
+
+    def _batch(self, messages, fields) -> List[Dict[str, Any]]:
+        # Multi-SKU request: one item per row of the "SKUs:" table in the user message
+        table = next((str(m.get("content")) for m in reversed(messages)
+                      if m.get("role") == "user" and str(m.get("content")).startswith("SKUs:")), "SKUs:\n")
+        lines = table.split("\n")[1:]
+        if not lines:
+            return []
+        header = lines[0].split("|")
+
+        def num(value):
+            return int(float(value)) if value not in ("", None) else 0
+
+        results = []
+        for line in lines[1:]:
+            row = dict(zip(header, line.split("|")))
+            facts = {
+                "sku_id": row.get("SKU_ID"),
+                "product": row.get("Product_Name"),
+                "location": row.get("Location"),
+                "stock": num(row.get("Current_Stock")),
+                "forecast": num(row.get("Forecast")),
+                "on_order": num(row.get("On_Order")),
+                "forecast_update": [row["new_forecast"]] if row.get("new_forecast") else [],
+                "transferred": num(row.get("transfer_qty")),
+                "ordered": num(row.get("po_qty")),
+                "research": [],
+            }
+            facts["trend"] = num(row["Sales_Trend_Last_30_Days"]) if row.get("Sales_Trend_Last_30_Days") else facts["forecast"]
+            cov = facts["stock"] / facts["forecast"] if facts["forecast"] else 0.0
+            status = self._status(cov, row.get("p_stockout"))
+            if "summary" in fields:
+                item = {"summary": self._summary(facts, status, cov)}
+            else:
+                item = self._decision(fields, facts, status, cov)
+            results.append({"sku_id": facts["sku_id"], **item})
+        return results
+
+    def _decision(self, fields, facts, status, cov) -> Dict[str, Any]:
+        # Same rules as the tool-calling path, returned as a structured decision
+        stock = facts.get("stock", 0)
+        forecast = facts.get("forecast", 0)
+        trend = facts.get("trend", forecast)
+        decision: Dict[str, Any] = {}
+        if "status" in fields:
+            decision["status"] = "Healthy" if status == "Healthy" else "Risk"
+            decision["risk_type"] = None if status == "Healthy" else status
+        if "new_forecast" in fields:
+            decision["new_forecast"] = int(trend) if forecast and abs(trend - forecast) > 0.1 * forecast else None
+        if "root_cause" in fields:
+            decision["root_cause"] = None if status == "Healthy" else (facts["research"][-1] if facts["research"] else f"Demand/supply imbalance (coverage {cov:.2f}).")
+        if "transfer_qty" in fields:
+            qty, source = None, None
+            if cov < 0.5:
+                qty = max(1, int((forecast - stock) * 0.5))
+                if facts.get("best_source"):
+                    source = facts["best_source"]
+                    qty = min(qty, facts["best_surplus"])
+                else:
+                    sources = [loc for loc in self._LOCATIONS if loc != facts.get("location")]
+                    source = self._rng(facts).choice(sources)
+            decision["transfer_qty"], decision["transfer_source"] = qty, source
+        if "po_qty" in fields:
+            decision["po_qty"] = self._po_qty(facts)
+        decision["rationale"] = f"Coverage {cov:.2f} ({stock} on hand vs {forecast} forecast)."
+        return decision
+
+    @staticmethod
+    def _freeform(prompt: str) -> str:
+        # Keyword replies for ad-hoc prompts that aren't part of the agent chain
         prompt_lower = prompt.lower()
         if "root cause" in prompt_lower:
             reasons = [
@@ -43,7 +441,10 @@ class LLMService:
                 "Seasonal spike due to early holiday shopping.",
                 "Supplier delay caused by raw material shortage."
             ]
-            return random.choice(reasons)
+            return reasons[int(hashlib.sha1(prompt.encode()).hexdigest()[:8], 16) % len(reasons)]
+        elif "executive summary" in prompt_lower:
+            facts = prompt.split(". ", 1)[-1]
+            return f"Executive summary: {facts}"
         elif "recommendation" in prompt_lower or "inventory" in prompt_lower:
             return "Transfer 20 units from NJ warehouse to meet immediate demand. Increase safety stock by 10%."
         elif "procurement" in prompt_lower:
@@ -52,3 +453,92 @@ class LLMService:
             return "Alert: Stock-out risk detected for this SKU. Root cause identified as viral demand. Action taken: Transfer initiated and PO generated."
         
         return "Analysis complete. Proceeding to next step."
+
+    def chat(self, model, messages, tools=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(model, messages, tools, kwargs.get("response_format"))
+
+    def _respond(self, model, messages, tools, response_format=None) -> ChatResponse:
+        message = self._decide(messages, tools, response_format)
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+        prompt_tokens += estimate_tokens(json.dumps(tools)) if tools else 0
+        completion_text = message.content or json.dumps(message.model_dump()["tool_calls"])
+        return ChatResponse(
+            choices=[Choice(message=message, finish_reason="tool_calls" if message.tool_calls else "stop")],
+            model=model,
+            usage=Usage(prompt_tokens=prompt_tokens, completion_tokens=estimate_tokens(completion_text)),
+        )
+
+    async def achat(self, model, messages, tools=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(model, messages, tools, kwargs.get("response_format"))
+
+    def stream(self, model, messages, **kwargs) -> Iterator[str]:
+        content = self.chat(model, messages, **kwargs).choices[0].message.content or ""
+        for word in content.split(" "):
+            yield word + " "
+
+
+BACKENDS = {
+    "openai": lambda: OpenAIBackend(),
+    # Any OpenAI-compatible server, e.g. LLM_BASE_URL=http://localhost:11434/v1
+    "local": lambda: OpenAIBackend(api_key=os.getenv("LLM_API_KEY", "local"),
+                                   base_url=os.getenv("LLM_BASE_URL", "http://localhost:8000/v1")),
+    "simulated": lambda: SimulatedBackend(latency=float(os.getenv("LLM_SIM_LATENCY", 0))),
+}
+
+
+class BackendNotConfigured(RuntimeError):
+    """Neither LLM_BACKEND nor OPENAI_API_KEY is set."""
+
+
+def configured_backend() -> Optional[str]:
+    """
+    Backend name from LLM_BACKEND, else "openai" when an API key is set, else
+    None. The simulator is never picked implicitly: its decisions are made up.
+    """
+    return os.getenv("LLM_BACKEND") or ("openai" if os.getenv("OPENAI_API_KEY") else None)
+
+
+def get_backend(name: Optional[str] = None) -> LLMBackend:
+    """
+    Backend by name, or from LLM_BACKEND / OPENAI_API_KEY. Raises
+    BackendNotConfigured when neither is set; the offline simulator is only
+    used when asked for (LLM_BACKEND=simulated).
+    """
+    name = name or configured_backend()
+    if name is None:
+        raise BackendNotConfigured("No LLM backend configured: set OPENAI_API_KEY, or LLM_BACKEND "
+                                   f"({' | '.join(BACKENDS)}; 'simulated' for offline demo answers)")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}'. Available: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+class LLMService:
+    def __init__(self, provider: Optional[str] = None, backend: Optional[LLMBackend] = None):
+        from dotenv import load_dotenv
+        load_dotenv()
+        self.backend = backend or get_backend(provider)
+        self.provider = self.backend.name
+
+    def generate_response(self, prompt: str, system_prompt: str = "") -> str:
+        """
+        Generates a response from the configured LLM backend.
+        Backend errors are raised, except with LLM_BACKEND=simulated (offline
+        demo mode), where the simulator answers instead.
+        """
+        messages = [
+            {"role": "system", "content": system_prompt or "You are a supply chain expert agent."},
+            {"role": "user", "content": prompt}
+        ]
+        try:
+            response = self.backend.chat("gpt-4o-mini", messages, temperature=0.7)  # Fast and cost-effective
+            return (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            if configured_backend() != "simulated":
+                raise
+            print(f"LLM Error: {e}. Falling back to simulation.")
+            return (SimulatedBackend().chat("gpt-4o-mini", messages).choices[0].message.content or "").strip()
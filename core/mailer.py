@@ -0,0 +1,283 @@
+import dataclasses
+import itertools
+from collections import deque
+import os
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Deque, Dict, Iterator, List, Optional
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# Reported by Mailer.wait() only: still queued/sending at the timeout, or an ID the mailer doesn't know (any more)
+PENDING = "pending"
+UNKNOWN = "unknown"
+
+
+@dataclass
+class SMTPConfig:
+    server: str = "smtp.gmail.com"
+    port: int = 587
+    sender: Optional[str] = None
+    password: Optional[str] = None
+    starttls: bool = True
+    timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "SMTPConfig":
+        return cls(
+            server=os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+            port=int(os.getenv("SMTP_PORT", 587)),
+            sender=os.getenv("SMTP_EMAIL"),
+            password=os.getenv("SMTP_PASSWORD"),
+            starttls=os.getenv("SMTP_STARTTLS", "1") != "0",
+        )
+
+
+class SMTPConnectionPool:
+    """
+    Reusable authenticated SMTP connections.
+
+    Idle connections are health-checked with NOOP on checkout; broken ones are
+    dropped and replaced, so a burst of emails pays for one handshake per
+    pooled connection rather than one per message.
+    """
+    def __init__(self, config: SMTPConfig, max_size: int = 4):
+        self.config = config
+        self.max_size = max_size
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self.connections_opened = 0
+
+    def _open(self) -> smtplib.SMTP:
+        cfg = self.config
+        conn = smtplib.SMTP(cfg.server, cfg.port, timeout=cfg.timeout)
+        if cfg.starttls:
+            conn.starttls()
+        if cfg.sender and cfg.password:
+            conn.login(cfg.sender, cfg.password)
+        self.connections_opened += 1
+        return conn
+
+    @staticmethod
+    def _healthy(conn: smtplib.SMTP) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @staticmethod
+    def _discard(conn: smtplib.SMTP):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        self._slots.acquire()
+        conn = None
+        try:
+            while conn is None:
+                try:
+                    candidate = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._open()
+                    break
+                if self._healthy(candidate):
+                    conn = candidate
+                else:
+                    self._discard(candidate)
+            yield conn
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+@dataclass
+class Delivery:
+    message_id: str
+    to_email: str
+    subject: str
+    body: str
+    status: str = QUEUED
+    attempts: int = 0
+    error: Optional[str] = None
+    queued_at: float = field(default_factory=time.time)
+    sent_at: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "message_id": self.message_id,
+            "to_email": self.to_email,
+            "subject": self.subject,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "queued_at": self.queued_at,
+            "sent_at": self.sent_at,
+        }
+
+
+# Permanent failures (bad recipient, auth rejected) are not worth retrying
+_PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPAuthenticationError)
+
+
+class Mailer:
+    """
+    Asynchronous outbound mail queue on top of an SMTPConnectionPool.
+
+    `send()` returns a message ID immediately; background workers deliver with
+    exponential-backoff retries. Use `wait()` / `status()` / `deliveries()` for
+    delivery reporting. Only the last `history` finished deliveries are kept;
+    older ones are forgotten (`status()` returns None for them, `wait()` a
+    delivery with status UNKNOWN).
+    """
+    def __init__(self, config: SMTPConfig, workers: int = 2, pool_size: Optional[int] = None,
+                 max_attempts: int = 3, backoff: float = 1.0, history: int = 1000):
+        self.config = config
+        self.pool = SMTPConnectionPool(config, max_size=pool_size or workers)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._queue: "queue.Queue[Optional[Delivery]]" = queue.Queue()
+        self._deliveries: Dict[str, Delivery] = {}
+        self.history = history
+        self._finished: Deque[str] = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, name=f"sc-mailer-{i}", daemon=True) for i in range(workers)]
+        for t in self._workers:
+            t.start()
+
+    def send(self, to_email: str, subject: str, body: str) -> str:
+        with self._lock:
+            message_id = f"msg-{next(self._ids)}"
+            delivery = Delivery(message_id, to_email, subject, body)
+            self._deliveries[message_id] = delivery
+        self._queue.put(delivery)
+        return message_id
+
+    def wait(self, message_id: str, timeout: Optional[float] = None) -> Delivery:
+        """
+        The finished delivery (SENT or FAILED). If it is still in flight after
+        `timeout`, a snapshot with status PENDING; for IDs that were never
+        issued or have been forgotten, a placeholder with status UNKNOWN.
+        """
+        delivery = self._deliveries.get(message_id)
+        if delivery is None:
+            return Delivery(message_id, "", "", "", status=UNKNOWN, error="unknown or expired message ID")
+        if not delivery.done.wait(timeout):
+            return dataclasses.replace(delivery, status=PENDING)
+        return delivery
+
+    def status(self, message_id: str) -> Optional[str]:
+        delivery = self._deliveries.get(message_id)
+        return delivery.status if delivery else None
+
+    def deliveries(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return [d.report() for d in self._deliveries.values()]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued message is sent or has failed."""
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._lock:
+            deliveries = list(self._deliveries.values())
+        for delivery in deliveries:
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            if not delivery.done.wait(remaining):
+                return False
+        return True
+
+    def close(self):
+        for _ in self._workers:
+            self._queue.put(None)
+        for t in self._workers:
+            t.join()
+        self.pool.close()
+
+    def _build(self, delivery: Delivery) -> str:
+        msg = MIMEMultipart()
+        msg['From'] = self.config.sender or ""
+        msg['To'] = delivery.to_email
+        msg['Subject'] = delivery.subject
+        msg.attach(MIMEText(delivery.body, 'plain'))
+        return msg.as_string()
+
+    def _work(self):
+        while True:
+            delivery = self._queue.get()
+            if delivery is None:
+                return
+            self._deliver(delivery)
+
+    def _deliver(self, delivery: Delivery):
+        text = None
+        while True:
+            delivery.status = SENDING
+            delivery.attempts += 1
+            try:
+                if text is None:
+                    text = self._build(delivery)
+                with self.pool.connection() as conn:
+                    conn.sendmail(self.config.sender, delivery.to_email, text)
+                delivery.status = SENT
+                delivery.sent_at = time.time()
+                delivery.error = None
+                print(f"  [Mailer] Email sent to {delivery.to_email}")
+                break
+            except Exception as e:
+                delivery.error = str(e)
+                # A message that can't be built won't build on a retry either
+                if text is None or isinstance(e, _PERMANENT_ERRORS) or delivery.attempts >= self.max_attempts:
+                    delivery.status = FAILED
+                    print(f"  [Mailer] Failed to send email to {delivery.to_email}: {e}")
+                    break
+                time.sleep(self.backoff * (2 ** (delivery.attempts - 1)))
+        delivery.done.set()
+        self._retire(delivery)
+
+    def _retire(self, delivery: Delivery):
+        # Bounded history: forget the oldest finished deliveries
+        with self._lock:
+            self._finished.append(delivery.message_id)
+            while len(self._finished) > self.history:
+                self._deliveries.pop(self._finished.popleft(), None)
+
+
+_mailer: Optional[Mailer] = None
+_mailer_lock = threading.Lock()
+
+
+def get_mailer() -> Mailer:
+    """
+    Process-wide mailer configured from the SMTP_* environment variables.
+    """
+    global _mailer
+    with _mailer_lock:
+        if _mailer is None:
+            _mailer = Mailer(SMTPConfig.from_env(), workers=int(os.getenv("SMTP_WORKERS", 2)))
+        return _mailer
@@ -0,0 +1,168 @@
+"""
+Multi-SKU prompting: one LLM request for many SKUs.
+
+For agents whose per-SKU input is only a handful of numbers (monitoring,
+forecast review, communication), the system prompt and per-request overhead
+dominate. Here the agent's static instructions are sent once, the SKUs go in
+a compact table, and the model returns {"results": [...]} with one
+schema-validated item per SKU. Batches are sized to a token budget, and any
+item that is missing or invalid is re-run on its own.
+
+    runner = MultiSkuRunner()
+    screened = runner.screen(rows)        # monitoring + forecast for every row
+    summaries = runner.summarize(rows, screened)
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from core.llm_service import estimate_tokens
+from core.prompts import format_value, render_table
+
+MULTI_SKU_AGENTS = ("Monitoring Agent", "Forecast Agent", "Communication Agent")
+
+SKU_COLUMNS = ["SKU_ID", "Product_Name", "Location", "Current_Stock", "Forecast", "On_Order",
+               "Sales_Trend_Last_30_Days", "Season", "p_stockout"]
+SUMMARY_COLUMNS = ["SKU_ID", "Product_Name", "Location", "Current_Stock", "Forecast",
+                   "status", "risk_type", "new_forecast", "root_cause", "transfer_qty", "po_qty"]
+
+# Rough size of one result item in the answer (sku_id, a few fields, one-line rationale)
+OUTPUT_TOKENS_PER_SKU = 60
+
+BATCH_NOTE = """
+You are reviewing several SKUs at once. The user message is a table with one SKU per row.
+Apply the rules above to each row independently and return exactly one entry per SKU in
+`results`, with its `sku_id` copied from the SKU_ID column.
+"""
+
+
+def plan_batches(rows: Sequence[Dict[str, Any]], columns: Sequence[str], base_tokens: int,
+                 budget: int, max_batch: int, output_tokens: int = OUTPUT_TOKENS_PER_SKU) -> List[List[Dict[str, Any]]]:
+    """
+    Greedy split of `rows` so each request's prompt plus expected answer stays
+    within `budget` tokens. A single row always gets a batch of its own.
+    """
+    batches: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    used = base_tokens
+    for row in rows:
+        cost = estimate_tokens("|".join(format_value(row.get(c)) for c in columns)) + 1 + output_tokens
+        if current and (used + cost > budget or len(current) >= max_batch):
+            batches.append(current)
+            current, used = [], base_tokens
+        current.append(row)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+class MultiSkuRunner:
+    def __init__(self, llm=None, agents=None, budget: int = 4000, max_batch: int = 50, simulation=None):
+        if llm is None:
+            from core.llm_service import get_backend
+            llm = get_backend()
+        if agents is None:
+            from core.orchestrator import load_agents
+            agents = load_agents()
+        self.llm = llm
+        self.agents = {a.name: a for a in agents}
+        self.budget = budget
+        self.max_batch = max_batch
+        self.simulation = simulation
+        self.stats = {"requests": 0, "batched_skus": 0, "reruns": 0, "failed": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _system_prompt(self, agent) -> str:
+        from core.prompts import as_prompt
+
+        # Only agents with static instructions are batched, so no per-SKU context is needed
+        instructions = agent.instructions({}) if callable(agent.instructions) else agent.instructions
+        return as_prompt(agent.name, instructions).text.rstrip() + "\n" + BATCH_NOTE
+
+    def _request(self, agent, system: str, rows: List[Dict[str, Any]], columns: Sequence[str]):
+        from core.schemas import batch_response_format, parse_batch
+
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": "SKUs:\n" + render_table(rows, columns)},
+        ]
+        sku_ids = [str(r["SKU_ID"]) for r in rows]
+        self.stats["requests"] += 1
+        try:
+            response = self.llm.chat(agent.model, messages, response_format=batch_response_format(agent.name))
+        except Exception as e:
+            return {}, {sku: f"{agent.name} request failed: {e}" for sku in sku_ids}
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.stats["prompt_tokens"] += usage.prompt_tokens or 0
+            self.stats["completion_tokens"] += usage.completion_tokens or 0
+        return parse_batch(agent.name, response.choices[0].message.content, sku_ids)
+
+    def run_stage(self, agent_name: str, rows: Sequence[Dict[str, Any]],
+                  columns: Sequence[str] = SKU_COLUMNS) -> Dict[str, Dict[str, Any]]:
+        """
+        One agent over `rows`. Returns an item per SKU ID; items that still
+        failed after a single-SKU re-run are {"error": ...}.
+        """
+        agent = self.agents[agent_name]
+        system = self._system_prompt(agent)
+        by_sku = {str(r["SKU_ID"]): r for r in rows}
+        results: Dict[str, Dict[str, Any]] = {}
+        failed: Dict[str, str] = {}
+
+        for batch in plan_batches(list(rows), columns, estimate_tokens(system), self.budget, self.max_batch):
+            items, errors = self._request(agent, system, batch, columns)
+            results.update(items)
+            failed.update(errors)
+            self.stats["batched_skus"] += len(batch)
+
+        for sku, error in failed.items():
+            # Re-run just this SKU; a bad item shouldn't cost the whole batch
+            self.stats["reruns"] += 1
+            items, errors = self._request(agent, system, [by_sku[sku]], columns)
+            if sku in items:
+                results[sku] = items[sku]
+            else:
+                self.stats["failed"] += 1
+                results[sku] = {"error": errors.get(sku, error)}
+        return results
+
+    def screen(self, rows: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Monitoring verdict and forecast review for every row, merged per SKU.
+        Rows are first given simulated stock-out probabilities (one vectorized
+        pass for the whole list) so the monitoring rule can use them.
+        """
+        rows = self._with_simulation(rows)
+        monitoring = self.run_stage("Monitoring Agent", rows)
+        forecast = self.run_stage("Forecast Agent", rows)
+        screened = {}
+        for row in rows:
+            sku = str(row["SKU_ID"])
+            verdict, review = monitoring[sku], forecast[sku]
+            result = {"status": verdict.get("status", "Unknown"), "risk_type": verdict.get("risk_type")}
+            if review.get("new_forecast") is not None and review["new_forecast"] != row.get("Forecast"):
+                result["new_forecast"] = review["new_forecast"]
+            errors = [item["error"] for item in (verdict, review) if "error" in item]
+            if errors:
+                result["error"] = "; ".join(errors)
+            result["rationale"] = verdict.get("rationale", "")
+            screened[sku] = result
+        return screened
+
+    def _with_simulation(self, rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        missing = [r for r in rows if r.get("p_stockout") is None]
+        if not missing:
+            return list(rows)
+        import pandas as pd
+        from core.simulation import simulate
+
+        sim = simulate(pd.DataFrame(missing), self.simulation)
+        p_stockout = {str(r["SKU_ID"]): round(float(p), 2) for r, p in zip(missing, sim["p_stockout"])}
+        return [r if r.get("p_stockout") is not None else {**r, "p_stockout": p_stockout[str(r["SKU_ID"])]} for r in rows]
+
+    def summarize(self, rows: Sequence[Dict[str, Any]], results: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+        """
+        Communication summaries for many SKUs, given each SKU's analysis fields.
+        """
+        merged = [{**row, **results.get(str(row["SKU_ID"]), {})} for row in rows]
+        summaries = self.run_stage("Communication Agent", merged, SUMMARY_COLUMNS)
+        return {sku: item.get("summary", "") for sku, item in summaries.items() if "error" not in item}
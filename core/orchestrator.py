@@ -1,194 +1,599 @@
-from typing import Dict, Any, List
-from openai import OpenAI
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
+import importlib
 import os
 import json
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-from agents.base_agent import Agent
-from agents.monitoring_agent import monitoring_agent
-from agents.forecast_agent import forecast_agent
-from agents.root_cause_agent import root_cause_agent
-from agents.inventory_agent import inventory_agent
-from agents.procurement_agent import procurement_agent
-from agents.communication_agent import communication_agent
+import threading
+import time
+
 from core.state import AgentState
+from core.events import EventLog, MESSAGE, TOOL, ERROR, CANCELLED, gc_spills
+
+if TYPE_CHECKING:
+    from agents.base_agent import Agent
+    from core.llm_service import LLMBackend
+    from core.prompts import Prompt
+    from core.simulation import SimulationConfig
+    from core.checkpoint import CheckpointStore
+    from core.deadlines import DeadlinePolicy, RunDeadlines
+    from core.profiling import Profiler, RunProfile
+    from core.similarity import RootCauseIndex
+
+# Pipeline order. Agent modules (and the tool dependencies behind them) are
+# imported on first use, so importing the orchestrator stays cheap for CLI
+# runs, workers and tests.
+AGENT_PIPELINE = [
+    ("agents.monitoring_agent", "monitoring_agent"),
+    ("agents.forecast_agent", "forecast_agent"),
+    ("agents.root_cause_agent", "root_cause_agent"),
+    ("agents.inventory_agent", "inventory_agent"),
+    ("agents.procurement_agent", "procurement_agent"),
+    ("agents.communication_agent", "communication_agent"),
+]
+
+_env_loaded = False
+
+_inventory_locks: Dict[str, threading.RLock] = {}
+_inventory_locks_guard = threading.Lock()
+
+
+def inventory_lock(data_file: str) -> threading.RLock:
+    """
+    Process-wide lock for one inventory file. Held for every read-modify-write
+    of the CSV (approved changes, streamed deltas in core.ingest) and while the
+    in-memory views built from it (rollups, policy engine, sales history) are
+    updated or read, so writers don't lose each other's updates.
+    """
+    key = os.path.abspath(data_file)
+    with _inventory_locks_guard:
+        return _inventory_locks.setdefault(key, threading.RLock())
+
+
+def load_env():
+    # Load environment variables (once, on first Orchestrator)
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+class UsageTotals:
+    """Token usage and call count accumulated over one run, in total and per agent."""
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.by_agent: Dict[str, Dict[str, int]] = {}
+
+    def _agent(self, agent: str) -> Dict[str, int]:
+        return self.by_agent.setdefault(agent, {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                                "instruction_tokens": 0, "budget": 0,
+                                                "history_tokens": 0, "history_tokens_full": 0})
+
+    def add(self, response, agent: Optional[str] = None):
+        self.llm_calls += 1
+        usage = getattr(response, "usage", None)
+        prompt_tokens = (usage.prompt_tokens or 0) if usage is not None else 0
+        completion_tokens = (usage.completion_tokens or 0) if usage is not None else 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if agent:
+            totals = self._agent(agent)
+            totals["llm_calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+
+    def add_prompt(self, prompt):
+        # System-prompt size as built by core.prompts, next to the agent's budget
+        totals = self._agent(prompt.agent)
+        totals["instruction_tokens"] = prompt.tokens
+        totals["budget"] = prompt.budget
+
+    def add_history(self, agent: str, sent: int, full: int):
+        # Conversation tokens sent with a request, next to what the full transcript would have been (core.handoff)
+        totals = self._agent(agent)
+        totals["history_tokens"] = totals.get("history_tokens", 0) + sent
+        totals["history_tokens_full"] = totals.get("history_tokens_full", 0) + full
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"llm_calls": self.llm_calls, "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+                "by_agent": {name: dict(totals) for name, totals in self.by_agent.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "UsageTotals":
+        usage = cls()
+        usage.llm_calls = data.get("llm_calls", 0)
+        usage.prompt_tokens = data.get("prompt_tokens", 0)
+        usage.completion_tokens = data.get("completion_tokens", 0)
+        usage.by_agent = {name: dict(totals) for name, totals in data.get("by_agent", {}).items()}
+        return usage
+
+def function_to_schema(func) -> Dict[str, Any]:
+    # Simplified schema generator for demo
+    # in a real app, use pydantic or similar introspection
+    return {
+        "type": "function",
+        "function": {
+            "name": func.__name__,
+            "description": func.__doc__ or "",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    # Hardcoding props for known tools to save complex introspection code in this demo
+                    "query": {"type": "string"},
+                    "sku_id": {"type": "string"},
+                    "new_forecast": {"type": "integer"},
+                    "quantity": {"type": "integer"},
+                    "source_location": {"type": "string"},
+                    "product_name": {"type": "string"}
+                },
+                "required": ["query"] if func.__name__ == "search_web" else []
+            }
+        }
+    }
+
+# A tool-using agent gets one turn to call tools and one to decide
+MAX_TURNS = 2
+
+# Agent whose conclusions are reused across similar SKUs (core.similarity)
+ROOT_CAUSE_AGENT = "Root Cause Agent"
+
+def load_agents() -> List["Agent"]:
+    return [getattr(importlib.import_module(module), name) for module, name in AGENT_PIPELINE]
 
 class Orchestrator:
-    def __init__(self, data_file="data/inventory_data_real.csv"):
+    def __init__(self, data_file="data/inventory_data_real.csv", llm: Optional["LLMBackend"] = None,
+                 simulation: Optional["SimulationConfig"] = None, checkpoints: Optional["CheckpointStore"] = None,
+                 deadlines: Optional["DeadlinePolicy"] = None, profiler: Optional["Profiler"] = None,
+                 compact_handoffs: bool = True, similarity: Optional["RootCauseIndex"] = None):
+        load_env()
+        # Spilled event payloads of old runs (core.events)
+        gc_spills()
         self.data_file = data_file
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.agents = [
-            monitoring_agent,
-            forecast_agent,
-            root_cause_agent,
-            inventory_agent,
-            procurement_agent,
-            communication_agent
-        ]
-
-    def run(self, sku_data: Dict[str, Any]) -> Dict[str, Any]:
-        # Initialize Context/State
-        state = AgentState.from_dict(sku_data)
+        # Send each agent a compact handoff state instead of the whole transcript (core.handoff)
+        self.compact_handoffs = compact_handoffs
+        self.simulation = simulation
+        self.checkpoints = checkpoints
+        if deadlines is None:
+            from core.deadlines import DeadlinePolicy
+            deadlines = DeadlinePolicy()
+        self.deadlines = deadlines
+        if profiler is None:
+            # Off unless SC_PROFILE is set (see core.profiling)
+            from core.profiling import default_profiler
+            profiler = default_profiler()
+        self.profiler = profiler
+        if similarity is None:
+            # Off unless SC_SIMILARITY is set (see core.similarity)
+            from core.similarity import default_index
+            similarity = default_index()
+        self.similarity = similarity
+        self.last_persisted_row = None
+        self._llm = llm
+        self._agents = None
+
+    @property
+    def llm(self) -> "LLMBackend":
+        # Chosen from LLM_BACKEND / OPENAI_API_KEY on first use; raises when neither is set (see core.llm_service.get_backend)
+        if self._llm is None:
+            from core.llm_service import get_backend
+            self._llm = get_backend()
+        return self._llm
+
+    @llm.setter
+    def llm(self, value: "LLMBackend"):
+        self._llm = value
+
+    @property
+    def agents(self) -> List["Agent"]:
+        if self._agents is None:
+            self._agents = load_agents()
+        return self._agents
+
+    @agents.setter
+    def agents(self, value):
+        self._agents = value
+
+    def load_inventory(self) -> List[Dict[str, Any]]:
+        # Full inventory for cross-location context
+        import pandas as pd
+        try:
+            return pd.read_csv(self.data_file).to_dict(orient="records")
+        except:
+            return []
+
+    def build_context(self, sku_data: Dict[str, Any],
+                      full_inventory: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         context_variables = sku_data.copy()
         
         # Add broader context
         context_variables["current_date"] = "2024-12-01"
         context_variables["current_season"] = "Winter"
+        context_variables["full_inventory"] = self.load_inventory() if full_inventory is None else full_inventory
+
+        # Monte Carlo stock-out metrics over the supplier lead time, unless the row already has them
+        if context_variables.get("p_stockout") is None and sku_data.get("Forecast") is not None:
+            from core.simulation import simulate_row
+            context_variables.update(simulate_row(sku_data, self.simulation))
+        # Safety stock / reorder point / order-up-to for this SKU (core.policy)
+        if context_variables.get("Reorder_Point") is None and sku_data.get("Forecast") is not None:
+            from core.policy import policy_row
+            context_variables.update(policy_row(sku_data))
+        return context_variables
+
+    @staticmethod
+    def kickoff_messages(sku_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        system_context = f"""
+        Analyze the supply chain status for:
+        Product: {sku_data['Product_Name']} (SKU: {sku_data['SKU_ID']})
+        Stats: Stock={sku_data['Current_Stock']}, Forecast={sku_data['Forecast']}, On Order={sku_data.get('On_Order', 0)}
+        Demand: Sales Trend={sku_data.get('Sales_Trend_Last_30_Days')}, Lead Time={sku_data.get('Supplier_Lead_Time')} days, Location={sku_data.get('Location')}
+        """
+        return [{"role": "user", "content": system_context}]
+
+    @staticmethod
+    def instructions_for(agent: "Agent", context_variables: Dict[str, Any]) -> "Prompt":
+        from core.prompts import as_prompt
+
+        if callable(agent.instructions):
+            instructions = agent.instructions(context_variables)
+        else:
+            instructions = agent.instructions
+        prompt = as_prompt(agent.name, instructions)
+        if prompt.over_budget:
+            print(f"  [Prompt] {agent.name} system prompt is {prompt.tokens} tokens (budget {prompt.budget})")
+        return prompt
+
+    def stage_request(self, agent: "Agent", context_variables: Dict[str, Any], messages: List[Dict[str, Any]],
+                      with_tools: bool = True, prompt: Optional["Prompt"] = None) -> Dict[str, Any]:
+        """
+        Chat-completions request body for one agent turn: model, system prompt
+        plus the shared history, tool schemas and the agent's decision schema.
+        """
+        from core.schemas import response_format
+
+        prompt = prompt or self.instructions_for(agent, context_variables)
+        body = {"model": agent.model, "messages": [{"role": "system", "content": prompt.text}] + messages}
+        if with_tools and agent.tools:
+            body["tools"] = [function_to_schema(t) for t in agent.tools]
+        decision_format = response_format(agent.name)
+        if decision_format:
+            body["response_format"] = decision_format
+        return body
+
+    def chat(self, request: Dict[str, Any], deadlines: Optional["RunDeadlines"] = None, agent: Optional[str] = None):
+        extra = {k: v for k, v in request.items() if k not in ("model", "messages", "tools")}
+        if deadlines is None:
+            return self.llm.chat(request["model"], request["messages"], tools=request.get("tools"), **extra)
+
+        def call(remaining: Optional[float]):
+            # The client gives up at the same time we do, so a timed-out request isn't left open
+            timeout = {"timeout": max(remaining, 0.1)} if remaining is not None else {}
+            return self.llm.chat(request["model"], request["messages"], tools=request.get("tools"), **extra, **timeout)
+        return deadlines.call_llm(agent or request["model"], call)
+
+    @staticmethod
+    def execute_tool_calls(agent: "Agent", msg_dict: Dict[str, Any], messages: List[Dict[str, Any]],
+                           events: EventLog, deadlines: Optional["RunDeadlines"] = None):
+        """
+        Run the tool calls of an assistant message locally and append the tool
+        results to `messages`. With `deadlines`, each call is bounded by its
+        tool deadline; if the agent or run deadline passes instead, the
+        remaining calls are skipped and the DeadlineExceeded is re-raised.
+        """
+        from core.deadlines import DeadlineExceeded, TOOL as TOOL_SCOPE
+
+        expired = None
+        for tc in msg_dict.get("tool_calls") or []:
+            func_name = tc["function"]["name"]
+            args = json.loads(tc["function"]["arguments"])
+            
+            # Find the tool function
+            tool_func = next((t for t in agent.tools if t.__name__ == func_name), None)
+            if expired is not None:
+                result, tool_seconds = f"Skipped: {expired}", 0.0
+            elif tool_func:
+                started = time.perf_counter()
+                try:
+                    if deadlines is None:
+                        result = tool_func(**args)
+                    else:
+                        result = deadlines.call_tool(agent.name, func_name, lambda: tool_func(**args))
+                except DeadlineExceeded as e:
+                    print(f"  [Deadline] {e}")
+                    result = f"Timed out: {e}"
+                    if e.scope == TOOL_SCOPE:
+                        deadlines.note(agent.name, e)
+                    else:
+                        expired = e
+                except Exception as e:
+                    result = str(e)
+                tool_seconds = time.perf_counter() - started
+            else:
+                result, tool_seconds = f"Unknown tool: {func_name}", 0.0
+            
+            # Every tool call needs a tool message, or the next request is rejected
+            messages.append({
+                "role": "tool",
+                "tool_call_id": tc["id"],
+                "content": str(result)
+            })
+            events.record(agent.name, TOOL, result, tool=func_name, duration=tool_seconds)
+        if expired is not None:
+            raise expired
+
+    @staticmethod
+    def run_action(agent: "Agent", name: str, events: EventLog, **kwargs) -> Optional[str]:
+        action = next((a for a in agent.actions if a.__name__ == name), None)
+        if action is None:
+            return None
+        started = time.perf_counter()
+        try:
+            result = str(action(**kwargs))
+        except Exception as e:
+            result = str(e)
+        events.record(agent.name, TOOL, result, tool=name, duration=time.perf_counter() - started)
+        return result
+
+    def apply_decision(self, agent: "Agent", decision: Dict[str, Any], state: AgentState, events: EventLog):
+        """
+        Copy a validated decision onto the run state and carry out the
+        proposals it contains (forecast update, transfer, PO) as actions.
+        """
+        if "status" in decision:
+            state.status = decision["status"]
+            state.risk_type = decision.get("risk_type") if decision["status"] != "Healthy" else None
+        if decision.get("root_cause"):
+            state.root_cause = decision["root_cause"]
+        new_forecast = decision.get("new_forecast")
+        if new_forecast is not None and new_forecast != state.forecast:
+            state.new_forecast = new_forecast
+            self.run_action(agent, "update_forecast", events, sku_id=state.sku_id, new_forecast=new_forecast)
+        if decision.get("transfer_qty"):
+            state.transfer_qty = decision["transfer_qty"]
+            source = decision.get("transfer_source") or "another location"
+            state.inventory_action = self.run_action(agent, "transfer_inventory", events, sku_id=state.sku_id,
+                                                     source_location=source, quantity=state.transfer_qty) \
+                or f"Transfer of {state.transfer_qty} units from {source} proposed."
+        if decision.get("po_qty"):
+            state.po_qty = decision["po_qty"]
+            state.procurement_action = self.run_action(agent, "create_po", events, sku_id=state.sku_id, quantity=state.po_qty) \
+                or f"PO for {state.po_qty} units proposed."
+
+    def recall_root_cause(self, agent: "Agent", sku_data: Dict[str, Any], state: AgentState,
+                          context_variables: Dict[str, Any], messages: List[Dict[str, Any]], events: EventLog) -> bool:
+        """
+        Look up conclusions for similar SKUs before the Root Cause Agent runs.
+        A close match is applied as the agent's decision (returns True: skip
+        the agent); a looser one is added to its context as a draft.
+        """
+        if self.similarity is None or agent.name != ROOT_CAUSE_AGENT or state.status == "Healthy":
+            return False
+        mode, match = self.similarity.lookup(sku_data, state.risk_type)
+        if mode is None:
+            return False
+        context_variables["root_cause_reuse"] = {"mode": mode, "sku_id": match.sku_id, "score": match.score}
+        if mode == "draft":
+            context_variables["similar_root_cause"] = f"{match.root_cause} (concluded for {match.sku_id}, similarity {match.score:.2f})"
+            return False
+        decision = {"root_cause": match.root_cause,
+                    "rationale": f"Reused the conclusion for {match.sku_id} ({match.product}), similarity {match.score:.2f}."}
+        messages.append({"role": "assistant", "content": json.dumps(decision)})
+        events.record(agent.name, MESSAGE, f"Reused root cause from {match.sku_id} (similarity {match.score:.2f}): {match.root_cause}")
+        self.apply_decision(agent, decision, state, events)
+        return True
+
+    def remember_root_cause(self, agent: "Agent", sku_data: Dict[str, Any], state: AgentState,
+                            context_variables: Dict[str, Any], run_id: Optional[str] = None):
+        # Only investigated conclusions go into the index, not reused ones
+        if (self.similarity is None or agent.name != ROOT_CAUSE_AGENT or not state.root_cause
+                or state.status == "Healthy" or context_variables.get("root_cause_reuse", {}).get("mode") == "skip"):
+            return
+        self.similarity.add(sku_data, state.root_cause, state.risk_type, run_id)
+
+    def apply_response(self, agent: "Agent", msg_dict: Dict[str, Any], messages: List[Dict[str, Any]],
+                       state: AgentState, events: EventLog, duration: Optional[float] = None,
+                       deadlines: Optional["RunDeadlines"] = None) -> bool:
+        """
+        Add an assistant reply to the history and act on it. Returns True when
+        it called tools, i.e. the agent needs another turn to decide.
+        Raises DecisionError if the decision doesn't match the agent's schema.
+        """
+        from core.schemas import decision_schema, parse_decision, summarize_decision
+
+        messages.append(msg_dict)
+        content = msg_dict.get("content") or ""
+        if msg_dict.get("tool_calls"):
+            if content:
+                events.record(agent.name, MESSAGE, content, duration=duration)
+            self.execute_tool_calls(agent, msg_dict, messages, events, deadlines)
+            return True
+
+        if decision_schema(agent.name) is None:
+            events.record(agent.name, MESSAGE, content, duration=duration)
+            return False
+        decision = parse_decision(agent.name, content)
+        events.record(agent.name, MESSAGE, summarize_decision(decision), duration=duration)
+        self.apply_decision(agent, decision, state, events)
+        return False
+
+    @staticmethod
+    def finalize(state: AgentState, context_variables: Dict[str, Any], messages: List[Dict[str, Any]],
+                 events: EventLog, usage: UsageTotals, cancelled: bool = False,
+                 deadlines: Optional["RunDeadlines"] = None) -> Dict[str, Any]:
+        final_context = context_variables.copy() # To return to UI
+        if cancelled:
+            final_context["cancelled"] = True
+        if deadlines is not None:
+            # Which deadlines/hedges fired during the run (empty when none did)
+            final_context["deadlines"] = deadlines.to_list()
+        # The full inventory is only needed for prompting; don't ship it to the UI/session state
+        final_context.pop("full_inventory", None)
+        final_context["run_id"] = events.run_id
+        final_context["events"] = events.records()
+        # Short one-line view of the same records, for scripts that print logs
+        final_context["logs"] = events.render()
+        final_context["usage"] = usage.to_dict()
         
-        # Load full inventory for cross-location context
-        import pandas as pd
+        state.final_summary = messages[-1].get("content", "") if messages else ""
+        # Analysis fields come from the run state; only set ones override the input row
+        final_context.update({k: v for k, v in state.analysis_dict().items() if v is not None})
+        
+        return final_context
+
+    def run(self, sku_data: Dict[str, Any], cancel_event: Optional[threading.Event] = None,
+            run_id: Optional[str] = None, full_inventory: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        # `full_inventory`: rows for cross-location context, when the caller already has them (default: read the CSV)
+        if self.profiler is None:
+            return self._run(sku_data, cancel_event, run_id, full_inventory=full_inventory)
+
+        profile = self.profiler.start(run_id or str(sku_data.get("SKU_ID", "run")))
         try:
-            full_df = pd.read_csv(self.data_file)
-            context_variables["full_inventory"] = full_df.to_dict(orient="records")
-        except:
-            context_variables["full_inventory"] = []
+            result = self._run(sku_data, cancel_event, run_id, profile, full_inventory)
+        finally:
+            summary = profile.finish()
+        result["profile"] = summary
+        print(f"Profile written to {summary['dir']}")
+        return result
+
+    def _run(self, sku_data: Dict[str, Any], cancel_event: Optional[threading.Event] = None,
+             run_id: Optional[str] = None, profile: Optional["RunProfile"] = None,
+             full_inventory: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        from core import profiling
+
+        # Initialize Context/State
+        state = AgentState.from_dict(sku_data)
+        with profiling.stage(profile, "Build Context"):
+            context_variables = self.build_context(sku_data, full_inventory)
 
         print(f"Starting analysis for SKU: {state.sku_id}")
-        
-        messages = []
-        logs = []
+
+        if run_id is None and self.checkpoints is not None:
+            # Same SKU figures -> same run ID, so a restarted run finds its checkpoint
+            from core.jobs import run_key
+            run_id = run_key(sku_data)
+        events = EventLog(run_id=run_id)
+        usage = UsageTotals()
+        state.events = events
         
         # Starting with a system prompt to set the stage or just the first agent?
         # In this Agents SDK style, we often iterate through agents. 
         # Since we don't have the official 'handoff' function in standard API yet, 
         # we will simulate the handoff by running agents sequentially using the chat history.
-        
-        # Kickoff Message
-        system_context = f"""
-        Analyze the supply chain status for:
-        Product: {sku_data['Product_Name']} (SKU: {sku_data['SKU_ID']})
-        Stats: Stock={sku_data['Current_Stock']}, Forecast={sku_data['Forecast']}, On Order={sku_data['On_Order']}
-        """
-        
-        messages.append({"role": "user", "content": system_context})
-        
-        final_context = context_variables.copy() # To return to UI
-        
-        
-        # Helper to generate tool schemas
-        def function_to_schema(func) -> Dict[str, Any]:
-            # Simplified schema generator for demo
-            # in a real app, use pydantic or similar introspection
-            return {
-                "type": "function",
-                "function": {
-                    "name": func.__name__,
-                    "description": func.__doc__ or "",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            # Hardcoding props for known tools to save complex introspection code in this demo
-                            "query": {"type": "string"},
-                            "sku_id": {"type": "string"},
-                            "new_forecast": {"type": "integer"},
-                            "quantity": {"type": "integer"},
-                            "source_location": {"type": "string"},
-                            "product_name": {"type": "string"}
-                        },
-                        "required": ["query"] if func.__name__ == "search_web" else []
-                    }
-                }
-            }
+        messages = self.kickoff_messages(sku_data)
+        cancelled = False
+        timed_out = False
+        from core.deadlines import DeadlineExceeded, RunCancelled, RunDeadlines, RUN
+        from core.handoff import Handoff, history_tokens
+        deadlines = RunDeadlines(self.deadlines, cancel_event)
+        handoff = Handoff(self.compact_handoffs)
+
+        start = 0
+        checkpoint = self.checkpoints.load(events.run_id) if self.checkpoints is not None else None
+        if checkpoint is not None:
+            start = checkpoint.next_stage
+            messages = checkpoint.messages
+            state.restore_analysis(checkpoint.analysis)
+            events.restore(checkpoint.events)
+            usage = UsageTotals.from_dict(checkpoint.usage)
+            handoff.notes.update(checkpoint.notes)
+            context_variables["resumed_after"] = checkpoint.last_agent
+            print(f"Resuming run {events.run_id} after {checkpoint.last_agent}")
+
+        for stage, agent in enumerate(self.agents):
+            if stage < start:
+                continue
+            # Cooperative cancellation from the job queue, checked at each handoff
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"Run cancelled before {agent.name}")
+                events.record(agent.name, CANCELLED, "Cancelled before start.")
+                cancelled = True
+                break
+            if deadlines.run.expired():
+                error = deadlines.run.exceeded()
+                print(f"Run deadline passed before {agent.name}")
+                deadlines.note(agent.name, error)
+                events.record(agent.name, ERROR, error)
+                timed_out = True
+                break
 
-        for agent in self.agents:
             print(f"--- Handoff to {agent.name} ---")
-            
-            # 1. Prepare Instructions
-            if callable(agent.instructions):
-                instructions = agent.instructions(context_variables)
-            else:
-                instructions = agent.instructions
-                
-            # 2. Run Agent (Responses API / Chat Completions)
-            current_messages = [{"role": "system", "content": instructions}] + messages
+            deadlines.start_agent(agent.name)
+            handoff.begin(messages)
             
             try:
-                # Generate schemas
-                tool_schemas = [function_to_schema(t) for t in agent.tools] if agent.tools else None
-                
-                response = self.client.chat.completions.create(
-                    model=agent.model,
-                    messages=current_messages,
-                    tools=tool_schemas,
-                )
-                
-                msg = response.choices[0].message
-                # Convert to dict for safety in message history if strictly using dicts, 
-                # but SDK objects work if consistently used. Let's cast to dict to be safe with our manual appends.
-                msg_dict = msg.model_dump() if hasattr(msg, "model_dump") else msg.dict()
-                messages.append(msg_dict)
-                
-                content = msg.content or ""
-                logs.append(f"[{agent.name}] {content[:100]}...")
-                
-                # Handle Tool Calls
-                if msg.tool_calls:
-                    for tc in msg.tool_calls:
-                        func_name = tc.function.name
-                        import json
-                        args = json.loads(tc.function.arguments)
-                        
-                        # Find the tool function
-                        tool_func = next((t for t in agent.tools if t.__name__ == func_name), None)
-                        if tool_func:
-                            try:
-                                result = tool_func(**args)
-                            except Exception as e:
-                                result = str(e)
-                            
-                            # Add tool output to messages
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": tc.id,
-                                "content": str(result)
-                            })
-                            logs.append(f"[{agent.name}] Tool {func_name}: {result}")
-                            
-                            # Update local context if needed
-                            if "Forecast updated" in str(result):
-                                final_context["new_forecast"] = args.get("new_forecast")
-                            if "Transfer" in str(result):
-                                final_context["inventory_action"] = str(result)
-                                final_context["transfer_qty"] = args.get("quantity")
-                            if "PO created" in str(result):
-                                final_context["procurement_action"] = str(result)
-                                final_context["po_qty"] = args.get("quantity")
-                                
-                    # Follow-up call
-                    followup = self.client.chat.completions.create(
-                        model=agent.model,
-                        messages=[{"role": "system", "content": instructions}] + messages
-                    )
-                    followup_msg = followup.choices[0].message
-                    followup_dict = followup_msg.model_dump() if hasattr(followup_msg, "model_dump") else followup_msg.dict()
-                    messages.append(followup_dict)
-                    logs.append(f"[{agent.name}] {followup_msg.content}")
+                with profiling.stage(profile, agent.name):
+                    # A close enough past conclusion for a similar SKU stands in for the agent (core.similarity)
+                    reused = self.recall_root_cause(agent, sku_data, state, context_variables, messages, events)
+                    # Run Agent (Chat Completions): one call with a structured decision, plus
+                    # one more only for agents that used research tools before deciding
+                    prompt = self.instructions_for(agent, context_variables)
+                    if not reused:
+                        usage.add_prompt(prompt)
+                    for turn in range(0 if reused else MAX_TURNS):
+                        sent = handoff.messages_for(agent.name, messages, state)
+                        usage.add_history(agent.name, history_tokens(sent), history_tokens(messages))
+                        request = self.stage_request(agent, context_variables, sent,
+                                                     with_tools=turn < MAX_TURNS - 1, prompt=prompt)
+                        started = time.perf_counter()
+                        response = self.chat(request, deadlines, agent.name)
+                        usage.add(response, agent.name)
+                    
+                        msg = response.choices[0].message
+                        # Cast to dict so the history is plain JSON regardless of backend
+                        msg_dict = msg.model_dump() if hasattr(msg, "model_dump") else msg.dict()
+                        if not self.apply_response(agent, msg_dict, messages, state, events, time.perf_counter() - started,
+                                                   deadlines):
+                            break
 
+            except RunCancelled:
+                # Cancelled mid-call: the agent didn't finish, so don't checkpoint it as done
+                print(f"Run cancelled during {agent.name}")
+                events.record(agent.name, CANCELLED, "Cancelled during a call.")
+                cancelled = True
+                break
+            except DeadlineExceeded as e:
+                # The agent is skipped; later agents still run unless the run deadline itself passed
+                print(f"Deadline exceeded in {agent.name}: {e}")
+                deadlines.note(agent.name, e)
+                events.record(agent.name, ERROR, e)
+                if e.scope == RUN:
+                    # Like a cancel: the agent didn't finish, so don't checkpoint it as done
+                    timed_out = True
+                    break
             except Exception as e:
                 print(f"Error running {agent.name}: {e}")
-                logs.append(f"[{agent.name}] Error: {e}")
+                events.record(agent.name, ERROR, e)
 
-        final_context["logs"] = logs
-        
-        last_msg = messages[-1].get("content", "")
-        final_context["final_summary"] = last_msg
-        
-        return final_context
+            handoff.end(agent.name, messages)
+            self.remember_root_cause(agent, sku_data, state, context_variables, events.run_id)
+            if self.checkpoints is not None:
+                self.save_checkpoint(events.run_id, stage, agent, state, messages, events, usage, handoff.notes)
+
+        # A cancelled or timed-out run keeps its checkpoint, so a retry resumes where it stopped
+        if self.checkpoints is not None and not cancelled and not timed_out:
+            self.checkpoints.delete(events.run_id)
+        return self.finalize(state, context_variables, messages, events, usage, cancelled, deadlines)
 
-    def run_agent_ad_hoc(self, agent: Agent, context: Dict[str, Any]) -> str:
+    def save_checkpoint(self, run_id: str, stage: int, agent: "Agent", state: AgentState,
+                        messages: List[Dict[str, Any]], events: EventLog, usage: UsageTotals,
+                        notes: Optional[Dict[str, str]] = None):
+        from core.checkpoint import Checkpoint
+        try:
+            self.checkpoints.save(Checkpoint(run_id=run_id, sku_id=state.sku_id, next_stage=stage + 1,
+                                             last_agent=agent.name, messages=messages, analysis=state.analysis_dict(),
+                                             events=events.records(), usage=usage.to_dict(), notes=dict(notes or {})))
+        except OSError as e:
+            # Losing a checkpoint only costs a re-run; never fail the run itself
+            print(f"  [Checkpoint] Save failed for {run_id}: {e}")
+
+    def run_agent_ad_hoc(self, agent: "Agent", context: Dict[str, Any]) -> str:
         """
         Run a single agent with a specific context. Useful for on-demand tasks like Email.
         """
         print(f"--- Ad-hoc Run: {agent.name} ---")
         
         # 1. Prepare Instructions
-        if callable(agent.instructions):
-            instructions = agent.instructions(context)
-        else:
-            instructions = agent.instructions
+        instructions = self.instructions_for(agent, context).text
             
         # 2. Prepare Messages
         messages = [{"role": "system", "content": instructions}]
@@ -215,11 +620,7 @@ class Orchestrator:
         try:
             tool_schemas = [function_to_schema(t) for t in agent.tools] if agent.tools else None
             
-            response = self.client.chat.completions.create(
-                model=agent.model,
-                messages=messages,
-                tools=tool_schemas,
-            )
+            response = self.llm.chat(agent.model, messages, tools=tool_schemas)
             
             msg = response.choices[0].message
             content = msg.content or ""
@@ -253,41 +654,47 @@ class Orchestrator:
         print(f"Persisting changes for {sku_id}...")
         
         try:
-            df = pd.read_csv(self.data_file)
-            mask = df["SKU_ID"] == sku_id
-            
-            if not mask.any():
-                return "Error: SKU not found in database."
-            
-            updated = False
-            
-            # Apply Forecast Update
-            if "new_forecast" in changes and changes["new_forecast"]:
-                df.loc[mask, "Forecast"] = int(changes["new_forecast"])
-                updated = True
-                
-            # Apply PO (Simple logic: increase On_Order)
-            if "po_qty" in changes and changes["po_qty"]:
-                current_on_order = df.loc[mask, "On_Order"].values[0]
-                # Handle NaN
-                if pd.isna(current_on_order): current_on_order = 0
-                df.loc[mask, "On_Order"] = current_on_order + int(changes["po_qty"])
-                updated = True
-                
-            # Apply Transfer (Increase Current Stock immediately for demo simplicity? Or On_Order?)
-            # Let's say transfer assumes immediate arrival or In-Transit. 
-            # We'll add to "On_Order" for consistency in this simple schema.
-            if "transfer_qty" in changes and changes["transfer_qty"]:
-                current_on_order = df.loc[mask, "On_Order"].values[0]
-                if pd.isna(current_on_order): current_on_order = 0
-                df.loc[mask, "On_Order"] = current_on_order + int(changes["transfer_qty"])
-                updated = True
-
-            if updated:
-                df.to_csv(self.data_file, index=False)
-                return "✅ Database successfully updated."
-            else:
-                return "No changes required."
-                
+            with inventory_lock(self.data_file):
+                df = pd.read_csv(self.data_file)
+                mask = df["SKU_ID"] == sku_id
+
+                if not mask.any():
+                    return "Error: SKU not found in database."
+
+                updated = False
+
+                # Apply Forecast Update
+                if "new_forecast" in changes and changes["new_forecast"]:
+                    df.loc[mask, "Forecast"] = int(changes["new_forecast"])
+                    updated = True
+
+                # Apply PO (Simple logic: increase On_Order)
+                if "po_qty" in changes and changes["po_qty"]:
+                    current_on_order = df.loc[mask, "On_Order"].values[0]
+                    # Handle NaN
+                    if pd.isna(current_on_order): current_on_order = 0
+                    df.loc[mask, "On_Order"] = current_on_order + int(changes["po_qty"])
+                    updated = True
+
+                # Apply Transfer (Increase Current Stock immediately for demo simplicity? Or On_Order?)
+                # Let's say transfer assumes immediate arrival or In-Transit. 
+                # We'll add to "On_Order" for consistency in this simple schema.
+                if "transfer_qty" in changes and changes["transfer_qty"]:
+                    current_on_order = df.loc[mask, "On_Order"].values[0]
+                    if pd.isna(current_on_order): current_on_order = 0
+                    df.loc[mask, "On_Order"] = current_on_order + int(changes["transfer_qty"])
+                    updated = True
+
+                if updated:
+                    # Atomic replace: readers never see a half-written file
+                    tmp = self.data_file + ".tmp"
+                    df.to_csv(tmp, index=False)
+                    os.replace(tmp, self.data_file)
+                    # Keep the written row around so callers can update rollups incrementally
+                    self.last_persisted_row = df.loc[mask].iloc[0].to_dict()
+                    return "✅ Database successfully updated."
+                else:
+                    return "No changes required."
+
         except Exception as e:
             return f"Database Error: {e}"
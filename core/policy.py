@@ -0,0 +1,187 @@
+"""
+Inventory policy: safety stock, reorder point and order-up-to level per SKU.
+
+    d   = Forecast / 30                     mean daily demand
+    σd  = Demand_CV * d                     daily demand std (history CV, or the default)
+    L   = Supplier_Lead_Time,  σL = lead_time_cv * L
+    z   = NormalDist().inv_cdf(service level of the SKU's Category)
+
+    Safety Stock   = z * sqrt(L σd² + d² σL²)
+    Reorder Point  = d L + Safety Stock
+    Order-Up-To    = d (L + R) + z * sqrt((L + R) σd² + d² σL²)     R = 30-day review period
+
+A replenishment order is due when the inventory position (stock + on order)
+is at or below the reorder point, for Order-Up-To minus the position. Every
+SKU is computed in one array pass; `update_row` and `set_service_levels`
+recompute only the SKUs that changed.
+
+    engine = PolicyEngine(df)
+    engine.for_sku("P-104")["Reorder_Point"]
+    engine.reorder_now(10)          # SKUs at/below their reorder point, largest order first
+"""
+from statistics import NormalDist
+from typing import Any, Dict, Optional
+
+from core.simulation import DAYS_PER_FORECAST, SimulationConfig
+
+# Cycle service level targets (probability of no stock-out per replenishment cycle)
+SERVICE_LEVELS = {
+    "Electronics": 0.95,
+    "Home": 0.92,
+    "Clothing": 0.90,
+    "Toys": 0.95,
+    "Personal Care": 0.98,
+    "Sports": 0.90,
+    "Office": 0.93,
+}
+DEFAULT_SERVICE_LEVEL = 0.95
+
+REVIEW_DAYS = DAYS_PER_FORECAST
+
+# Same demand / lead-time variability assumptions as the stock-out simulation
+_DEFAULTS = SimulationConfig()
+
+POLICY_COLUMNS = ["Service_Level", "Safety_Stock", "Reorder_Point", "Order_Up_To", "Suggested_Order"]
+
+
+def service_level(category: Optional[str], levels: Optional[Dict[str, float]] = None) -> float:
+    return (levels or SERVICE_LEVELS).get(category, DEFAULT_SERVICE_LEVEL)
+
+
+def policy_arrays(forecast, lead_time, demand_cv, level, position, review_days: int = REVIEW_DAYS,
+                  lead_time_cv: float = _DEFAULTS.lead_time_cv) -> Dict[str, Any]:
+    """
+    Policy for many SKUs at once. All inputs are 1-D arrays of the same length.
+    """
+    import numpy as np
+
+    # Only a handful of distinct targets (one per category)
+    targets, which = np.unique(np.atleast_1d(np.asarray(level, dtype=np.float64)), return_inverse=True)
+    z = np.array([NormalDist().inv_cdf(p) for p in targets])[which]
+    d = np.maximum(np.asarray(forecast, dtype=np.float64), 0.0) / DAYS_PER_FORECAST
+    var_d = (np.asarray(demand_cv, dtype=np.float64) * d) ** 2
+    lead = np.maximum(np.asarray(lead_time, dtype=np.float64), 0.0)
+    var_lead_demand = (d * lead_time_cv * lead) ** 2
+
+    safety = np.ceil(z * np.sqrt(lead * var_d + var_lead_demand))
+    reorder_point = np.ceil(d * lead) + safety
+    cover = lead + review_days
+    order_up_to = np.ceil(d * cover + z * np.sqrt(cover * var_d + var_lead_demand))
+    position = np.asarray(position, dtype=np.float64)
+    suggested = np.where(position <= reorder_point, np.maximum(order_up_to - position, 0.0), 0.0)
+    return {
+        "Service_Level": np.asarray(level, dtype=np.float64),
+        "Safety_Stock": safety,
+        "Reorder_Point": reorder_point,
+        "Order_Up_To": order_up_to,
+        "Suggested_Order": np.ceil(suggested),
+    }
+
+
+def policy_row(row: Dict[str, Any], levels: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Policy for one SKU (dict or pandas Series)."""
+    def number(name, default):
+        value = row.get(name)
+        return default if value is None or value != value else float(value)
+
+    out = policy_arrays([number("Forecast", 0)], [number("Supplier_Lead_Time", 14)],
+                        [number("Demand_CV", _DEFAULTS.demand_cv)], [service_level(row.get("Category"), levels)],
+                        [number("Current_Stock", 0) + number("On_Order", 0)])
+    return {name: float(values[0]) for name, values in out.items()}
+
+
+def policy_fields(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Prompt context block for an agent: the policy in `context`, computed if missing."""
+    policy = context if context.get("Reorder_Point") is not None else policy_row(context)
+    return {
+        "Service Level Target": f"{policy['Service_Level']:.0%}",
+        "Safety Stock": policy["Safety_Stock"],
+        "Reorder Point": policy["Reorder_Point"],
+        "Order-Up-To Level": policy["Order_Up_To"],
+    }
+
+
+class PolicyEngine:
+    """
+    Policy for a whole inventory table, kept as arrays and updated per SKU,
+    the same way core.rollups.PortfolioRollup is.
+    """
+    def __init__(self, df, levels: Optional[Dict[str, float]] = None):
+        import numpy as np
+
+        self.levels = dict(levels or SERVICE_LEVELS)
+        self.sku_ids = df["SKU_ID"].astype(str).to_numpy()
+        self._pos = {sku: i for i, sku in enumerate(self.sku_ids)}
+
+        def column(name, default):
+            if name in df.columns:
+                return df[name].fillna(default).to_numpy(dtype=np.float64)
+            return np.full(len(df), default, dtype=np.float64)
+
+        self.category = (df["Category"].fillna("") if "Category" in df.columns else df["SKU_ID"].map(lambda _: "")).to_numpy(dtype=object)
+        self.forecast = column("Forecast", 0)
+        self.lead_time = column("Supplier_Lead_Time", 14)
+        self.demand_cv = column("Demand_CV", _DEFAULTS.demand_cv)
+        self.stock = column("Current_Stock", 0)
+        self.on_order = column("On_Order", 0)
+        self.arrays = {name: np.zeros(len(df)) for name in POLICY_COLUMNS}
+        self._recompute(slice(None))
+
+    def _recompute(self, idx):
+        import numpy as np
+
+        import pandas as pd
+
+        levels = pd.Series(np.atleast_1d(self.category[idx])).map(self.levels).fillna(DEFAULT_SERVICE_LEVEL).to_numpy()
+        position = self.stock[idx] + self.on_order[idx]
+        out = policy_arrays(self.forecast[idx], self.lead_time[idx], self.demand_cv[idx], levels, position)
+        for name, values in out.items():
+            self.arrays[name][idx] = values
+
+    def update_row(self, row: Dict[str, Any]) -> bool:
+        """Recompute one SKU after its stock, forecast or on-order changed."""
+        i = self._pos.get(str(row["SKU_ID"]))
+        if i is None:
+            return False
+
+        def number(name, current):
+            value = row.get(name)
+            return current if value is None or value != value else float(value)
+
+        self.forecast[i] = number("Forecast", self.forecast[i])
+        self.lead_time[i] = number("Supplier_Lead_Time", self.lead_time[i])
+        self.demand_cv[i] = number("Demand_CV", self.demand_cv[i])
+        self.stock[i] = number("Current_Stock", self.stock[i])
+        self.on_order[i] = number("On_Order", self.on_order[i])
+        self._recompute([i])
+        return True
+
+    def set_service_levels(self, levels: Dict[str, float]) -> int:
+        """Change category targets; only SKUs in changed categories are recomputed."""
+        import numpy as np
+
+        changed = {c for c, p in levels.items() if self.levels.get(c) != p}
+        self.levels.update(levels)
+        idx = np.flatnonzero(np.isin(self.category, list(changed)))
+        if len(idx):
+            self._recompute(idx)
+        return len(idx)
+
+    def for_sku(self, sku_id: str) -> Optional[Dict[str, float]]:
+        i = self._pos.get(sku_id)
+        if i is None:
+            return None
+        return {name: float(values[i]) for name, values in self.arrays.items()}
+
+    def frame(self):
+        import pandas as pd
+
+        frame = pd.DataFrame(self.arrays, index=pd.Index(self.sku_ids, name="SKU_ID"))
+        frame["Inventory_Position"] = self.stock + self.on_order
+        return frame
+
+    def reorder_now(self, n: int = 10):
+        """SKUs at or below their reorder point, largest suggested order first."""
+        frame = self.frame()
+        due = frame[frame["Inventory_Position"] <= frame["Reorder_Point"]]
+        return due.sort_values("Suggested_Order", ascending=False).head(n).reset_index()
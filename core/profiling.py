@@ -0,0 +1,232 @@
+"""
+Opt-in profiling of pipeline runs, stage by stage.
+
+A run is split into stages ("Build Context", then one per agent). For each
+stage the profile collects:
+
+* sampled call stacks of the run thread and the call threads it spawns
+  (LLM requests and tools, see core.deadlines), written as collapsed stacks
+  ("Stage;outer;inner count") that flamegraph.pl or speedscope read directly;
+* cProfile function totals (cumulative time), to see which calls are hot;
+* tracemalloc allocations: the top allocation sites by growth and the peak.
+  tracemalloc is process-wide, so these include every thread's allocations,
+  other runs' too. core.batch profiles one SKU at a time; stages that
+  overlapped another profiled run are marked with `concurrent_runs`.
+
+Output goes to `<root>/<run>/` as stacks.folded, cpu.txt, memory.txt and
+summary.json, and the summary (wall/CPU time and memory per stage) is added
+to the run result under "profile".
+
+Profiling is off unless an Orchestrator gets a Profiler, or SC_PROFILE is
+set (SC_PROFILE=1 for the default directory, or a directory path). When off,
+the pipeline only checks `profile is None` per stage.
+
+    Orchestrator(profiler=Profiler("data/profiles")).run(sku_data)
+    python -m core.batch --profile data/profiles ...
+"""
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+PROFILE_DIR = "data/profiles"
+
+# Threads that run a call on behalf of another thread are named "<prefix>:<owner ident>"
+CALL_THREAD_PREFIX = "sc-deadline-call"
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+def _start_tracing(frames: int):
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _started_tracing = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        _tracing_users -= 1
+        # Only stop tracing we started ourselves, once the last profiled run is done
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def _snapshot():
+    # Leave out the profiler's own allocations (cProfile, pstats, stack samples)
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, path) for path in (cProfile.__file__, pstats.__file__, tracemalloc.__file__, __file__)
+    ])
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """Settings shared by all profiled runs; `start` begins one run's profile."""
+    def __init__(self, root: str = PROFILE_DIR, interval: float = 0.005, memory: bool = True,
+                 top: int = 25, trace_frames: int = 1):
+        self.root = root
+        self.interval = interval
+        self.memory = memory
+        self.top = top
+        self.trace_frames = trace_frames
+
+    def start(self, name: str) -> "RunProfile":
+        return RunProfile(self, name)
+
+
+def default_profiler() -> Optional[Profiler]:
+    """Profiler from the SC_PROFILE environment variable, or None (profiling off)."""
+    setting = os.getenv("SC_PROFILE", "").strip()
+    if not setting or setting.lower() in ("0", "false", "no", "off"):
+        return None
+    return Profiler(PROFILE_DIR if setting.lower() in ("1", "true", "yes", "on") else setting)
+
+
+def stage(profile: Optional["RunProfile"], name: str):
+    """`with stage(profile, "Forecast Agent"):` — a no-op context when profiling is off."""
+    return profile.stage(name) if profile is not None else contextlib.nullcontext()
+
+
+class RunProfile:
+    """
+    Profile of one run. Must be started and finished on the thread that runs
+    the pipeline; stacks are sampled from a background thread.
+    """
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        self.dir = os.path.join(profiler.root, f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        self.thread_ident = threading.get_ident()
+        # Stacks are cut at the frame that called Profiler.start (e.g. Orchestrator.run)
+        self._root_frame = sys._getframe(2)
+        self.stacks: Counter = Counter()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._cpu: Dict[str, pstats.Stats] = {}
+        self._memory: Dict[str, List[str]] = {}
+        self._current = "(between stages)"
+        self._stop = threading.Event()
+        if profiler.memory:
+            _start_tracing(profiler.trace_frames)
+        self._sampler = threading.Thread(target=self._sample, daemon=True, name="sc-profile-sampler")
+        self._sampler.start()
+
+    def _stack(self, frame, owner: bool) -> List[str]:
+        labels = []
+        while frame is not None:
+            if not owner and frame.f_code.co_filename == threading.__file__:
+                break  # thread bootstrap
+            labels.append(_frame_label(frame))
+            if owner and frame is self._root_frame:
+                break
+            frame = frame.f_back
+        labels.reverse()
+        return labels
+
+    def _sample(self):
+        suffix = f":{self.thread_ident}"
+        while not self._stop.wait(self.profiler.interval):
+            frames = sys._current_frames()
+            children = {t.ident for t in threading.enumerate()
+                        if t.name.startswith(CALL_THREAD_PREFIX) and t.name.endswith(suffix)}
+            current = self._current
+            owner_frame = frames.get(self.thread_ident)
+            if owner_frame is not None:
+                self.stacks[";".join([current] + self._stack(owner_frame, True))] += 1
+            for ident in children:
+                if ident in frames:
+                    self.stacks[";".join([current, "[call thread]"] + self._stack(frames[ident], False))] += 1
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        self._current = name
+        memory = self.profiler.memory and tracemalloc.is_tracing()
+        before = None
+        if memory:
+            # reset_peak and the snapshots cover the whole process, not just this run
+            overlapping = _tracing_users - 1
+            tracemalloc.reset_peak()
+            before = _snapshot()
+        cpu = cProfile.Profile()
+        try:
+            cpu.enable()
+        except ValueError:
+            # Another profiler is already active on this interpreter; keep the stack samples only
+            cpu = None
+        wall, cpu_time = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            if cpu is not None:
+                cpu.disable()
+            stats = self.stages.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0})
+            stats["wall_ms"] = round(stats["wall_ms"] + (time.perf_counter() - wall) * 1000, 1)
+            stats["cpu_ms"] = round(stats["cpu_ms"] + (time.thread_time() - cpu_time) * 1000, 1)
+            if memory:
+                diff = [d for d in _snapshot().compare_to(before, "lineno") if d.size_diff > 0]
+                stats["alloc_kb"] = round(sum(d.size_diff for d in diff) / 1024, 1)
+                stats["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+                overlapping = max(overlapping, _tracing_users - 1)
+                if overlapping:
+                    stats["concurrent_runs"] = max(stats.get("concurrent_runs", 0), overlapping)
+                self._memory[name] = [str(d) for d in diff[:self.profiler.top]]
+            if cpu is not None:
+                if name in self._cpu:
+                    self._cpu[name].add(cpu)
+                else:
+                    self._cpu[name] = pstats.Stats(cpu)
+            self._current = "(between stages)"
+
+    def finish(self) -> Dict[str, Any]:
+        """Stop sampling, write the report files and return the per-stage summary."""
+        self._stop.set()
+        self._sampler.join()
+        if self.profiler.memory:
+            _stop_tracing()
+
+        summary = {"dir": self.dir, "samples": sum(self.stacks.values()), "stages": self.stages}
+        if self._memory:
+            summary["memory_scope"] = "process"
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            with open(os.path.join(self.dir, "stacks.folded"), "w", encoding="utf-8") as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            with open(os.path.join(self.dir, "cpu.txt"), "w", encoding="utf-8") as f:
+                for name, stats in self._cpu.items():
+                    out = io.StringIO()
+                    stats.stream = out
+                    stats.sort_stats("cumulative").print_stats(self.profiler.top)
+                    f.write(f"=== {name} ===\n{out.getvalue()}\n")
+            if self._memory:
+                with open(os.path.join(self.dir, "memory.txt"), "w", encoding="utf-8") as f:
+                    f.write("Process-wide tracemalloc figures: allocations by all threads during each stage.\n\n")
+                    for name, lines in self._memory.items():
+                        shared = self.stages[name].get("concurrent_runs")
+                        shared = f", overlapped {shared} other profiled run(s)" if shared else ""
+                        f.write(f"=== {name} (+{self.stages[name]['alloc_kb']} KiB, process peak {self.stages[name]['peak_kb']} KiB{shared}) ===\n")
+                        f.write("\n".join(lines) + "\n\n")
+            with open(os.path.join(self.dir, "summary.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        except OSError as e:
+            # A profile that can't be written should never fail the run
+            print(f"  [Profile] Could not write {self.dir}: {e}")
+        return summary
@@ -0,0 +1,163 @@
+"""
+Prompt construction for the agent chain.
+
+Every system prompt is laid out the same way: the agent's static instructions
+first (identical for every SKU, so providers can cache that prefix), then a
+compact "Context" block with the per-SKU values, then at most one small
+pipe-separated table of the rows that matter (e.g. the same product at other
+locations). Each agent has a token budget; table rows are dropped, least
+relevant first, until the prompt fits.
+
+    python -m core.prompts --sku P-142      # prompt tokens per agent vs budget
+"""
+import argparse
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from core.llm_service import estimate_tokens
+
+# Token budget for each agent's system prompt (instructions + context + table)
+AGENT_BUDGETS = {
+    "Monitoring Agent": 250,
+    "Forecast Agent": 300,
+    "Root Cause Agent": 350,
+    "Inventory Agent": 600,
+    "Procurement Agent": 300,
+    "Communication Agent": 250,
+    "Email Agent": 700,
+}
+DEFAULT_BUDGET = 500
+
+INVENTORY_COLUMNS = ["SKU_ID", "Location", "Current_Stock", "Forecast", "On_Order", "Surplus"]
+
+
+@dataclass
+class Prompt:
+    agent: str
+    text: str
+    tokens: int
+    budget: int
+    table_rows: int = 0
+    dropped_rows: int = 0
+
+    @property
+    def over_budget(self) -> bool:
+        return self.tokens > self.budget
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def format_value(value: Any) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else f"{value:.2f}"
+    return str(value).replace("\n", " ")
+
+
+def render_fields(fields: Dict[str, Any]) -> str:
+    return "\n".join(f"- {key}: {format_value(value)}" for key, value in fields.items())
+
+
+def render_table(rows: Sequence[Dict[str, Any]], columns: Sequence[str]) -> str:
+    lines = ["|".join(columns)]
+    lines += ["|".join(format_value(row.get(c)) for c in columns) for row in rows]
+    return "\n".join(lines)
+
+
+def relevant_inventory(full_inventory: Iterable[Dict[str, Any]], product_name: str,
+                       exclude_sku: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Same product at other locations, largest surplus (stock beyond forecast) first.
+    """
+    rows = [{**r, "Surplus": (r.get("Current_Stock") or 0) - (r.get("Forecast") or 0)}
+            for r in full_inventory
+            if r.get("Product_Name") == product_name and r.get("SKU_ID") != exclude_sku]
+    return sorted(rows, key=lambda r: r["Surplus"], reverse=True)
+
+
+def build_prompt(agent: str,
+                 instructions: str,
+                 fields: Optional[Dict[str, Any]] = None,
+                 table: Optional[Sequence[Dict[str, Any]]] = None,
+                 columns: Sequence[str] = INVENTORY_COLUMNS,
+                 table_title: str = "Rows",
+                 budget: Optional[int] = None) -> Prompt:
+    """
+    Static instructions, then the context block, then the table trimmed to fit
+    the agent's budget.
+    """
+    budget = budget or AGENT_BUDGETS.get(agent, DEFAULT_BUDGET)
+    head = instructions.rstrip()
+    if fields:
+        head += "\n\nContext:\n" + render_fields(fields)
+
+    rows = list(table or [])
+    header = "|".join(columns)
+    lines = ["|".join(format_value(row.get(c)) for c in columns) for row in rows]
+
+    def render(keep: int) -> str:
+        return "\n".join([f"{head}\n\n{table_title}:\n{header}"] + lines[:keep]) if keep else head
+
+    # Tokens only grow with rows, so binary-search the most rows that fit (each row rendered once)
+    keep = len(rows)
+    if estimate_tokens(render(keep)) > budget:
+        low, high = 0, keep - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(render(mid)) <= budget:
+                low = mid
+            else:
+                high = mid - 1
+        keep = low
+    text = render(keep)
+    return Prompt(agent, text + "\n", estimate_tokens(text), budget, keep, len(rows) - keep)
+
+
+def as_prompt(agent: str, instructions: Any) -> Prompt:
+    """Wrap plain-string instructions so every agent reports tokens the same way."""
+    if isinstance(instructions, Prompt):
+        return instructions
+    budget = AGENT_BUDGETS.get(agent, DEFAULT_BUDGET)
+    return Prompt(agent, instructions, estimate_tokens(instructions), budget)
+
+
+def prompt_report(sku_data: Dict[str, Any], orchestrator=None) -> List[Dict[str, Any]]:
+    """
+    System-prompt tokens per agent for one SKU, against each agent's budget.
+    """
+    if orchestrator is None:
+        from core.orchestrator import Orchestrator
+        orchestrator = Orchestrator()
+    context = orchestrator.build_context(sku_data)
+    report = []
+    for agent in orchestrator.agents:
+        prompt = orchestrator.instructions_for(agent, context)
+        report.append({"agent": agent.name, "tokens": prompt.tokens, "budget": prompt.budget,
+                       "table_rows": prompt.table_rows, "dropped_rows": prompt.dropped_rows})
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.prompts", description="Report system-prompt tokens per agent for a SKU")
+    parser.add_argument("--data", default="data/inventory_data_real.csv")
+    parser.add_argument("--sku", required=True)
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from core.orchestrator import Orchestrator
+
+    df = pd.read_csv(args.data)
+    rows = df[df["SKU_ID"] == args.sku]
+    if rows.empty:
+        parser.error(f"SKU {args.sku} not found in {args.data}")
+    for r in prompt_report(rows.iloc[0].to_dict(), Orchestrator(data_file=args.data)):
+        flag = " (over budget)" if r["tokens"] > r["budget"] else ""
+        dropped = f", {r['dropped_rows']} rows dropped" if r["dropped_rows"] else ""
+        print(f"{r['agent']:<22} {r['tokens']:>5} / {r['budget']:<5} tokens{dropped}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from typing import Any, Dict, Optional
+
+# Coverage thresholds used by the Monitoring Agent rules
+STOCKOUT_COVERAGE = 0.8
+OVERSTOCK_COVERAGE = 2.0
+
+HEALTHY = "Healthy"
+STOCKOUT_RISK = "Stock-out Risk"
+OVERSTOCK_RISK = "Overstock Risk"
+
+RISK_CLASSES = [HEALTHY, STOCKOUT_RISK, OVERSTOCK_RISK]
+
+# The 30-day forecast is treated as ~4 weeks of demand on the dashboard
+WEEKS_PER_FORECAST = 4
+
+# Simulated probability of running out within the supplier lead time (core.simulation)
+# at which a SKU is a stock-out risk, whatever its coverage
+STOCKOUT_PROBABILITY = 0.2
+
+
+def coverage(current_stock: float, forecast: float) -> float:
+    """
+    Coverage = Current_Stock / Forecast (if Forecast > 0, else 0).
+    """
+    return current_stock / forecast if forecast else 0.0
+
+
+def classify_coverage(cov: float) -> str:
+    if cov < STOCKOUT_COVERAGE:
+        return STOCKOUT_RISK
+    if cov > OVERSTOCK_COVERAGE:
+        return OVERSTOCK_RISK
+    return HEALTHY
+
+
+def classify_coverage_array(current_stock, forecast):
+    """
+    `classify_coverage(coverage(stock, forecast))` over arrays, for many SKUs
+    at once. Returns an array of risk classes.
+    """
+    import numpy as np
+
+    stock = np.asarray(current_stock, dtype=np.float64)
+    forecast = np.asarray(forecast, dtype=np.float64)
+    cov = np.divide(stock, forecast, out=np.zeros(np.broadcast(stock, forecast).shape), where=forecast != 0)
+    return np.where(cov < STOCKOUT_COVERAGE, STOCKOUT_RISK, np.where(cov > OVERSTOCK_COVERAGE, OVERSTOCK_RISK, HEALTHY))
+
+
+def classify_risk(cov: float, p_stockout: Optional[float] = None) -> str:
+    """
+    Coverage rule, plus a stock-out flag from the simulated probability when
+    one is available: it accounts for lead time and demand variability, so it
+    catches SKUs whose coverage looks fine but can't be replenished in time.
+    """
+    if p_stockout is not None and p_stockout == p_stockout and p_stockout >= STOCKOUT_PROBABILITY:
+        return STOCKOUT_RISK
+    return classify_coverage(cov)
+
+
+def classify_row(row: Dict[str, Any]) -> str:
+    """
+    Risk class for one inventory row (dict or pandas Series). Uses
+    `p_stockout` when the row carries simulation results.
+    """
+    cov = coverage(float(row["Current_Stock"]), float(row["Forecast"]))
+    return classify_risk(cov, row.get("p_stockout"))
+
+
+def deficit_units(current_stock: float, forecast: float, on_order: float = 0) -> float:
+    """
+    Deficit = Forecast - (Current Stock + On Order), floored at zero.
+    """
+    return max(0.0, forecast - (current_stock + on_order))
+
+
+def overstock_units(current_stock: float, forecast: float) -> float:
+    """
+    Units held above the overstock coverage threshold.
+    """
+    return max(0.0, current_stock - OVERSTOCK_COVERAGE * forecast)
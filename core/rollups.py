@@ -0,0 +1,222 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.risk import STOCKOUT_COVERAGE, OVERSTOCK_COVERAGE, STOCKOUT_PROBABILITY, WEEKS_PER_FORECAST
+
+GROUP_COLUMNS = ["Category", "Location"]
+
+# Per-group accumulators kept in sync with the per-SKU arrays
+_SUM_FIELDS = ["count", "stock", "forecast", "on_order", "deficit", "overstock", "stockout_skus", "overstock_skus",
+               "supply_days"]
+
+
+class PortfolioRollup:
+    """
+    Category x Location rollups over the whole catalog.
+
+    Built once from a DataFrame (one vectorized pass), then kept current with
+    `update_row`, which subtracts the SKU's old contribution from its group and
+    adds the new one. Dashboard reads only touch the small group arrays, so the
+    portfolio view costs the same for 100 rows or millions.
+
+    With a `simulation` config, stock-out SKUs also include those the Monte
+    Carlo engine (core.simulation) gives a high stock-out probability, and
+    weeks of supply is the simulated median time to stock-out.
+    """
+    def __init__(self, df: pd.DataFrame, simulation=None):
+        df = df.reset_index(drop=True)
+        for col in GROUP_COLUMNS:
+            if col not in df.columns:
+                df[col] = "Unknown"
+
+        self.sku_ids = df["SKU_ID"].astype(str).to_numpy()
+        self.product_names = df["Product_Name"].astype(str).to_numpy()
+        self._pos = {sku: i for i, sku in enumerate(self.sku_ids)}
+
+        group_index = pd.MultiIndex.from_frame(df[GROUP_COLUMNS].astype(str))
+        codes, uniques = pd.factorize(group_index)
+        self.groups: List[tuple] = list(uniques)
+        self._group_pos = {g: i for i, g in enumerate(self.groups)}
+        self.group_of = codes.astype(np.int32)
+
+        self.stock = df["Current_Stock"].fillna(0).to_numpy(dtype=np.float64)
+        self.forecast = df["Forecast"].fillna(0).to_numpy(dtype=np.float64)
+        on_order = df["On_Order"] if "On_Order" in df.columns else pd.Series(0, index=df.index)
+        self.on_order = on_order.fillna(0).to_numpy(dtype=np.float64)
+
+        self.deficit = np.zeros(len(df))
+        self.overstock = np.zeros(len(df))
+        self.coverage = np.zeros(len(df))
+        self._refresh_derived(slice(None))
+
+        self.simulation = simulation
+        self.p_stockout = None
+        self.days_to_stockout = None
+        if simulation is not None:
+            from core.simulation import simulate
+            lead = df["Supplier_Lead_Time"] if "Supplier_Lead_Time" in df.columns else pd.Series(14, index=df.index)
+            self.lead_time = lead.fillna(14).to_numpy(dtype=np.float64)
+            # History-derived demand variability (core.history); NaN falls back to the config default
+            cv = df["Demand_CV"] if "Demand_CV" in df.columns else pd.Series(np.nan, index=df.index)
+            self.demand_cv = cv.to_numpy(dtype=np.float64, copy=True)
+            sim = simulate(df, simulation)
+            # Writable copies: update_row assigns into these (pandas may hand back read-only views)
+            self.p_stockout = sim["p_stockout"].to_numpy(dtype=np.float64, copy=True)
+            self.days_to_stockout = sim["days_to_stockout_p50"].to_numpy(dtype=np.float64, copy=True)
+
+        n_groups = len(self.groups)
+        self.sums: Dict[str, np.ndarray] = {}
+        contrib = self._contributions(slice(None))
+        for name in _SUM_FIELDS:
+            self.sums[name] = np.bincount(self.group_of, weights=contrib[name], minlength=n_groups)
+
+        self._top_cache: Dict[tuple, np.ndarray] = {}
+
+    @classmethod
+    def from_csv(cls, path: str) -> "PortfolioRollup":
+        return cls(pd.read_csv(path))
+
+    def __len__(self) -> int:
+        return len(self.sku_ids)
+
+    # --- internal helpers ---
+
+    def _refresh_derived(self, idx):
+        stock, forecast, on_order = self.stock[idx], self.forecast[idx], self.on_order[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = np.where(forecast > 0, stock / np.where(forecast > 0, forecast, 1), 0.0)
+        self.coverage[idx] = cov
+        self.deficit[idx] = np.maximum(0.0, forecast - (stock + on_order))
+        self.overstock[idx] = np.maximum(0.0, stock - OVERSTOCK_COVERAGE * forecast)
+
+    def _contributions(self, idx) -> Dict[str, np.ndarray]:
+        cov = np.atleast_1d(self.coverage[idx])
+        stockout = cov < STOCKOUT_COVERAGE
+        if self.p_stockout is not None:
+            # Same rule as core.risk.classify_risk
+            stockout |= np.atleast_1d(self.p_stockout[idx]) >= STOCKOUT_PROBABILITY
+            supply_days = np.atleast_1d(self.days_to_stockout[idx])
+        else:
+            supply_days = cov * WEEKS_PER_FORECAST * 7
+        return {
+            "count": np.ones_like(cov),
+            "stock": np.atleast_1d(self.stock[idx]),
+            "forecast": np.atleast_1d(self.forecast[idx]),
+            "on_order": np.atleast_1d(self.on_order[idx]),
+            "deficit": np.atleast_1d(self.deficit[idx]),
+            "overstock": np.atleast_1d(self.overstock[idx]),
+            "stockout_skus": stockout.astype(np.float64),
+            "overstock_skus": (cov > OVERSTOCK_COVERAGE).astype(np.float64),
+            "supply_days": supply_days.astype(np.float64),
+        }
+
+    def _apply(self, i: int, sign: float):
+        g = self.group_of[i]
+        contrib = self._contributions(i)
+        for name in _SUM_FIELDS:
+            self.sums[name][g] += sign * contrib[name][0]
+
+    # --- incremental updates ---
+
+    def update_row(self, row: Dict[str, Any]) -> bool:
+        """
+        Apply the latest values for one SKU. Returns False for unknown SKUs.
+        """
+        i = self._pos.get(str(row.get("SKU_ID")))
+        if i is None:
+            return False
+
+        self._apply(i, -1.0)
+        if "Current_Stock" in row:
+            self.stock[i] = float(row["Current_Stock"] or 0)
+        if "Forecast" in row:
+            self.forecast[i] = float(row["Forecast"] or 0)
+        if "On_Order" in row and not pd.isna(row["On_Order"]):
+            self.on_order[i] = float(row["On_Order"] or 0)
+        self._refresh_derived(i)
+        if self.simulation is not None:
+            from core.simulation import simulate_row
+            if "Supplier_Lead_Time" in row and not pd.isna(row["Supplier_Lead_Time"]):
+                self.lead_time[i] = float(row["Supplier_Lead_Time"])
+            if "Demand_CV" in row and not pd.isna(row["Demand_CV"]):
+                self.demand_cv[i] = float(row["Demand_CV"])
+            sim_row = {"Current_Stock": self.stock[i], "Forecast": self.forecast[i],
+                       "On_Order": self.on_order[i], "Supplier_Lead_Time": self.lead_time[i]}
+            if not np.isnan(self.demand_cv[i]):
+                sim_row["Demand_CV"] = self.demand_cv[i]
+            sim = simulate_row(sim_row, self.simulation)
+            self.p_stockout[i] = sim["p_stockout"]
+            self.days_to_stockout[i] = sim["days_to_stockout_p50"]
+        self._apply(i, 1.0)
+
+        self._top_cache.clear()
+        return True
+
+    # --- read side ---
+
+    def group_frame(self) -> pd.DataFrame:
+        """
+        One row per Category x Location with coverage and weeks of supply.
+        """
+        frame = pd.DataFrame(self.groups, columns=GROUP_COLUMNS)
+        for name in _SUM_FIELDS:
+            frame[name] = self.sums[name]
+        forecast = frame["forecast"].where(frame["forecast"] > 0)
+        frame["coverage"] = (frame["stock"] / forecast).fillna(0.0)
+        if self.p_stockout is not None:
+            # Mean simulated median days until stock-out across the group's SKUs
+            frame["weeks_of_supply"] = frame["supply_days"] / frame["count"].where(frame["count"] > 0) / 7
+        else:
+            frame["weeks_of_supply"] = frame["coverage"] * WEEKS_PER_FORECAST
+        return frame
+
+    def heatmap(self, metric: str = "coverage") -> pd.DataFrame:
+        """
+        Category x Location pivot of `metric` (coverage, weeks_of_supply, deficit, ...).
+        """
+        return self.group_frame().pivot(index="Category", columns="Location", values=metric)
+
+    def totals(self) -> Dict[str, float]:
+        return {name: float(self.sums[name].sum()) for name in _SUM_FIELDS}
+
+    def sku_simulation(self, sku_id: str) -> Optional[Dict[str, float]]:
+        i = self._pos.get(sku_id)
+        if i is None or self.p_stockout is None:
+            return None
+        return {"p_stockout": float(self.p_stockout[i]), "days_to_stockout_p50": float(self.days_to_stockout[i])}
+
+    def top_at_risk(self, n: int = 10, kind: str = "stockout") -> pd.DataFrame:
+        """
+        Top-N SKUs by deficit units (kind="stockout") or overstock units (kind="overstock").
+        """
+        values = self.deficit if kind == "stockout" else self.overstock
+        key = (kind, n)
+        idx = self._top_cache.get(key)
+        if idx is None:
+            n_eff = min(n, len(values))
+            if n_eff == 0:
+                idx = np.array([], dtype=np.int64)
+            else:
+                idx = np.argpartition(-values, n_eff - 1)[:n_eff]
+                idx = idx[np.argsort(-values[idx])]
+                idx = idx[values[idx] > 0]
+            self._top_cache[key] = idx
+
+        frame = pd.DataFrame({
+            "SKU_ID": self.sku_ids[idx],
+            "Product_Name": self.product_names[idx],
+            "Category": [self.groups[g][0] for g in self.group_of[idx]],
+            "Location": [self.groups[g][1] for g in self.group_of[idx]],
+            "Current_Stock": self.stock[idx].astype(np.int64),
+            "Forecast": self.forecast[idx].astype(np.int64),
+            "Coverage": np.round(self.coverage[idx], 2),
+            "Units": values[idx].astype(np.int64),
+        })
+        if self.p_stockout is not None:
+            frame["P(Stock-out)"] = np.round(self.p_stockout[idx], 2)
+        return frame
+
+    def sku_position(self, sku_id: str) -> Optional[int]:
+        return self._pos.get(sku_id)
@@ -0,0 +1,216 @@
+"""
+What-if scenarios over the whole catalog, without running the agents.
+
+A scenario changes three inputs for every SKU:
+
+- season: the Season the SKU is treated as, like the dashboard's "Simulated
+  Season" selector. This month's demand is rescaled by that season's profile
+  (core.history.SEASON_SHAPE) relative to the SKU's own; None keeps each
+  SKU's Season;
+- demand_shock: fractional change in demand (+0.2 = 20% more);
+- lead_time_slip: extra supplier lead-time days.
+
+`run_scenarios` evaluates every scenario x SKU pair in one vectorized pass.
+It returns a long DataFrame indexed by (Scenario, SKU_ID) with the
+scenario's forecast, coverage, risk class, deficit and the order the
+inventory policy (core.policy) proposes. `matrix`, `pivot` and `summary`
+reshape it for the dashboard.
+
+Work is shared across scenarios. Base columns, service levels and seasonal
+factors are computed once. Scenario x SKU pairs that end up with the same
+inputs (a Winter SKU in the Winter scenario without a shock, say) are
+evaluated once and scattered back. With a SimulationConfig, the stock-out
+probability comes from the Monte Carlo engine (core.simulation), run over
+the distinct inputs only.
+
+    frame = run_scenarios(df, scenario_grid(shocks=(-0.2, 0, 0.2), slips=(0, 7)))
+    matrix(frame, "Deficit")                      # scenario x SKU
+    pivot(frame, "Suggested_Order", "Category")   # scenario x category totals
+
+    python -m core.scenarios --shocks -0.2 0 0.2 --slips 0 7
+"""
+import argparse
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from core.risk import (HEALTHY, OVERSTOCK_COVERAGE, OVERSTOCK_RISK, STOCKOUT_COVERAGE, STOCKOUT_PROBABILITY,
+                       STOCKOUT_RISK)
+
+SEASONS = ("Winter", "Summer", "All Year")
+
+# Month the pipeline runs in (Orchestrator.build_context uses 2024-12-01)
+CURRENT_MONTH = 12
+
+SCENARIO_COLUMNS = ["Season", "Demand_Shock", "Lead_Time_Slip", "Product_Name", "Category", "Location",
+                    "Forecast", "Supplier_Lead_Time", "Coverage", "Risk", "Stockout_Risk", "Deficit",
+                    "Reorder_Point", "Suggested_Order"]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    season: Optional[str] = None
+    demand_shock: float = 0.0
+    lead_time_slip: float = 0.0
+
+    @property
+    def name(self) -> str:
+        parts = [self.season or "As-is"]
+        if self.demand_shock:
+            parts.append(f"demand {self.demand_shock:+.0%}")
+        if self.lead_time_slip:
+            parts.append(f"lead {self.lead_time_slip:+g}d")
+        return ", ".join(parts)
+
+
+def scenario_grid(seasons: Sequence[Optional[str]] = SEASONS, shocks: Sequence[float] = (0.0,),
+                  slips: Sequence[float] = (0.0,)) -> List[Scenario]:
+    """Every combination of season, demand shock and lead-time slip."""
+    return [Scenario(season, float(shock), float(slip)) for season in seasons for shock in shocks for slip in slips]
+
+
+def season_factors(sku_seasons: Sequence[str], scenario_seasons: Sequence[Optional[str]], month: int = CURRENT_MONTH):
+    """
+    Demand multiplier per (scenario season, SKU): the scenario season's
+    profile this month over the SKU's own. Computed per distinct season pair.
+    """
+    import numpy as np
+    import pandas as pd
+    from core.history import SEASON_SHAPE
+
+    def level(season):
+        return SEASON_SHAPE.get(season, [1.0] * 12)[month - 1]
+
+    codes, own = pd.factorize(pd.Series(sku_seasons).fillna("All Year"))
+    table = np.array([[1.0 if target is None else level(target) / level(season) for season in own]
+                      for target in scenario_seasons]).reshape(len(scenario_seasons), len(own))
+    return table[:, codes]
+
+
+def run_scenarios(df, scenarios: Optional[Iterable[Scenario]] = None, month: int = CURRENT_MONTH,
+                  simulation=None, levels: Optional[Dict[str, float]] = None):
+    """
+    Scenario x SKU results for an inventory DataFrame, indexed by
+    (Scenario, SKU_ID) in scenario order. No LLM calls.
+    """
+    import numpy as np
+    import pandas as pd
+    from core.policy import DEFAULT_SERVICE_LEVEL, SERVICE_LEVELS, _DEFAULTS, policy_arrays
+
+    scenarios = list(scenarios or scenario_grid())
+    df = df.reset_index(drop=True)
+    S, N = len(scenarios), len(df)
+
+    def column(name, default):
+        if name in df.columns:
+            return df[name].fillna(default).to_numpy(dtype=np.float64)
+        return np.full(N, default, dtype=np.float64)
+
+    # Scenario-independent inputs, once
+    stock = column("Current_Stock", 0)
+    on_order = column("On_Order", 0)
+    forecast = column("Forecast", 0)
+    lead_time = column("Supplier_Lead_Time", 14)
+    demand_cv = column("Demand_CV", _DEFAULTS.demand_cv)
+    category = df["Category"] if "Category" in df.columns else pd.Series("", index=df.index)
+    level = category.map(levels or SERVICE_LEVELS).fillna(DEFAULT_SERVICE_LEVEL).to_numpy(dtype=np.float64)
+    sku_seasons = df["Season"] if "Season" in df.columns else pd.Series("All Year", index=df.index)
+
+    # Scenario inputs, broadcast to S x N
+    shock = np.array([s.demand_shock for s in scenarios])[:, None]
+    slip = np.array([s.lead_time_slip for s in scenarios])[:, None]
+    demand = forecast[None, :] * season_factors(sku_seasons, [s.season for s in scenarios], month) * (1 + shock)
+    demand = np.maximum(demand, 0.0)
+    lead = np.maximum(lead_time[None, :] + slip, 0.0)
+
+    # Evaluate each distinct (stock, on order, demand, lead time, CV, service level) once
+    inputs = np.column_stack([np.broadcast_to(a, (S, N)).ravel()
+                              for a in (stock, on_order, demand, lead, demand_cv, level)])
+    distinct, inverse = np.unique(inputs, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    u_stock, u_order, u_demand, u_lead, u_cv, u_level = distinct.T
+    policy = policy_arrays(u_demand, u_lead, u_cv, u_level, u_stock + u_order)
+
+    cover = np.where(u_demand > 0, u_stock / np.where(u_demand > 0, u_demand, 1), 0.0)
+    risk = np.where(cover < STOCKOUT_COVERAGE, STOCKOUT_RISK, np.where(cover > OVERSTOCK_COVERAGE, OVERSTOCK_RISK, HEALTHY))
+    p_stockout = None
+    if simulation is not None:
+        from core.simulation import simulate
+        p_stockout = simulate(pd.DataFrame({"Current_Stock": u_stock, "On_Order": u_order, "Forecast": u_demand,
+                                            "Supplier_Lead_Time": u_lead, "Demand_CV": u_cv}), simulation)["p_stockout"].to_numpy()
+        # Same rule as core.risk.classify_risk
+        risk = np.where(p_stockout >= STOCKOUT_PROBABILITY, STOCKOUT_RISK, risk)
+
+    def cells(values):
+        return np.asarray(values)[inverse]
+
+    def per_sku(name, default=""):
+        values = df[name].to_numpy() if name in df.columns else np.full(N, default, dtype=object)
+        return np.tile(values, S)
+
+    names = [s.name for s in scenarios]
+    frame = pd.DataFrame({
+        "Scenario": pd.Categorical(np.repeat(names, N), categories=list(dict.fromkeys(names)), ordered=True),
+        "SKU_ID": per_sku("SKU_ID"),
+        "Season": np.repeat([s.season or "As-is" for s in scenarios], N),
+        "Demand_Shock": np.repeat(shock[:, 0], N),
+        "Lead_Time_Slip": np.repeat(slip[:, 0], N),
+        "Product_Name": per_sku("Product_Name"),
+        "Category": per_sku("Category", "Unknown"),
+        "Location": per_sku("Location", "Unknown"),
+        "Forecast": demand.ravel().round(1),
+        "Supplier_Lead_Time": lead.ravel(),
+        "Coverage": cells(cover).round(2),
+        "Risk": cells(risk),
+        "Deficit": np.maximum(0.0, inputs[:, 2] - (inputs[:, 0] + inputs[:, 1])).round(1),
+        "Reorder_Point": cells(policy["Reorder_Point"]),
+        "Suggested_Order": cells(policy["Suggested_Order"]),
+    })
+    frame["Stockout_Risk"] = (frame["Risk"] == STOCKOUT_RISK).astype(int)
+    if p_stockout is not None:
+        frame["p_stockout"] = cells(p_stockout)
+    return frame.set_index(["Scenario", "SKU_ID"])
+
+
+def matrix(frame, value: str = "Deficit"):
+    """Scenario x SKU matrix of one result column."""
+    return frame[value].unstack("SKU_ID")
+
+
+def pivot(frame, value: str = "Deficit", by: str = "Category", aggfunc: str = "sum"):
+    """Scenario x group (Category, Location, ...) totals of one result column."""
+    return frame.pivot_table(index="Scenario", columns=by, values=value, aggfunc=aggfunc, observed=True)
+
+
+def summary(frame):
+    """One row per scenario: SKUs at risk, total deficit and total proposed orders."""
+    grouped = frame.groupby(level="Scenario", observed=True)
+    return grouped.agg(stockout_skus=("Stockout_Risk", "sum"),
+                       overstock_skus=("Risk", lambda r: int((r == OVERSTOCK_RISK).sum())),
+                       deficit=("Deficit", "sum"),
+                       suggested_order=("Suggested_Order", "sum"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.scenarios", description="What-if sweep over the whole catalog")
+    parser.add_argument("--data", default="data/inventory_data_real.csv")
+    parser.add_argument("--seasons", nargs="+", default=list(SEASONS))
+    parser.add_argument("--shocks", nargs="+", type=float, default=[0.0], help="Demand changes, e.g. -0.2 0 0.2")
+    parser.add_argument("--slips", nargs="+", type=float, default=[0.0], help="Extra lead-time days, e.g. 0 7 14")
+    parser.add_argument("--simulate", type=int, default=0, metavar="SAMPLES", help="Monte Carlo stock-out probability")
+    parser.add_argument("--out", default=None, help="Write the scenario x SKU results to this CSV")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from core.simulation import SimulationConfig
+
+    df = pd.read_csv(args.data)
+    simulation = SimulationConfig(n_samples=args.simulate) if args.simulate else None
+    frame = run_scenarios(df, scenario_grid(args.seasons, args.shocks, args.slips), simulation=simulation)
+    print(summary(frame).to_string())
+    if args.out:
+        frame.to_csv(args.out)
+        print(f"{len(frame)} scenario x SKU rows written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Urgency ordering for fleet scans.
+
+A SKU is urgent when its projected cover runs out before a replenishment
+could arrive:
+
+    d           = Forecast / 30                       daily demand
+    cover days  = (Current_Stock + On_Order) / d
+    days short  = Supplier_Lead_Time - cover days
+    deficit     = d * Supplier_Lead_Time - (Current_Stock + On_Order), floored at 0
+
+    urgency     = days short + log1p(deficit)    if days short > 0
+                = days short                      otherwise (more cover, less urgent)
+
+so a SKU that runs dry 10 days before resupply comes ahead of one that's 2
+days short, and of two SKUs equally short the one missing more units comes
+first. `UrgencyQueue` is a heap keyed on that score; `update` re-scores a SKU
+when fresh inventory arrives mid-sweep and the stale heap entry is skipped
+when it surfaces (lazy invalidation), so an update is O(log n).
+
+    queue = UrgencyQueue()
+    for row in rows:
+        queue.push(row)
+    row = queue.pop()                  # most urgent SKU
+"""
+import heapq
+import itertools
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Cap on cover for SKUs with no forecast demand, so they sort last but stay finite
+MAX_COVER_DAYS = 365.0
+DEFAULT_LEAD_TIME = 14.0
+
+
+def urgency(row: Dict[str, Any]) -> float:
+    """Urgency score for one inventory row (dict or pandas Series); higher is more urgent."""
+    def number(name, default):
+        value = row.get(name)
+        return default if value is None or value != value else float(value)
+
+    daily = max(number("Forecast", 0.0), 0.0) / 30
+    lead = max(number("Supplier_Lead_Time", DEFAULT_LEAD_TIME), 0.0)
+    position = number("Current_Stock", 0.0) + number("On_Order", 0.0)
+    cover = min(position / daily, MAX_COVER_DAYS) if daily > 0 else MAX_COVER_DAYS
+    short = lead - cover
+    if short <= 0:
+        return short
+    return short + math.log1p(max(daily * lead - position, 0.0))
+
+
+def urgency_scores(df) -> List[float]:
+    """Urgency for every row of an inventory DataFrame, in row order."""
+    import numpy as np
+
+    def column(name, default):
+        if name in df.columns:
+            return df[name].fillna(default).to_numpy(dtype=np.float64)
+        return np.full(len(df), default, dtype=np.float64)
+
+    daily = np.maximum(column("Forecast", 0.0), 0.0) / 30
+    lead = np.maximum(column("Supplier_Lead_Time", DEFAULT_LEAD_TIME), 0.0)
+    position = column("Current_Stock", 0.0) + column("On_Order", 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(daily > 0, np.minimum(position / daily, MAX_COVER_DAYS), MAX_COVER_DAYS)
+    short = lead - cover
+    score = np.where(short > 0, short + np.log1p(np.maximum(daily * lead - position, 0.0)), short)
+    return score.tolist()
+
+
+class UrgencyQueue:
+    """Max-urgency heap of inventory rows, one live entry per SKU."""
+    def __init__(self, rows: Optional[Iterable[Dict[str, Any]]] = None):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._live: Dict[str, int] = {}
+        self._seq = itertools.count()
+        for row in rows or ():
+            self.push(row)
+
+    def push(self, row: Dict[str, Any]):
+        """Queue a SKU, or re-score it if it is already queued."""
+        sku = str(row["SKU_ID"])
+        seq = next(self._seq)
+        self._rows[sku] = row
+        self._live[sku] = seq
+        # Ties keep insertion (file) order
+        heapq.heappush(self._heap, (-urgency(row), seq, sku))
+
+    def update(self, row: Dict[str, Any]) -> bool:
+        """
+        Re-score a queued SKU from fresh figures (merged over its queued row).
+        Returns False if the SKU isn't queued (already taken or never added).
+        """
+        sku = str(row["SKU_ID"])
+        if sku not in self._live:
+            return False
+        self.push({**self._rows[sku], **row})
+        return True
+
+    def discard(self, sku_id: str):
+        self._live.pop(str(sku_id), None)
+        self._rows.pop(str(sku_id), None)
+
+    def pop(self) -> Dict[str, Any]:
+        """Most urgent queued row. Raises IndexError when empty."""
+        while self._heap:
+            _, seq, sku = heapq.heappop(self._heap)
+            if self._live.get(sku) != seq:
+                continue  # superseded by a later update, or discarded
+            del self._live[sku]
+            return self._rows.pop(sku)
+        raise IndexError("pop from an empty UrgencyQueue")
+
+    def peek_score(self) -> Optional[float]:
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return -self._heap[0][0] if self._heap else None
+
+    def __contains__(self, sku_id) -> bool:
+        return str(sku_id) in self._live
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __bool__(self) -> bool:
+        return bool(self._live)
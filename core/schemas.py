@@ -0,0 +1,201 @@
+"""
+Structured decision objects returned by the agents.
+
+Each decision-making agent answers with one JSON object validated against its
+schema (sent as `response_format` so providers that support structured
+outputs enforce it). The orchestrator applies only the fields an agent owns,
+so a later agent can't overwrite an earlier agent's verdict.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from core.risk import HEALTHY, STOCKOUT_RISK, OVERSTOCK_RISK
+
+RISK = "Risk"
+
+# Every field an agent may decide. Nullable fields use a ["type", "null"] union,
+# as strict structured outputs require every property to be listed as required.
+FIELDS = {
+    "status": {"type": "string", "enum": [HEALTHY, RISK]},
+    "risk_type": {"type": ["string", "null"], "enum": [STOCKOUT_RISK, OVERSTOCK_RISK, None]},
+    "new_forecast": {"type": ["integer", "null"], "minimum": 0},
+    "root_cause": {"type": ["string", "null"]},
+    "transfer_qty": {"type": ["integer", "null"], "minimum": 0},
+    "transfer_source": {"type": ["string", "null"]},
+    "po_qty": {"type": ["integer", "null"], "minimum": 0},
+    "rationale": {"type": "string"},
+}
+
+# Which fields each agent decides. Agents not listed (Communication) answer in prose.
+AGENT_FIELDS = {
+    "Monitoring Agent": ["status", "risk_type"],
+    "Forecast Agent": ["new_forecast"],
+    "Root Cause Agent": ["root_cause"],
+    "Inventory Agent": ["transfer_qty", "transfer_source"],
+    "Procurement Agent": ["po_qty"],
+}
+
+
+class DecisionError(ValueError):
+    """The model's answer is not valid JSON or does not match the agent's schema."""
+
+
+def decision_schema(agent: str) -> Optional[Dict[str, Any]]:
+    fields = AGENT_FIELDS.get(agent)
+    if fields is None:
+        return None
+    names = fields + ["rationale"]
+    return {
+        "type": "object",
+        "properties": {name: FIELDS[name] for name in names},
+        "required": names,
+        "additionalProperties": False,
+    }
+
+
+def response_format(agent: str) -> Optional[Dict[str, Any]]:
+    """`response_format` for chat completions, or None for free-text agents."""
+    schema = decision_schema(agent)
+    if schema is None:
+        return None
+    name = agent.lower().replace(" ", "_") + "_decision"
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+    "null": type(None),
+}
+
+
+def _check(value: Any, spec: Dict[str, Any], path: str, errors: List[str]):
+    types = spec.get("type")
+    if types is not None:
+        types = types if isinstance(types, list) else [types]
+        # bool is an int subclass; don't let True pass as an integer
+        ok = any(isinstance(value, _TYPES[t]) and not (t in ("integer", "number") and isinstance(value, bool))
+                 for t in types)
+        if not ok:
+            errors.append(f"{path}: expected {' or '.join(types)}, got {type(value).__name__}")
+            return
+    if "enum" in spec and value not in spec["enum"]:
+        errors.append(f"{path}: {value!r} not one of {spec['enum']}")
+    if "minimum" in spec and isinstance(value, (int, float)) and value < spec["minimum"]:
+        errors.append(f"{path}: {value} < {spec['minimum']}")
+    if isinstance(value, dict) and "properties" in spec:
+        for name in spec.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name}: missing")
+        for name, item in value.items():
+            if name in spec["properties"]:
+                _check(item, spec["properties"][name], f"{path}.{name}", errors)
+            elif spec.get("additionalProperties") is False:
+                errors.append(f"{path}.{name}: unexpected field")
+
+
+def validate(value: Any, schema: Dict[str, Any]) -> List[str]:
+    """
+    Errors for `value` against the small JSON-schema subset used here
+    (type, enum, minimum, properties, required, additionalProperties).
+    """
+    errors: List[str] = []
+    _check(value, schema, "$", errors)
+    return errors
+
+
+def parse_decision(agent: str, content: Optional[str]) -> Dict[str, Any]:
+    schema = decision_schema(agent)
+    if schema is None:
+        raise DecisionError(f"{agent} has no decision schema")
+    try:
+        decision = json.loads(content or "")
+    except ValueError as e:
+        raise DecisionError(f"{agent} returned invalid JSON: {e}") from None
+    errors = validate(decision, schema)
+    if isinstance(decision, dict) and decision.get("status") == RISK and "risk_type" in schema["properties"] and not decision.get("risk_type"):
+        errors.append("$.risk_type: required when status is Risk")
+    if errors:
+        raise DecisionError(f"{agent} decision failed validation: " + "; ".join(errors))
+    return decision
+
+
+def summarize_decision(decision: Dict[str, Any]) -> str:
+    """One-line trace text: the decided values, then the rationale."""
+    values = ", ".join(f"{k}={v}" for k, v in decision.items() if k != "rationale" and v is not None)
+    rationale = decision.get("rationale", "")
+    return f"{values} - {rationale}" if values else rationale
+
+
+# --- Multi-SKU requests (core.multi_sku) ------------------------------------
+# One request covers many SKUs and answers with {"results": [item, ...]}, one
+# item per SKU. Communication, free text for a single SKU, returns a summary.
+
+BATCH_ONLY_FIELDS = {
+    "Communication Agent": {"summary": {"type": "string"}},
+}
+
+
+def item_schema(agent: str) -> Optional[Dict[str, Any]]:
+    schema = decision_schema(agent)
+    if schema is not None:
+        properties = {"sku_id": {"type": "string"}, **schema["properties"]}
+    elif agent in BATCH_ONLY_FIELDS:
+        properties = {"sku_id": {"type": "string"}, **BATCH_ONLY_FIELDS[agent]}
+    else:
+        return None
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+def batch_response_format(agent: str) -> Optional[Dict[str, Any]]:
+    item = item_schema(agent)
+    if item is None:
+        return None
+    schema = {
+        "type": "object",
+        "properties": {"results": {"type": "array", "items": item}},
+        "required": ["results"],
+        "additionalProperties": False,
+    }
+    name = agent.lower().replace(" ", "_") + "_batch"
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def parse_batch(agent: str, content: Optional[str], sku_ids: List[str]):
+    """
+    Split a multi-SKU answer into (items by SKU, errors by SKU). Every
+    requested SKU ends up in exactly one of the two, so failed items can be
+    re-run on their own.
+    """
+    item = item_schema(agent)
+    try:
+        data = json.loads(content or "")
+        results = data["results"]
+        if not isinstance(results, list):
+            raise TypeError("results is not an array")
+    except (ValueError, KeyError, TypeError) as e:
+        error = f"{agent} returned an unusable batch: {e}"
+        return {}, {sku: error for sku in sku_ids}
+
+    wanted = set(sku_ids)
+    items: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    for entry in results:
+        sku = entry.get("sku_id") if isinstance(entry, dict) else None
+        if sku not in wanted or sku in items or sku in errors:
+            continue
+        problems = validate(entry, item)
+        if entry.get("status") == RISK and not entry.get("risk_type"):
+            problems.append("$.risk_type: required when status is Risk")
+        if problems:
+            errors[sku] = "; ".join(problems)
+        else:
+            items[sku] = {k: v for k, v in entry.items() if k != "sku_id"}
+    for sku in sku_ids:
+        if sku not in items and sku not in errors:
+            errors[sku] = "missing from batch answer"
+    return items, errors
@@ -0,0 +1,352 @@
+"""
+Similarity index over past root-cause conclusions.
+
+Products share drivers (winter gift items, component shortages in
+electronics, summer outdoor goods), so a conclusion reached for one SKU is
+often the right starting point for a similar one. Each conclusion the Root
+Cause Agent reaches is stored with a feature vector built from the SKU:
+
+- product name words,
+- category and season,
+- demand pattern: sales trend vs. forecast, stock cover, supplier lead time,
+- the risk type being explained.
+
+Tokens are hashed into a fixed-size vector (no vocabulary to keep), weighted
+by TF-IDF over the stored conclusions and compared by cosine similarity in
+NumPy. Nothing leaves the machine: no embedding service.
+
+When a SKU at risk reaches the Root Cause Agent (see Orchestrator):
+
+- score >= skip_threshold, same category, season and risk type: the past
+  conclusion is reused and the agent is not run;
+- score >= draft_threshold: the conclusion is given to the agent as a draft
+  to confirm or replace;
+- otherwise the agent investigates from scratch.
+
+Off unless an Orchestrator gets an index or SC_SIMILARITY is set
+(SC_SIMILARITY=1 for the default directory, or a directory path).
+
+    index = RootCauseIndex("data/similarity")
+    index.search(row, risk_type="Stock-out Risk")
+    python -m core.similarity show
+    python -m core.similarity query --sku P-142 --risk "Stock-out Risk"
+"""
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+SIMILARITY_DIR = "data/similarity"
+DIM = 2048
+
+DRAFT_THRESHOLD = 0.6
+SKIP_THRESHOLD = 0.9
+# Conclusions older than this are not reused (market news goes stale)
+MAX_AGE_DAYS = 30
+
+# Rows allocated when an index is created; capacity doubles from here
+_INITIAL_ENTRIES = 64
+
+# Weight of each feature group in the vector
+WEIGHTS = {"word": 1.0, "category": 2.0, "season": 1.5, "demand": 1.5, "risk": 2.0}
+
+
+def _number(row: Dict[str, Any], key: str) -> Optional[float]:
+    try:
+        value = float(row.get(key))
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def demand_pattern(row: Dict[str, Any]) -> List[str]:
+    """Coarse demand-pattern labels for a SKU row (trend vs. forecast, cover, lead time)."""
+    labels = []
+    forecast = _number(row, "Forecast")
+    trend = _number(row, "Sales_Trend_Last_30_Days")
+    stock = _number(row, "Current_Stock")
+    lead_time = _number(row, "Supplier_Lead_Time")
+    if forecast and trend is not None:
+        ratio = trend / forecast
+        labels.append("spike" if ratio > 1.2 else "drop" if ratio < 0.8 else "steady")
+    if forecast and stock is not None:
+        cover = stock / forecast
+        labels.append("cover-critical" if cover < 0.5 else "cover-low" if cover < 1
+                      else "cover-ok" if cover <= 2 else "cover-excess")
+    if lead_time is not None:
+        labels.append("lead-short" if lead_time < 14 else "lead-medium" if lead_time < 30 else "lead-long")
+    return labels
+
+
+def features(row: Dict[str, Any], risk_type: Optional[str] = None) -> Dict[str, float]:
+    """Weighted feature tokens for a SKU row and the risk being explained."""
+    tokens: Dict[str, float] = {}
+
+    def add(group: str, value: Any):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        token = f"{group}:{str(value).strip().lower()}"
+        tokens[token] = tokens.get(token, 0.0) + WEIGHTS[group]
+
+    for word in re.findall(r"[a-z0-9]+", str(row.get("Product_Name") or "").lower()):
+        add("word", word)
+    add("category", row.get("Category"))
+    add("season", row.get("Season"))
+    for label in demand_pattern(row):
+        add("demand", label)
+    add("risk", risk_type)
+    return tokens
+
+
+def hash_vector(tokens: Dict[str, float], dim: int = DIM):
+    """Hashing trick: each token adds its weight to bucket crc32(token) % dim."""
+    import numpy as np
+    vector = np.zeros(dim, dtype=np.float32)
+    for token, weight in tokens.items():
+        vector[zlib.crc32(token.encode()) % dim] += weight
+    return vector
+
+
+@dataclass
+class Match:
+    sku_id: str
+    product: str
+    category: Optional[str]
+    season: Optional[str]
+    risk_type: Optional[str]
+    root_cause: str
+    score: float
+    created_at: float
+
+    def reusable(self, row: Dict[str, Any], risk_type: Optional[str]) -> bool:
+        # Skipping the investigation needs more than a high score: the same kind of product, season and risk
+        return (self.category == row.get("Category") and self.season == row.get("Season")
+                and self.risk_type == risk_type)
+
+
+class RootCauseIndex:
+    """
+    On-disk index of root-cause conclusions, one entry per SKU (the latest
+    conclusion wins). Thread-safe within a process; single writer process.
+
+    Vectors live in a memory-mapped vectors.npy whose row capacity doubles
+    when full, and entries in an append-only entries.jsonl that is compacted
+    once it holds more superseded lines than live ones. Document frequencies
+    are kept per bucket as entries come and go, so adding a conclusion is
+    amortized O(1) rather than a rewrite of the whole index.
+    """
+    def __init__(self, root: str = SIMILARITY_DIR, dim: int = DIM, draft_threshold: float = DRAFT_THRESHOLD,
+                 skip_threshold: float = SKIP_THRESHOLD, max_age_days: Optional[float] = MAX_AGE_DAYS):
+        import numpy as np
+
+        self.root = root
+        self.draft_threshold = draft_threshold
+        self.skip_threshold = skip_threshold
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._entries_path = os.path.join(root, "entries.jsonl")
+        self._vectors_path = os.path.join(root, "vectors.npy")
+        self.entries: List[Dict[str, Any]] = []
+        self._log_lines = 0
+        self.vectors = None
+        if os.path.exists(self._entries_path) and os.path.exists(self._vectors_path):
+            self.vectors = np.load(self._vectors_path, mmap_mode="r+")
+            self._load_entries()
+        self.dim = self.vectors.shape[1] if self.vectors is not None else dim
+        self._pos = {e["sku_id"]: i for i, e in enumerate(self.entries)}
+        # log1p(counts) per entry and nonzero buckets per column, kept current by add()
+        n = len(self.entries)
+        self._logs = np.zeros((max(n, _INITIAL_ENTRIES), self.dim), dtype=np.float32)
+        self._doc_freq = np.zeros(self.dim, dtype=np.int64)
+        if n:
+            self._logs[:n] = np.log1p(self.vectors[:n])
+            self._doc_freq += np.count_nonzero(self.vectors[:n], axis=0)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # -- storage --
+
+    def _load_entries(self):
+        # Replay the log: each line places an entry at its position (later lines replace earlier ones)
+        with open(self._entries_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn last line from an interrupted write
+                pos = record.pop("pos")
+                if pos == len(self.entries):
+                    self.entries.append(record)
+                elif pos < len(self.entries):
+                    self.entries[pos] = record
+                self._log_lines += 1
+
+    def _grow(self, rows: int):
+        # Double into a new file and swap it in, as core.history does; amortized O(1) per entry
+        import numpy as np
+        os.makedirs(self.root, exist_ok=True)
+        capacity = self.vectors.shape[0] if self.vectors is not None else _INITIAL_ENTRIES // 2
+        while capacity < rows:
+            capacity *= 2
+        tmp = self._vectors_path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        if self.vectors is not None:
+            grown[:len(self.entries)] = self.vectors[:len(self.entries)]
+        grown.flush()
+        del grown
+        self.vectors = None
+        os.replace(tmp, self._vectors_path)
+        self.vectors = np.load(self._vectors_path, mmap_mode="r+")
+        if self._logs.shape[0] < capacity:
+            logs = np.zeros((capacity, self.dim), dtype=np.float32)
+            logs[:len(self.entries)] = self._logs[:len(self.entries)]
+            self._logs = logs
+
+    def _append_log(self, pos: int, entry: Dict[str, Any]):
+        with open(self._entries_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"pos": pos, **entry}) + "\n")
+        self._log_lines += 1
+        if self._log_lines > 2 * len(self.entries) + _INITIAL_ENTRIES:
+            self._compact()
+
+    def _compact(self):
+        # Rewrite the log with one line per live entry
+        tmp = self._entries_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for pos, entry in enumerate(self.entries):
+                f.write(json.dumps({"pos": pos, **entry}) + "\n")
+        os.replace(tmp, self._entries_path)
+        self._log_lines = len(self.entries)
+
+    # -- vectors --
+
+    def _idf(self):
+        import numpy as np
+        return np.log((1 + len(self.entries)) / (1 + self._doc_freq)).astype(np.float32) + 1
+
+    def add(self, row: Dict[str, Any], root_cause: str, risk_type: Optional[str] = None,
+            run_id: Optional[str] = None):
+        """Store (or replace) the conclusion for this row's SKU and persist it."""
+        import numpy as np
+        sku_id = str(row.get("SKU_ID"))
+        vector = hash_vector(features(row, risk_type), self.dim)
+        entry = {"sku_id": sku_id, "product": str(row.get("Product_Name") or ""),
+                 "category": row.get("Category"), "season": row.get("Season"), "risk_type": risk_type,
+                 "root_cause": root_cause, "run_id": run_id, "created_at": time.time()}
+        with self._lock:
+            i = self._pos.get(sku_id)
+            if i is None:
+                i = len(self.entries)
+                if self.vectors is None or i >= self.vectors.shape[0]:
+                    try:
+                        self._grow(i + 1)
+                    except OSError as e:
+                        print(f"  [Similarity] Could not grow {self.root}: {e}")
+                        return
+                self._pos[sku_id] = i
+                self.entries.append(entry)
+            else:
+                self._doc_freq -= self.vectors[i] != 0
+                self.entries[i] = entry
+            self.vectors[i] = vector
+            self._logs[i] = np.log1p(vector)
+            self._doc_freq += vector != 0
+            try:
+                self.vectors.flush()
+                self._append_log(i, entry)
+            except OSError as e:
+                # The conclusion still counts for this process; only persistence is lost
+                print(f"  [Similarity] Could not save {self.root}: {e}")
+
+    def search(self, row: Dict[str, Any], risk_type: Optional[str] = None, k: int = 3,
+               now: Optional[float] = None) -> List[Match]:
+        """Closest past conclusions for other SKUs, best first (cosine over TF-IDF weighted vectors)."""
+        import numpy as np
+        query = np.log1p(hash_vector(features(row, risk_type), self.dim))
+        with self._lock:
+            if not self.entries:
+                return []
+            idf2 = self._idf() ** 2
+            logs, entries = self._logs[:len(self.entries)], list(self.entries)
+            # Cosine of idf-weighted rows: (L * idf) . (q * idf) / (|L * idf| |q * idf|), without building L * idf
+            dots = logs @ (query * idf2)
+            norms = np.sqrt(np.einsum("ij,ij,j->i", logs, logs, idf2)) * math.sqrt(float(query ** 2 @ idf2))
+        scores = dots / np.where(norms == 0, 1, norms)
+
+        now = time.time() if now is None else now
+        sku_id = str(row.get("SKU_ID"))
+        matches = []
+        for i in np.argsort(-scores, kind="stable"):
+            entry = entries[i]
+            if entry["sku_id"] == sku_id:
+                continue  # a re-run of the same SKU investigates again
+            if self.max_age_days is not None and now - entry["created_at"] > self.max_age_days * 86400:
+                continue
+            matches.append(Match(entry["sku_id"], entry["product"], entry["category"], entry["season"],
+                                 entry["risk_type"], entry["root_cause"], round(float(scores[i]), 4),
+                                 entry["created_at"]))
+            if len(matches) == k:
+                break
+        return matches
+
+    def lookup(self, row: Dict[str, Any], risk_type: Optional[str] = None):
+        """("skip" | "draft", match) for the best usable match, or (None, best match or None)."""
+        matches = self.search(row, risk_type, k=1)
+        if not matches:
+            return None, None
+        best = matches[0]
+        if best.score >= self.skip_threshold and best.reusable(row, risk_type):
+            return "skip", best
+        if best.score >= self.draft_threshold:
+            return "draft", best
+        return None, best
+
+
+def default_index() -> Optional[RootCauseIndex]:
+    """Index from the SC_SIMILARITY environment variable, or None (reuse off)."""
+    setting = os.getenv("SC_SIMILARITY", "").strip()
+    if not setting or setting.lower() in ("0", "false", "no", "off"):
+        return None
+    return RootCauseIndex(SIMILARITY_DIR if setting.lower() in ("1", "true", "yes", "on") else setting)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.similarity", description="Inspect the root-cause similarity index")
+    parser.add_argument("--root", default=SIMILARITY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("show", help="List stored conclusions")
+    query = sub.add_parser("query", help="Closest conclusions for a SKU")
+    query.add_argument("--data", default="data/inventory_data_real.csv")
+    query.add_argument("--sku", required=True)
+    query.add_argument("--risk", default="Stock-out Risk")
+    query.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    index = RootCauseIndex(args.root)
+    if args.command == "show":
+        for e in index.entries:
+            print(f"{e['sku_id']:<8} {e['product'][:28]:<28} {str(e['risk_type']):<16} {e['root_cause']}")
+        print(f"{len(index)} conclusions in {args.root}")
+        return
+
+    import pandas as pd
+    df = pd.read_csv(args.data)
+    rows = df[df["SKU_ID"] == args.sku]
+    if rows.empty:
+        parser.error(f"SKU {args.sku} not found in {args.data}")
+    row = rows.iloc[0].to_dict()
+    mode, _ = index.lookup(row, args.risk)
+    for m in index.search(row, args.risk, k=args.k):
+        print(json.dumps(asdict(m)))
+    print(f"Decision for {args.sku}: {mode or 'investigate'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,27 @@
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, field
-from datetime import datetime
-
-@dataclass
-class LogEntry:
-    agent: str
-    message: str
-    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
-    level: str = "INFO"
-
-@dataclass
+from typing import List, Dict, Any, Optional, Sequence
+from dataclasses import dataclass
+
+from core.events import Event, EventLog, MESSAGE, ERROR
+from core.risk import HEALTHY, STOCKOUT_RISK, OVERSTOCK_RISK, classify_coverage_array
+
+# Kept for backwards compatibility: log entries are now event records
+LogEntry = Event
+
+STATUS_VALUES = ["Unknown", "Healthy", "Risk"]
+RISK_VALUES = [None, STOCKOUT_RISK, OVERSTOCK_RISK]
+MISSING = -1  # Sentinel for "no value" in the integer columns of BatchState
+
+
+def _as_int(value: Any, default: int = 0) -> int:
+    try:
+        if value is None or value != value:  # None / NaN
+            return default
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass(slots=True)
 class AgentState:
     sku_id: str
     product_name: str
@@ -19,53 +31,256 @@ class AgentState:
     lead_time: int
     location: str
     on_order: int = 0 # New field
-    
+    category: Optional[str] = None
+    season: Optional[str] = None
+
     # Analysis Results
     status: str = "Unknown"
     risk_type: Optional[str] = None
     new_forecast: Optional[int] = None
     root_cause: Optional[str] = None
     inventory_action: Optional[str] = None
+    transfer_qty: Optional[int] = None
     procurement_action: Optional[str] = None
+    po_qty: Optional[int] = None
     final_summary: Optional[str] = None
-    
-    # Logs
-    logs: List[LogEntry] = field(default_factory=list)
-    
+
+    # Logs (created on first use so batch sweeps don't pay for empty logs)
+    events: Optional[EventLog] = None
+
     def add_log(self, agent: str, message: str, level: str = "INFO"):
-        self.logs.append(LogEntry(agent=agent, message=message, level=level))
-        
-    def to_dict(self) -> Dict[str, Any]:
+        if self.events is None:
+            self.events = EventLog(run_id=self.sku_id)
+        self.events.record(agent, ERROR if level == "ERROR" else MESSAGE, message)
+
+    @property
+    def logs(self) -> List[str]:
+        return self.events.render() if self.events is not None else []
+
+    def sku_dict(self) -> Dict[str, Any]:
+        data = {
+            "SKU_ID": self.sku_id,
+            "Product_Name": self.product_name,
+            "Current_Stock": self.current_stock,
+            "Forecast": self.forecast,
+            "Sales_Trend_Last_30_Days": self.sales_trend,
+            "Supplier_Lead_Time": self.lead_time,
+            "Location": self.location,
+            "On_Order": self.on_order
+        }
+        if self.category is not None:
+            data["Category"] = self.category
+        if self.season is not None:
+            data["Season"] = self.season
+        return data
+
+    def analysis_dict(self) -> Dict[str, Any]:
+        """
+        Analysis fields in the flat shape the UI reads from a run result.
+        """
         return {
-            "sku_data": {
-                "SKU_ID": self.sku_id,
-                "Product_Name": self.product_name,
-                "Current_Stock": self.current_stock,
-                "Forecast": self.forecast,
-                "Sales_Trend_Last_30_Days": self.sales_trend,
-                "Supplier_Lead_Time": self.lead_time,
-                "Location": self.location,
-                "On_Order": self.on_order
-            },
             "status": self.status,
             "risk_type": self.risk_type,
             "new_forecast": self.new_forecast,
             "root_cause": self.root_cause,
             "inventory_action": self.inventory_action,
+            "transfer_qty": self.transfer_qty,
             "procurement_action": self.procurement_action,
+            "po_qty": self.po_qty,
             "final_summary": self.final_summary,
-            "logs": [f"[{log.agent}] {log.message}" for log in self.logs]
         }
 
+    def restore_analysis(self, analysis: Dict[str, Any]):
+        """Set analysis fields from `analysis_dict()` output (e.g. a run checkpoint)."""
+        for name in self.analysis_dict():
+            if name in analysis:
+                setattr(self, name, analysis[name])
+
+    def to_result(self) -> Dict[str, Any]:
+        """
+        Flat per-SKU dict, the same shape Orchestrator.run returns.
+        """
+        result = self.sku_dict()
+        result.update(self.analysis_dict())
+        if self.events is not None:
+            result["events"] = self.events.records()
+            result["logs"] = self.events.render()
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"sku_data": self.sku_dict()}
+        data.update(self.analysis_dict())
+        data["logs"] = self.logs
+        return data
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'AgentState':
         return cls(
             sku_id=data["SKU_ID"],
             product_name=data["Product_Name"],
-            current_stock=int(data["Current_Stock"]),
-            forecast=int(data["Forecast"]),
-            sales_trend=int(data["Sales_Trend_Last_30_Days"]),
-            lead_time=int(data["Supplier_Lead_Time"]),
+            current_stock=_as_int(data["Current_Stock"]),
+            forecast=_as_int(data["Forecast"]),
+            sales_trend=_as_int(data["Sales_Trend_Last_30_Days"]),
+            lead_time=_as_int(data["Supplier_Lead_Time"]),
             location=data["Location"],
-            on_order=int(data.get("On_Order", 0))
+            on_order=_as_int(data.get("On_Order", 0)),
+            category=data.get("Category"),
+            season=data.get("Season")
         )
+
+
+class BatchState:
+    """
+    Columnar state for many SKUs at once (NumPy is imported on first use).
+
+    Inputs and results live in typed NumPy arrays (status / risk type as int8
+    codes, quantities as int32 with -1 for "none"); free text such as
+    summaries is stored sparsely. `to_result(sku_id)` builds the same flat
+    dict as `AgentState.to_result()` for the UI.
+    """
+    _INPUT_COLUMNS = {
+        "current_stock": "Current_Stock",
+        "forecast": "Forecast",
+        "sales_trend": "Sales_Trend_Last_30_Days",
+        "lead_time": "Supplier_Lead_Time",
+        "on_order": "On_Order",
+    }
+    _TEXT_COLUMNS = {
+        "product_name": "Product_Name",
+        "location": "Location",
+        "category": "Category",
+        "season": "Season",
+    }
+
+    def __init__(self, sku_ids: Sequence[str]):
+        import numpy as np
+
+        n = len(sku_ids)
+        self.sku_ids = np.asarray(sku_ids, dtype=object)
+        self._pos = {sku: i for i, sku in enumerate(self.sku_ids)}
+
+        for attr in self._INPUT_COLUMNS:
+            setattr(self, attr, np.zeros(n, dtype=np.int32))
+        # Text inputs are dictionary-encoded: codes per row + one list of labels
+        self._text_codes: Dict[str, np.ndarray] = {}
+        self._text_labels: Dict[str, List[Any]] = {}
+
+        self.status = np.zeros(n, dtype=np.int8)
+        self.risk = np.zeros(n, dtype=np.int8)
+        self.new_forecast = np.full(n, MISSING, dtype=np.int32)
+        self.po_qty = np.full(n, MISSING, dtype=np.int32)
+        self.transfer_qty = np.full(n, MISSING, dtype=np.int32)
+        self._text_results: Dict[str, Dict[int, str]] = {
+            "root_cause": {},
+            "inventory_action": {},
+            "procurement_action": {},
+            "final_summary": {},
+        }
+
+    def __len__(self) -> int:
+        return len(self.sku_ids)
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'BatchState':
+        import numpy as np
+        import pandas as pd
+
+        batch = cls(df["SKU_ID"].astype(str).tolist())
+        for attr, col in cls._INPUT_COLUMNS.items():
+            if col in df.columns:
+                getattr(batch, attr)[:] = pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy()
+        for attr, col in cls._TEXT_COLUMNS.items():
+            if col in df.columns:
+                codes, labels = pd.factorize(df[col])
+                batch._text_codes[attr] = codes.astype(np.int32)
+                batch._text_labels[attr] = list(labels)
+        return batch
+
+    def index(self, sku_id: str) -> int:
+        return self._pos[sku_id]
+
+    def _text(self, attr: str, i: int) -> Any:
+        codes = self._text_codes.get(attr)
+        if codes is None or codes[i] < 0:
+            return None
+        return self._text_labels[attr][codes[i]]
+
+    def classify_rules(self):
+        """
+        Apply the Monitoring Agent coverage rules (core.risk) to every SKU in one pass.
+        """
+        import numpy as np
+
+        classes = classify_coverage_array(self.current_stock, self.forecast)
+        self.status[:] = np.where(classes == HEALTHY, STATUS_VALUES.index("Healthy"), STATUS_VALUES.index("Risk"))
+        self.risk[:] = np.where(classes == STOCKOUT_RISK, RISK_VALUES.index(STOCKOUT_RISK),
+                                np.where(classes == OVERSTOCK_RISK, RISK_VALUES.index(OVERSTOCK_RISK), 0))
+
+    def tally(self) -> Dict[str, int]:
+        """
+        SKUs per status ("Unknown", "Healthy", "Risk") and per risk type.
+        """
+        import numpy as np
+
+        status = np.bincount(self.status, minlength=len(STATUS_VALUES))
+        risk = np.bincount(self.risk, minlength=len(RISK_VALUES))
+        counts = {value: int(n) for value, n in zip(STATUS_VALUES, status)}
+        counts.update({value: int(n) for value, n in zip(RISK_VALUES[1:], risk[1:])})
+        return counts
+
+    def set_result(self, sku_id: str, result: Dict[str, Any]):
+        """
+        Store a per-SKU run result (an Orchestrator.run dict) in the columns.
+        """
+        i = self._pos[sku_id]
+        if result.get("status") in STATUS_VALUES:
+            self.status[i] = STATUS_VALUES.index(result["status"])
+        if "risk_type" in result and result["risk_type"] in RISK_VALUES:
+            self.risk[i] = RISK_VALUES.index(result["risk_type"])
+        for attr in ("new_forecast", "po_qty", "transfer_qty"):
+            value = result.get(attr)
+            getattr(self, attr)[i] = _as_int(value, MISSING) if value is not None else MISSING
+        for attr, column in self._text_results.items():
+            if result.get(attr):
+                column[i] = str(result[attr])
+
+    def to_result(self, sku_id: str) -> Dict[str, Any]:
+        i = self._pos[sku_id]
+        result = {"SKU_ID": sku_id}
+        for attr, col in self._TEXT_COLUMNS.items():
+            value = self._text(attr, i)
+            if value is not None:
+                result[col] = value
+        for attr, col in self._INPUT_COLUMNS.items():
+            result[col] = int(getattr(self, attr)[i])
+        result["status"] = STATUS_VALUES[self.status[i]]
+        result["risk_type"] = RISK_VALUES[self.risk[i]]
+        for attr in ("new_forecast", "po_qty", "transfer_qty"):
+            value = int(getattr(self, attr)[i])
+            result[attr] = None if value == MISSING else value
+        for attr, column in self._text_results.items():
+            result[attr] = column.get(i)
+        return result
+
+    def to_state(self, sku_id: str) -> AgentState:
+        result = self.to_result(sku_id)
+        state = AgentState.from_dict(result)
+        for key, value in result.items():
+            if key in AgentState.__slots__ and key not in ("sku_id", "events"):
+                setattr(state, key, value)
+        return state
+
+    def to_frame(self):
+        """
+        Decoded results as a DataFrame (one row per SKU).
+        """
+        import numpy as np
+        import pandas as pd
+
+        frame = pd.DataFrame({"SKU_ID": self.sku_ids})
+        frame["status"] = np.asarray(STATUS_VALUES, dtype=object)[self.status]
+        frame["risk_type"] = np.asarray(RISK_VALUES, dtype=object)[self.risk]
+        for attr in ("new_forecast", "po_qty", "transfer_qty"):
+            frame[attr] = pd.array(np.where(getattr(self, attr) == MISSING, 0, getattr(self, attr)), dtype="Int64")
+            frame.loc[getattr(self, attr) == MISSING, attr] = pd.NA
+        return frame
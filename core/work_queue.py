@@ -0,0 +1,257 @@
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Shard:
+    shard_id: int
+    sku_ids: List[str]
+    data_file: str
+    season: Optional[str]
+    attempts: int
+    lease_expires: float
+
+
+class WorkQueue(ABC):
+    """
+    Durable queue of SKU shards with lease semantics.
+
+    A worker claims a shard for `lease_seconds` and must heartbeat before the
+    lease expires. Shards whose lease lapses (crashed or stalled worker) become
+    claimable again; per-SKU results are stored as they finish so a reassigned
+    shard only re-runs the SKUs that never completed.
+    """
+    @abstractmethod
+    def enqueue(self, sku_ids: Sequence[str], shard_size: int, data_file: str,
+                season: Optional[str] = None, priorities: Optional[Sequence[float]] = None) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Shard]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def heartbeat(self, shard_id: int, worker_id: str, lease_seconds: float) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def complete(self, shard_id: int, worker_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def fail(self, shard_id: int, worker_id: str, error: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_result(self, shard_id: int, worker_id: str, sku_id: str, result: Dict[str, Any]) -> bool:
+        """Store a SKU's result if `worker_id` still holds the shard's lease; False if it doesn't."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def completed_skus(self, shard_id: int) -> List[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def results(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    Local reference backend. Safe for many worker processes on one machine
+    (WAL mode, short IMMEDIATE transactions for claims).
+    """
+    def __init__(self, path: str, max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS shards (
+                    shard_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sku_ids TEXT NOT NULL,
+                    data_file TEXT NOT NULL,
+                    season TEXT,
+                    priority REAL NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    owner TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_shards_claim ON shards (status, priority DESC, shard_id);
+                CREATE TABLE IF NOT EXISTS results (
+                    sku_id TEXT NOT NULL,
+                    shard_id INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    proposals TEXT NOT NULL,
+                    finished_at REAL NOT NULL,
+                    PRIMARY KEY (shard_id, sku_id)
+                );
+            """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit connection; multi-statement updates use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA busy_timeout=30000")
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, sku_ids, shard_size, data_file, season=None, priorities=None) -> int:
+        sku_ids = list(sku_ids)
+        now = time.time()
+        rows = []
+        for start in range(0, len(sku_ids), shard_size):
+            chunk = sku_ids[start:start + shard_size]
+            # A shard is as urgent as its most urgent SKU
+            priority = max(priorities[start:start + shard_size]) if priorities is not None else 0.0
+            rows.append((json.dumps(chunk), data_file, season, float(priority), now))
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO shards (sku_ids, data_file, season, priority, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        return len(rows)
+
+    def claim(self, worker_id, lease_seconds) -> Optional[Shard]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Expired leases that used up their attempts are given up on
+            conn.execute(
+                "UPDATE shards SET status = ?, error = 'lease expired', updated_at = ? WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts),
+            )
+            row = conn.execute(
+                """
+                SELECT shard_id, sku_ids, data_file, season, attempts FROM shards
+                WHERE (status = ? OR (status = ? AND lease_expires < ?)) AND attempts < ?
+                ORDER BY priority DESC, shard_id LIMIT 1
+                """,
+                (PENDING, LEASED, now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            shard_id, sku_ids, data_file, season, attempts = row
+            expires = now + lease_seconds
+            conn.execute(
+                "UPDATE shards SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE shard_id = ?",
+                (LEASED, worker_id, expires, now, shard_id),
+            )
+            conn.execute("COMMIT")
+        return Shard(shard_id, json.loads(sku_ids), data_file, season, attempts + 1, expires)
+
+    def heartbeat(self, shard_id, worker_id, lease_seconds) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE shards SET lease_expires = ?, updated_at = ? WHERE shard_id = ? AND owner = ? AND status = ?",
+                (now + lease_seconds, now, shard_id, worker_id, LEASED),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, shard_id, worker_id) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE shards SET status = ?, updated_at = ? WHERE shard_id = ? AND owner = ? AND status = ?",
+                (DONE, time.time(), shard_id, worker_id, LEASED),
+            )
+            return cur.rowcount == 1
+
+    def fail(self, shard_id, worker_id, error) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE shards SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                                  owner = NULL, lease_expires = 0, error = ?, updated_at = ?
+                WHERE shard_id = ? AND owner = ?
+                """,
+                (self.max_attempts, FAILED, PENDING, error, time.time(), shard_id, worker_id),
+            )
+
+    def put_result(self, shard_id, worker_id, sku_id, result) -> bool:
+        proposals = {k: result.get(k) for k in ("status", "risk_type", "new_forecast", "po_qty", "transfer_qty")}
+        with self._connect() as conn:
+            # Ownership check and insert in one transaction, so a reassigned shard's old owner can't write
+            conn.execute("BEGIN IMMEDIATE")
+            owned = conn.execute(
+                "SELECT 1 FROM shards WHERE shard_id = ? AND owner = ? AND status = ?",
+                (shard_id, worker_id, LEASED),
+            ).fetchone()
+            if owned:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (sku_id, shard_id, result, proposals, finished_at) VALUES (?, ?, ?, ?, ?)",
+                    (sku_id, shard_id, json.dumps(result, default=str), json.dumps(proposals, default=str), time.time()),
+                )
+            conn.execute("COMMIT")
+        return owned is not None
+
+    def completed_skus(self, shard_id) -> List[str]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT sku_id FROM results WHERE shard_id = ?", (shard_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    def results(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT result FROM results ORDER BY finished_at").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall())
+            n_results = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        stats = {status: counts.get(status, 0) for status in (PENDING, LEASED, DONE, FAILED)}
+        stats["results"] = n_results
+        return stats
+
+
+# Backends by URL scheme, e.g. "sqlite:///data/work_queue.db"
+BACKENDS: Dict[str, Callable[[str], WorkQueue]] = {
+    "sqlite": SQLiteWorkQueue,
+}
+
+
+def register_backend(scheme: str, factory: Callable[[str], WorkQueue]):
+    BACKENDS[scheme] = factory
+
+
+def open_queue(url: str) -> WorkQueue:
+    """
+    Open a queue from a URL. A bare path is treated as a SQLite file.
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return SQLiteWorkQueue(url)
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown work queue backend '{scheme}'. Available: {', '.join(BACKENDS)}")
+    # sqlite:///rel/path -> rel/path, sqlite:////abs/path -> /abs/path
+    return BACKENDS[scheme](rest[1:] if rest.startswith("/") else rest)
@@ -0,0 +1,192 @@
+"""
+Fleet-scan worker.
+
+    python -m core.worker enqueue --queue sqlite:///data/work_queue.db --data data/inventory_data_real.csv
+    python -m core.worker run --queue sqlite:///data/work_queue.db --processes 4
+    python -m core.worker status --queue sqlite:///data/work_queue.db
+
+Each worker process claims a shard of SKUs, runs the orchestrator pipeline on
+every SKU in it and writes results back to the queue. Shards are enqueued
+most urgent first (core.scheduler) and each shard runs its SKUs by urgency,
+re-scored whenever the inventory file changes. Run the same `run`
+command on several machines against a shared backend to scale out.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from core.work_queue import WorkQueue, Shard, open_queue
+
+DEFAULT_QUEUE = "sqlite:///data/work_queue.db"
+
+
+class Worker:
+    def __init__(self, queue: WorkQueue, lease_seconds: float = 120.0, idle_exit: bool = True,
+                 poll_interval: float = 2.0, worker_id: Optional[str] = None, orchestrator=None):
+        self.queue = queue
+        self.lease_seconds = lease_seconds
+        self.idle_exit = idle_exit
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._orchestrator = orchestrator
+        self._inventory: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._loaded: Dict[str, Optional[float]] = {}
+
+    @property
+    def orchestrator(self):
+        if self._orchestrator is None:
+            from core.checkpoint import CheckpointStore
+            from core.orchestrator import Orchestrator
+            # A restarted worker re-leasing a shard resumes each SKU from its last finished agent
+            self._orchestrator = Orchestrator(checkpoints=CheckpointStore())
+        return self._orchestrator
+
+    def _rows(self, data_file: str) -> Dict[str, Dict[str, Any]]:
+        # Inventory is loaded once per data file per worker, indexed by SKU,
+        # and reloaded only when the file has changed since
+        mtime = os.path.getmtime(data_file) if os.path.exists(data_file) else None
+        if data_file not in self._inventory or self._loaded.get(data_file) != mtime:
+            import pandas as pd
+            df = pd.read_csv(data_file)
+            # Keyed like Shard.sku_ids (strings), whatever dtype pandas read the IDs as
+            self._inventory[data_file] = {str(row["SKU_ID"]): row for row in df.to_dict(orient="records")}
+            self._loaded[data_file] = mtime
+        return self._inventory[data_file]
+
+    def _heartbeat(self, shard: Shard, stop: threading.Event, lost: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(shard.shard_id, self.worker_id, self.lease_seconds):
+                print(f"[{self.worker_id}] Lost lease on shard {shard.shard_id}")
+                lost.set()
+                return
+
+    def _put_result(self, shard: Shard, sku_id: str, result: Dict[str, Any], lost: threading.Event) -> bool:
+        # The queue refuses results once the shard's lease has passed to another worker
+        if self.queue.put_result(shard.shard_id, self.worker_id, sku_id, result):
+            return True
+        print(f"[{self.worker_id}] Lost lease on shard {shard.shard_id}; dropping result for {sku_id}")
+        lost.set()
+        return False
+
+    def process(self, shard: Shard) -> int:
+        """
+        Run every not-yet-finished SKU of a shard. Returns the number processed.
+        """
+        stop, lost = threading.Event(), threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(shard, stop, lost), daemon=True)
+        beat.start()
+        processed = 0
+        try:
+            from core.scheduler import UrgencyQueue
+
+            rows = self._rows(shard.data_file)
+            self.orchestrator.data_file = shard.data_file
+            done = set(self.queue.completed_skus(shard.shard_id))
+            todo = UrgencyQueue()
+            for sku_id in shard.sku_ids:
+                if sku_id in done:
+                    continue
+                if sku_id not in rows:
+                    if not self._put_result(shard, sku_id, {"SKU_ID": sku_id, "error": "SKU not found"}, lost):
+                        return processed
+                    continue
+                todo.push(rows[sku_id])
+            while todo:
+                if lost.is_set():
+                    return processed
+                latest = self._rows(shard.data_file)
+                if latest is not rows:
+                    # Inventory updated mid-shard: re-score the SKUs still waiting
+                    rows = latest
+                    for sku_id in shard.sku_ids:
+                        if sku_id in todo and sku_id in rows:
+                            todo.update(rows[sku_id])
+                row = todo.pop()
+                sku_id = str(row["SKU_ID"])
+                run_data = dict(row)
+                if shard.season:
+                    run_data["Season"] = shard.season
+                result = self.orchestrator.run(run_data)
+                if not self._put_result(shard, sku_id, result, lost):
+                    return processed
+                processed += 1
+            self.queue.complete(shard.shard_id, self.worker_id)
+        except Exception as e:
+            print(f"[{self.worker_id}] Shard {shard.shard_id} failed: {e}")
+            self.queue.fail(shard.shard_id, self.worker_id, str(e))
+        finally:
+            stop.set()
+            beat.join()
+        return processed
+
+    def run(self) -> int:
+        total = 0
+        while True:
+            shard = self.queue.claim(self.worker_id, self.lease_seconds)
+            if shard is None:
+                if self.idle_exit:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            print(f"[{self.worker_id}] Claimed shard {shard.shard_id} ({len(shard.sku_ids)} SKUs, attempt {shard.attempts})")
+            total += self.process(shard)
+        print(f"[{self.worker_id}] Finished: {total} SKUs processed")
+        return total
+
+
+def _run_worker(queue_url: str, lease_seconds: float, idle_exit: bool):
+    Worker(open_queue(queue_url), lease_seconds=lease_seconds, idle_exit=idle_exit).run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.worker", description="Sharded fleet-scan worker")
+    parser.add_argument("--queue", default=DEFAULT_QUEUE, help="Work queue URL (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enq = sub.add_parser("enqueue", help="Split an inventory file into SKU shards")
+    enq.add_argument("--data", default="data/inventory_data_real.csv")
+    enq.add_argument("--shard-size", type=int, default=25)
+    enq.add_argument("--season", default=None)
+
+    run = sub.add_parser("run", help="Claim and process shards")
+    run.add_argument("--processes", type=int, default=1, help="Worker processes on this node")
+    run.add_argument("--lease", type=float, default=120.0, help="Lease length in seconds")
+    run.add_argument("--forever", action="store_true", help="Keep polling when the queue is empty")
+
+    sub.add_parser("status", help="Show shard counts")
+
+    args = parser.parse_args(argv)
+    queue = open_queue(args.queue)
+
+    if args.command == "enqueue":
+        import pandas as pd
+        from core.scheduler import urgency_scores
+        df = pd.read_csv(args.data)
+        # Most urgent SKUs first, so the first (highest-priority) shards hold them
+        df = df.assign(_urgency=urgency_scores(df)).sort_values("_urgency", ascending=False, kind="stable")
+        sku_ids = df["SKU_ID"].astype(str).tolist()
+        n_shards = queue.enqueue(sku_ids, args.shard_size, args.data, season=args.season,
+                                 priorities=df["_urgency"].tolist())
+        print(f"Enqueued {len(sku_ids)} SKUs in {n_shards} shards")
+    elif args.command == "run":
+        if args.processes <= 1:
+            _run_worker(args.queue, args.lease, not args.forever)
+        else:
+            procs = [multiprocessing.Process(target=_run_worker, args=(args.queue, args.lease, not args.forever))
+                     for _ in range(args.processes)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+    elif args.command == "status":
+        for key, value in queue.stats().items():
+            print(f"{key:>8}: {value}")
+
+
+if __name__ == "__main__":
+    main()